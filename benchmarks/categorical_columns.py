@@ -0,0 +1,64 @@
+"""Reports memory and filter timings for the JHU timeseries with the region
+columns stored as strings vs. as categoricals.
+
+Run from the repository root, with the covid-data-public checkout available:
+
+    python -m benchmarks.categorical_columns
+"""
+import time
+
+from libs.datasets import JHUDataset
+from libs.datasets import dataset_utils
+from libs.datasets.dataset_utils import AggregationLevel
+from libs.datasets.timeseries import TimeseriesDataset
+
+
+def as_strings(timeseries):
+    data = timeseries.data.copy()
+    for field in dataset_utils.CATEGORICAL_FIELDS:
+        data[field] = data[field].astype(object)
+    return TimeseriesDataset(data)
+
+
+def time_subsets(timeseries, states, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for state in states:
+            timeseries.get_subset(AggregationLevel.STATE, country="USA", state=state)
+    return (time.perf_counter() - start) / (repeats * len(states))
+
+
+def time_lookups(timeseries, states):
+    # Fresh dataset so building the region index is part of the timing
+    timeseries = TimeseriesDataset(timeseries.data)
+    start = time.perf_counter()
+    for state in states:
+        timeseries.get_data(country="USA", state=state)
+    return (time.perf_counter() - start) / len(states)
+
+
+def time_latest_values(timeseries):
+    start = time.perf_counter()
+    timeseries.latest_values(AggregationLevel.COUNTY)
+    return time.perf_counter() - start
+
+
+def main():
+    categorical = JHUDataset.local().timeseries()
+    strings = as_strings(categorical)
+    states = strings.get_subset(None, country="USA").states
+    print(f"{len(categorical.data):,} rows, {len(states)} US states")
+
+    print(f"{'':14} {'memory':>10} {'get_subset':>12} {'get_data':>10} {'latest':>8}")
+    for name, timeseries in [("strings", strings), ("categoricals", categorical)]:
+        memory = timeseries.data.memory_usage(deep=True).sum()
+        print(
+            f"{name:14} {memory / 2 ** 20:7.1f} MiB "
+            f"{time_subsets(timeseries, states) * 1000:9.2f} ms "
+            f"{time_lookups(timeseries, states) * 1000:7.3f} ms "
+            f"{time_latest_values(timeseries) * 1000:5.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Times the string cleanup in JHUDataset.standardize_data, cell by cell with
+`applymap`/`apply` vs. the vectorized dataset_utils helpers, and checks both
+produce the same frame.
+
+Run from the repository root:
+
+    python -m benchmarks.jhu_parsing [REPORTS_DIR]
+
+REPORTS_DIR defaults to the bundled data/jhu daily reports.
+"""
+import pathlib
+import sys
+import time
+
+import pandas as pd
+
+from libs.datasets import dataset_utils
+from libs.datasets.sources.jhu_dataset import JHUDataset
+
+DEFAULT_REPORTS_DIR = pathlib.Path("data/jhu/csse_covid_19_daily_reports")
+Fields = JHUDataset.Fields
+
+
+def load_raw(reports_dir):
+    loaded_data = []
+    for path in sorted(reports_dir.glob("*.csv")):
+        data = pd.read_csv(path, dtype={"FIPS": str})
+        data = data.rename(columns=JHUDataset.RENAMED_COLUMNS)
+        data[Fields.DATE] = pd.to_datetime(path.stem)
+        loaded_data.append(data)
+    return pd.concat(loaded_data, ignore_index=True)
+
+
+def cell_by_cell(data):
+    data = data.applymap(lambda x: x.strip() if type(x) == str else x)
+    states = data[Fields.STATE].apply(dataset_utils.parse_state)
+    counties = data[Fields.STATE].apply(dataset_utils.parse_county_from_state)
+    fips = data[Fields.FIPS].apply(
+        lambda x: f"{x.zfill(5)}" if type(x) == str else x
+    )
+    return data, states, counties, fips
+
+
+def vectorized(data):
+    data = dataset_utils.strip_whitespace(data)
+    states = dataset_utils.map_unique_values(
+        data[Fields.STATE], dataset_utils.parse_state
+    )
+    counties = dataset_utils.map_unique_values(
+        data[Fields.STATE], dataset_utils.parse_county_from_state
+    )
+    fips = dataset_utils.map_strings(data[Fields.FIPS], "zfill", 5)
+    return data, states, counties, fips
+
+
+def measure(transform, data, repeats=3):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = transform(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    reports_dir = DEFAULT_REPORTS_DIR
+    if len(sys.argv) > 1:
+        reports_dir = pathlib.Path(sys.argv[1])
+    data = load_raw(reports_dir)
+    print(f"{len(data):,} rows from {reports_dir}")
+
+    before, expected = measure(cell_by_cell, data)
+    after, actual = measure(vectorized, data)
+    pd.testing.assert_frame_equal(expected[0], actual[0])
+    for expected_values, actual_values in zip(expected[1:], actual[1:]):
+        pd.testing.assert_series_equal(expected_values, actual_values)
+
+    print(f"applymap/apply: {before * 1000:8.1f} ms")
+    print(f"vectorized:     {after * 1000:8.1f} ms  (identical output)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Times the legacy CovidDatasets state timeseries preparation for every US
+state, against the original row-by-row implementations, and checks both give
+the same frames.
+
+Run from the repository root, with the covid-data-public checkout available:
+
+    python -m benchmarks.legacy_datasets
+"""
+import datetime
+import logging
+import math
+import time
+from copy import copy
+
+import pandas as pd
+
+from libs import CovidDatasets
+
+MODEL_INTERVAL = 4
+
+
+def reference_combine_state_county_data(dataset, country, state):
+    """Original gap filling loop, walking back one day at a time."""
+    timeseries = dataset.get_all_timeseries()
+    state_data = timeseries[
+        (timeseries[dataset.STATE_FIELD] == state)
+        & (timeseries[dataset.COUNTRY_FIELD] == country)
+        & (timeseries[dataset.COUNTY_FIELD].isna())
+    ].reset_index(drop=True)
+    county_data = (
+        timeseries[
+            (timeseries[dataset.STATE_FIELD] == state)
+            & (timeseries[dataset.COUNTRY_FIELD] == country)
+            & (timeseries[dataset.COUNTY_FIELD].notna())
+        ][
+            [
+                dataset.DATE_FIELD,
+                dataset.COUNTRY_FIELD,
+                dataset.STATE_FIELD,
+                dataset.CASE_FIELD,
+                dataset.DEATH_FIELD,
+                dataset.RECOVERED_FIELD,
+            ]
+        ]
+        .groupby(
+            [dataset.DATE_FIELD, dataset.COUNTRY_FIELD, dataset.STATE_FIELD],
+            as_index=False,
+        )[[dataset.CASE_FIELD, dataset.DEATH_FIELD, dataset.RECOVERED_FIELD]]
+        .sum()
+    )
+    state_data = state_data.fillna({"deaths": 0})
+    county_data = county_data.fillna({"deaths": 0})
+
+    curr_date = max(
+        state_data[dataset.DATE_FIELD].max(), county_data[dataset.DATE_FIELD].max()
+    )
+    county_data_to_insert = []
+    while curr_date > dataset._START_DATE:
+        if len(state_data[state_data[dataset.DATE_FIELD] == curr_date]) == 0:
+            county_data_for_date = copy(
+                county_data[county_data[dataset.DATE_FIELD] == curr_date]
+            )
+            if len(county_data_for_date) > 0:
+                county_data_for_date = county_data_for_date.iloc[0]
+                new_state_row = copy(state_data.iloc[0])
+                for field in [
+                    dataset.DATE_FIELD,
+                    dataset.CASE_FIELD,
+                    dataset.DEATH_FIELD,
+                    dataset.RECOVERED_FIELD,
+                ]:
+                    new_state_row[field] = county_data_for_date[field]
+                county_data_to_insert.append(copy(new_state_row))
+        curr_date -= datetime.timedelta(days=1)
+    return state_data.append(pd.DataFrame(county_data_to_insert)).sort_values(
+        dataset.DATE_FIELD
+    )
+
+
+def reference_backfill(dataset, series, model_interval):
+    """Original backfill, copying synthetic rows and stepping down row by row."""
+    series = series.sort_values(dataset.DATE_FIELD).reset_index(drop=True)
+    data_rows = series[series[dataset.CASE_FIELD] > 0]
+    interval_rows = data_rows[
+        data_rows[dataset.DATE_FIELD].apply(
+            lambda d: (d - dataset._START_DATE).days % model_interval == 0
+        )
+    ]
+    min_interval_row = interval_rows[
+        interval_rows[dataset.DATE_FIELD] == interval_rows[dataset.DATE_FIELD].min()
+    ].iloc[0]
+    series = series[series[dataset.DATE_FIELD] >= min_interval_row[dataset.DATE_FIELD]]
+
+    pd.set_option("mode.chained_assignment", None)
+    series[dataset.SYNTHETIC_FIELD] = None
+    synthetic_interval = (series[dataset.DATE_FIELD].min() - dataset._START_DATE).days
+    template = series.iloc[0]
+    synthetic_data = []
+    for i in range(0, synthetic_interval):
+        synthetic_row = template
+        synthetic_row[dataset.DATE_FIELD] = dataset._START_DATE + datetime.timedelta(
+            days=i
+        )
+        synthetic_row[dataset.CASE_FIELD] = 0
+        synthetic_row[dataset.DEATH_FIELD] = 0
+        synthetic_row[dataset.RECOVERED_FIELD] = 0
+        synthetic_row[dataset.SYNTHETIC_FIELD] = 1
+        synthetic_data.append(copy(synthetic_row))
+    pd.set_option("mode.chained_assignment", "warn")
+    series = (
+        series.append(pd.DataFrame(synthetic_data))
+        .sort_values(dataset.DATE_FIELD)
+        .reset_index(drop=True)
+    )
+
+    for a in range(0, len(series)):
+        i = len(series) - a - 1
+        if series.iloc[i][dataset.CASE_FIELD] == 0:
+            min_row = series[series[dataset.CASE_FIELD] > 0].min()
+            series.at[i, dataset.CASE_FIELD] = min_row[dataset.CASE_FIELD] / (
+                math.pow(2, (1 / model_interval))
+            )
+    return series
+
+
+def time_states(function, dataset, states):
+    results = {}
+    start = time.perf_counter()
+    for state in states:
+        results[state] = function(dataset, "USA", state)
+    return time.perf_counter() - start, results
+
+
+def main():
+    logging.disable(logging.INFO)
+    for dataset_class in [CovidDatasets.JHUDataset, CovidDatasets.CDSDataset]:
+        dataset = dataset_class()
+        dataset.get_all_timeseries()
+        states = dataset.get_all_states_by_country("USA")
+        print(f"{dataset_class.__name__}, {len(states)} states")
+
+        before, expected = time_states(
+            reference_combine_state_county_data, dataset, states
+        )
+        after, actual = time_states(
+            dataset_class.combine_state_county_data, dataset, states
+        )
+        for state in states:
+            pd.testing.assert_frame_equal(expected[state], actual[state])
+        print(f"  combine_state_county_data {before:6.2f}s -> {after:6.2f}s")
+
+        cutoff = {state: dataset.cutoff(actual[state]) for state in states}
+        start = time.perf_counter()
+        expected = {
+            state: reference_backfill(dataset, cutoff[state], MODEL_INTERVAL)
+            for state in states
+        }
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = {
+            state: dataset.backfill(cutoff[state], MODEL_INTERVAL) for state in states
+        }
+        after = time.perf_counter() - start
+        for state in states:
+            pd.testing.assert_frame_equal(expected[state], actual[state])
+        print(f"  backfill                  {before:6.2f}s -> {after:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Times the legacy CovidTimeseriesModel for every US state and intervention,
+with the dict per cycle engine vs. the array engine, and checks both forecasts
+match.
+
+Run from the repository root, with the covid-data-public checkout available:
+
+    python -m benchmarks.legacy_model
+"""
+import logging
+import time
+
+import pandas as pd
+
+import run_old_model
+from libs.build_params import get_interventions
+from libs.CovidDatasets import CDSDataset
+from libs.CovidTimeseriesModel import CovidTimeseriesModel
+
+
+def main():
+    logging.disable(logging.INFO)
+    dataset = CDSDataset()
+    interventions = get_interventions()
+    states = dataset.get_all_states_by_country("USA")
+
+    elapsed = {False: 0, True: 0}
+    runs = 0
+    for state in states:
+        try:
+            model_parameters = run_old_model.build_model_parameters(
+                dataset, "USA", state
+            )
+        except Exception:
+            continue
+        for intervention in interventions:
+            forecasts = {}
+            for array_engine in [False, True]:
+                parameters = dict(
+                    model_parameters,
+                    interventions=intervention,
+                    array_engine=array_engine,
+                )
+                start = time.perf_counter()
+                forecasts[array_engine] = CovidTimeseriesModel().forecast(parameters)
+                elapsed[array_engine] += time.perf_counter() - start
+            pd.testing.assert_frame_equal(forecasts[False], forecasts[True])
+            runs += 1
+
+    print(f"{runs} forecasts ({len(states)} states x {len(interventions)} interventions)")
+    print(f"dict engine:  {elapsed[False]:6.2f}s")
+    print(f"array engine: {elapsed[True]:6.2f}s  (identical forecasts)")
+
+
+if __name__ == "__main__":
+    main()
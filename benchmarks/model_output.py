@@ -0,0 +1,92 @@
+"""Compares the DataFrame and ModelResults output paths for one state, from
+model_state through the rows handed to write_results.
+
+Run from the repository root, with the covid-data-public checkout available:
+
+    python -m benchmarks.model_output [STATE]
+"""
+import datetime
+import sys
+import time
+import tracemalloc
+
+import run
+from libs.CovidTimeseriesModelSIR import SEGMENT_CACHE
+from libs.build_params import get_interventions
+from libs.datasets import FIPSPopulation
+from libs.datasets import JHUDataset
+from libs.datasets.dataset_utils import AggregationLevel
+from libs.CovidDatasets import JHUDataset as LegacyJHUDataset
+
+MIN_DATE = datetime.datetime(2020, 3, 7)
+MAX_DATE = datetime.datetime(2020, 7, 6)
+
+
+def load_state(state, country="USA"):
+    timeseries = JHUDataset.local().timeseries()
+    timeseries = timeseries.get_subset(
+        AggregationLevel.STATE, after=MIN_DATE, country=country, state=state
+    )
+    cases = timeseries.get_data(state=state)
+    beds = LegacyJHUDataset(MIN_DATE).get_beds_by_country_state(country, state)
+    population = FIPSPopulation.local().population()
+    # start the interventions on the last day of data so every scenario
+    # actually restarts the model
+    interventions = get_interventions(start_date=cases.date.max().date())
+    return cases, beds, population.get_state_level(country, state), interventions
+
+
+def dataframe_path(cases, beds, population, interventions):
+    for intervention in interventions:
+        results = run.model_state(cases, beds, population, intervention)
+        website = run.prepare_data_for_website(
+            results, cases, population, MIN_DATE, MAX_DATE, interval=4
+        )
+        website.values.tolist()
+
+
+def array_path(cases, beds, population, interventions):
+    for intervention in interventions:
+        results = run.model_state(
+            cases, beds, population, intervention, as_arrays=True
+        )
+        run.prepare_rows_for_website(
+            results, cases, population, MIN_DATE, MAX_DATE, interval=4
+        )
+
+
+def measure(path, args, repeats=10, cached=True):
+    # warm up, and fill the segment cache so only the output path is timed
+    path(*args)
+
+    elapsed = 0
+    for _ in range(repeats):
+        if not cached:
+            SEGMENT_CACHE.clear()
+        start = time.perf_counter()
+        path(*args)
+        elapsed += time.perf_counter() - start
+
+    tracemalloc.start()
+    path(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / repeats, peak
+
+
+def main():
+    state = sys.argv[1] if len(sys.argv) > 1 else "CA"
+    args = load_state(state)
+    print(f"{state}, all interventions, model_state through website rows")
+    for cached in [True, False]:
+        print("segments cached" if cached else "solving every segment")
+        for name, path in [
+            ("DataFrame", dataframe_path),
+            ("ModelResults", array_path),
+        ]:
+            elapsed, peak = measure(path, args, cached=cached)
+            print(f"  {name:14} {elapsed * 1000:8.1f} ms {peak / 1024:6.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Reports the share of a state's county forecasts spent writing results, and
+how much of it the compute thread still waits for with the background writer.
+
+Run from the repository root, with the covid-data-public checkout available:
+
+    python -m benchmarks.results_writer [STATE]
+"""
+import datetime
+import pathlib
+import sys
+import tempfile
+import time
+
+import simplejson
+
+import run
+from libs.datasets import DHBeds
+from libs.datasets import FIPSPopulation
+from libs.datasets import JHUDataset
+from libs.datasets.dataset_utils import AggregationLevel
+
+MIN_DATE = datetime.datetime(2020, 3, 7)
+MAX_DATE = datetime.datetime(2020, 7, 6)
+
+
+def forecast_counties(state, output_dir):
+    beds_data = DHBeds.local().beds()
+    population_data = FIPSPopulation.local().population()
+    timeseries = JHUDataset.local().timeseries()
+    timeseries = timeseries.get_subset(
+        AggregationLevel.COUNTY, after=MIN_DATE, country="USA", state=state
+    )
+
+    start = time.perf_counter()
+    for country, state, county, fips in timeseries.county_keys():
+        run.forecast_each_county(
+            MIN_DATE,
+            MAX_DATE,
+            country,
+            state,
+            county,
+            fips,
+            timeseries,
+            beds_data,
+            population_data,
+            output_dir,
+        )
+    return time.perf_counter() - start
+
+
+def streamed_dump_seconds(paths, output_dir):
+    """Time to write the same files the way write_results used to."""
+    documents = [simplejson.loads(path.read_text()) for path in paths]
+    start = time.perf_counter()
+    for path, data in zip(paths, documents):
+        with open(output_dir / path.name, "w") as out:
+            simplejson.dump(data, out, ignore_nan=True)
+    return time.perf_counter() - start
+
+
+def main():
+    state = sys.argv[1] if len(sys.argv) > 1 else "NY"
+    with tempfile.TemporaryDirectory() as directory:
+        output_dir = pathlib.Path(directory)
+        (output_dir / "old").mkdir()
+        total = forecast_counties(state, output_dir)
+        info = run.RESULTS_WRITER.info()
+        paths = sorted(output_dir.glob("*.json"))
+        old = streamed_dump_seconds(paths, output_dir / "old")
+
+    print(f"{state}: {info['files']} files, {info['bytes']:,} bytes in {total:.2f}s")
+    print(f"  simplejson.dump, in the task: {old:.3f}s ({old / total:.1%})")
+    print(
+        f"  background writer:            {info['write_seconds']:.3f}s "
+        f"({info['write_seconds'] / total:.1%}), task waited "
+        f"{info['wait_seconds']:.3f}s ({info['wait_seconds'] / total:.1%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
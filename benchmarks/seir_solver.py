@@ -0,0 +1,115 @@
+"""Measures Harvard SEIR solves per second for each right-hand side mode, and
+the time to solve many regions one at a time vs. as one batched system.
+
+Run from the repository root:
+
+    python -m benchmarks.seir_solver
+"""
+import time
+
+import numpy
+
+from libs.epi_models import HarvardEpi
+
+BASE_MODEL_PARAMETERS = {
+    "population": 1000000,
+    "presymptomatic_period": 3,
+    "duration_mild_infections": 6,
+    "hospital_time_recovery": 6,
+    "icu_time_death": 8,
+    "beta": 0.6,
+    "beta_hospitalized": 0.1,
+    "beta_icu": 0.1,
+    "hospitalization_rate": 0.0727,
+    "hospitalized_cases_requiring_icu_care": 0.1397,
+    "case_fatality_rate": 0.0109341104294479,
+    "exposed_infected_ratio": 1.2,
+}
+
+POP_DICT = {"total": 1000000, "infected": 400, "recovered": 10, "deaths": 2}
+
+MODES = {
+    "reference deriv": {},
+    "fast_deriv": {"fast_deriv": True},
+    "fast_deriv + jacobian": {"fast_deriv": True, "use_jacobian": True},
+}
+
+
+def solves_per_second(model_parameters, duration=2.0):
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    args = (
+        params["beta"],
+        params["alpha"],
+        params["gamma"],
+        params["rho"],
+        params["mu"],
+    )
+    solves = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        HarvardEpi.seir(POP_DICT, model_parameters, *args)
+        solves += 1
+    return solves / (time.perf_counter() - start)
+
+
+def region_inputs(num_regions):
+    populations = numpy.linspace(5e3, 1e7, num_regions).astype(int)
+    all_parameters = [
+        dict(BASE_MODEL_PARAMETERS, population=population, fast_deriv=True)
+        for population in populations
+    ]
+    pop_dicts = [
+        dict(POP_DICT, total=population, infected=max(population // 2500, 1))
+        for population in populations
+    ]
+    return all_parameters, pop_dicts
+
+
+def time_regions(num_regions):
+    all_parameters, pop_dicts = region_inputs(num_regions)
+    seir_params = [HarvardEpi.generate_epi_params(p) for p in all_parameters]
+
+    start = time.perf_counter()
+    for model_parameters, pop_dict, params in zip(
+        all_parameters, pop_dicts, seir_params
+    ):
+        HarvardEpi.seir(
+            pop_dict,
+            model_parameters,
+            params["beta"],
+            params["alpha"],
+            params["gamma"],
+            params["rho"],
+            params["mu"],
+        )
+    individual = time.perf_counter() - start
+
+    start = time.perf_counter()
+    HarvardEpi.seir_batch(
+        [
+            HarvardEpi.initial_conditions(pop_dict, model_parameters)
+            for model_parameters, pop_dict in zip(all_parameters, pop_dicts)
+        ],
+        seir_params,
+        [pop_dict["total"] for pop_dict in pop_dicts],
+    )
+    batched = time.perf_counter() - start
+    return individual, batched
+
+
+def main():
+    for name, overrides in MODES.items():
+        model_parameters = dict(BASE_MODEL_PARAMETERS, **overrides)
+        print(f"{name:24} {solves_per_second(model_parameters):8.1f} solves/s")
+
+    print()
+    for num_regions in [10, 100, 1000, 3000]:
+        individual, batched = time_regions(num_regions)
+        print(
+            f"{num_regions:5} regions: {individual:7.3f}s individually, "
+            f"{batched:7.3f}s batched"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Times the SIR model solving many regions one at a time vs. as one batched
+system, the cheap first pass before running the SEIR model.
+
+Run from the repository root:
+
+    python -m benchmarks.sir_screen
+"""
+import time
+
+import numpy
+
+from libs.epi_models import SIR
+
+POP_DICT = {"total": 1000000, "infected": 400, "recovered": 10, "deaths": 2}
+
+
+def region_inputs(num_regions):
+    populations = numpy.linspace(5e3, 1e7, num_regions).astype(int)
+    pop_dicts = [
+        dict(POP_DICT, total=population, infected=max(population // 2500, 1))
+        for population in populations
+    ]
+    seir_params = [
+        SIR.generate_epi_params({"r0": r0, "hospital_time_recovery": 6})
+        for r0 in numpy.linspace(1.2, 3.0, num_regions)
+    ]
+    return pop_dicts, seir_params
+
+
+def time_regions(num_regions):
+    pop_dicts, seir_params = region_inputs(num_regions)
+
+    start = time.perf_counter()
+    for pop_dict, params in zip(pop_dicts, seir_params):
+        SIR.seir(
+            pop_dict,
+            params["beta"],
+            params["alpha"],
+            params["gamma"],
+            params["rho"],
+            params["mu"],
+        )
+    individual = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SIR.seir_batch(
+        [SIR.initial_conditions(pop_dict) for pop_dict in pop_dicts],
+        seir_params,
+        [pop_dict["total"] for pop_dict in pop_dicts],
+    )
+    batched = time.perf_counter() - start
+    return individual, batched
+
+
+def main():
+    for num_regions in [10, 100, 1000, 3000]:
+        individual, batched = time_regions(num_regions)
+        print(
+            f"{num_regions:5} regions: {individual:7.3f}s individually, "
+            f"{batched:7.3f}s batched"
+        )
+
+
+if __name__ == "__main__":
+    main()
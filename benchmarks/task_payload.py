@@ -0,0 +1,58 @@
+"""Reports the bytes pickled into the pool for each county task, passing the
+datasets with every task vs. setting them up once per worker.
+
+Run from the repository root, with the covid-data-public checkout available:
+
+    python -m benchmarks.task_payload
+"""
+import datetime
+import time
+
+import run
+from libs.datasets import DHBeds
+from libs.datasets import FIPSPopulation
+from libs.datasets import JHUDataset
+from libs.datasets.dataset_utils import AggregationLevel
+
+MIN_DATE = datetime.datetime(2020, 3, 7)
+MAX_DATE = datetime.datetime(2020, 7, 6)
+
+
+def main():
+    beds_data = DHBeds.local().beds()
+    population_data = FIPSPopulation.local().population()
+    timeseries = JHUDataset.local().timeseries()
+    timeseries = timeseries.get_subset(
+        AggregationLevel.COUNTY, after=MIN_DATE, country="USA"
+    )
+    county_keys = timeseries.county_keys()
+    country, state, county, fips = county_keys[0]
+
+    with_datasets = (
+        MIN_DATE,
+        MAX_DATE,
+        country,
+        state,
+        county,
+        fips,
+        timeseries,
+        beds_data,
+        population_data,
+        run.OUTPUT_DIR,
+    )
+    keys_only = (MIN_DATE, MAX_DATE, country, state, county, fips, run.OUTPUT_DIR)
+
+    start = time.perf_counter()
+    before = run.task_payload_bytes(with_datasets)
+    pickle_time = time.perf_counter() - start
+    after = run.task_payload_bytes(keys_only)
+
+    print(f"{len(county_keys)} county tasks")
+    print(f"datasets in every task: {before:12,} bytes/task ({pickle_time:.2f}s)")
+    print(f"datasets per worker:    {after:12,} bytes/task")
+    print(f"total through the pipe: {before * len(county_keys):,} -> ", end="")
+    print(f"{after * len(county_keys):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import git
 import logging
 import math
 from copy import copy
+import numpy as np
 import pandas as pd
 import os.path
 import os
@@ -90,48 +91,44 @@ class Dataset:
         # We need to make sure that the data starts from Mar3, no matter when our records begin
         series = series.sort_values(self.DATE_FIELD).reset_index(drop=True)  # Sort the series by the date of the record
         data_rows = series[series[self.CASE_FIELD] > 0]  # Find those rows that actually have reported cases
-        interval_rows = data_rows[data_rows[self.DATE_FIELD].apply(
-            lambda d: (d - self._START_DATE).days % model_interval == 0
-        )]
+        days_since_start = (data_rows[self.DATE_FIELD] - self._START_DATE).dt.days
+        interval_rows = data_rows[days_since_start % model_interval == 0]
         min_interval_row = interval_rows[interval_rows[self.DATE_FIELD] == interval_rows[self.DATE_FIELD].min()].iloc[0]
         series = series[series[self.DATE_FIELD] >= min_interval_row[self.DATE_FIELD]]
 
         series[self.SYNTHETIC_FIELD] = None  # Create the synthetic record flag field
         # The number of days we need to create to backfill to Mar3
-        synthetic_interval = (series[self.DATE_FIELD].min() - self._START_DATE).days
-        template = series.iloc[0]  # Grab a row for us to copy structure and data from
-        synthetic_data = []
-        pd.set_option('mode.chained_assignment', None)  # Suppress pandas' anxiety. We know what we're doing
-        for i in range(0, synthetic_interval):
-            synthetic_row = template
-            synthetic_row[self.DATE_FIELD] = self._START_DATE + datetime.timedelta(days=i)
-            synthetic_row[self.CASE_FIELD] = 0
-            synthetic_row[self.DEATH_FIELD] = 0
-            synthetic_row[self.RECOVERED_FIELD] = 0
-            synthetic_row[self.SYNTHETIC_FIELD] = 1
-            synthetic_data.append(copy(synthetic_row))  # We need to copy it to prevent alteration by reference
-        pd.set_option('mode.chained_assignment', 'warn')  # Turn the anxiety back on
+        synthetic_interval = max((series[self.DATE_FIELD].min() - self._START_DATE).days, 0)
+        # Copy the first row for structure and data, one per synthetic day
+        synthetic_data = series.iloc[[0] * synthetic_interval].copy()
+        synthetic_data[self.DATE_FIELD] = self._START_DATE + pd.to_timedelta(np.arange(synthetic_interval), unit='D')
+        synthetic_data[self.CASE_FIELD] = 0
+        synthetic_data[self.DEATH_FIELD] = 0
+        synthetic_data[self.RECOVERED_FIELD] = 0
+        synthetic_data[self.SYNTHETIC_FIELD] = 1
         # Take the synthetic data, and glue it to the bottom of the real records
-        return series.append(pd.DataFrame(synthetic_data)).sort_values(self.DATE_FIELD).reset_index(drop=True)
-
-    def step_down(self, i, series, model_interval):
-        # A function to calculate how much to step down the number of cases from the following day
-        #  The goal is for the synthetic cases to halve once every iteration of the model interval.
-        #
-        # interval_rows = data_rows[data_rows[self.DATE_FIELD].apply(lambda d: (d - self.start_date).days % model_interval == 0)]
-        # min_interval_row = interval_rows[interval_rows[self.DATE_FIELD] == interval_rows[self.DATE_FIELD].min()].iloc[0]
-
-        min_row = series[series[self.CASE_FIELD] > 0].min()
-        y = min_row[self.CASE_FIELD] / (math.pow(2, (1 / model_interval)))
-        return y
+        return series.append(synthetic_data).sort_values(self.DATE_FIELD).reset_index(drop=True)
 
     def backfill_synthetic_cases(self, series, model_interval):
-        # Fill in all values prior to the first non-zero values. Use 1/2 following value. Decays into nothing
-        #  sort the dataframe in reverse date order, so we traverse from latest to earliest
-        for a in range(0, len(series)):
-            i = len(series) - a - 1
-            if series.iloc[i][self.CASE_FIELD] == 0:
-                series.at[i, self.CASE_FIELD] = self.step_down(i, series, model_interval)
+        # Fill in all values prior to the first non-zero values. Decays into nothing.
+        #  The goal is for the synthetic cases to halve once every iteration of the model interval: traversing from
+        #  latest to earliest, each zero row is stepped down from the smallest number of cases in the series so far,
+        #  which is the row filled just before it.
+        cases = series[self.CASE_FIELD].to_numpy()
+        zero_rows = np.flatnonzero(cases == 0)[::-1]
+        if not len(zero_rows):
+            return series
+
+        step_down = math.pow(2, (1 / model_interval))
+        smallest = cases[cases > 0].min() if (cases > 0).any() else np.nan
+        # Divide repeatedly rather than by powers of step_down, so every value matches stepping down one row at a
+        #  time exactly.
+        steps = np.divide.accumulate(  # pylint: disable=no-member
+            np.append(smallest, np.full(len(zero_rows), step_down))
+        )
+        cases = cases.astype(float)
+        cases[zero_rows] = steps[1:]
+        series[self.CASE_FIELD] = cases
         return series
 
     def backfill(self, series, model_interval):
@@ -171,18 +168,13 @@ class Dataset:
 
     def combine_state_county_data(self, country, state):
         # Create a single dataset from state and county data, using state data preferentially.
+        timeseries = self.get_all_timeseries()
+        in_state = (timeseries[self.STATE_FIELD] == state) & (timeseries[self.COUNTRY_FIELD] == country)
+        is_county = timeseries[self.COUNTY_FIELD].notna()
         # First, pull all available state data
-        state_data = self.get_all_timeseries()[
-            (self.get_all_timeseries()[self.STATE_FIELD] == state) &
-            (self.get_all_timeseries()[self.COUNTRY_FIELD] == country) &
-            (self.get_all_timeseries()[self.COUNTY_FIELD].isna())
-            ].reset_index(drop=True)
+        state_data = timeseries[in_state & ~is_county].reset_index(drop=True)
         # Second pull all county data for the state
-        county_data = self.get_all_timeseries()[
-            (self.get_all_timeseries()[self.STATE_FIELD] == state) &
-            (self.get_all_timeseries()[self.COUNTRY_FIELD] == country) &
-            (self.get_all_timeseries()[self.COUNTY_FIELD].notna())
-            ][[self.DATE_FIELD, self.COUNTRY_FIELD, self.STATE_FIELD, self.CASE_FIELD, self.DEATH_FIELD, self.RECOVERED_FIELD]].groupby(
+        county_data = timeseries[in_state & is_county][[self.DATE_FIELD, self.COUNTRY_FIELD, self.STATE_FIELD, self.CASE_FIELD, self.DEATH_FIELD, self.RECOVERED_FIELD]].groupby(
             [self.DATE_FIELD, self.COUNTRY_FIELD, self.STATE_FIELD], as_index=False
         )[[self.CASE_FIELD, self.DEATH_FIELD, self.RECOVERED_FIELD]].sum()
 
@@ -190,34 +182,32 @@ class Dataset:
         state_data = state_data.fillna({'deaths': 0})
         county_data = county_data.fillna({'deaths': 0})
 
-        # Fill holes.
-        state_data = state_data.fillna({'deaths': 0})
-        county_data = county_data.fillna({'deaths': 0})
-
         if len(state_data.index) == 0 and len(county_data.index) == 0:
-            self.get_all_timeseries()[(self.get_all_timeseries()["state"] == state)].head()
             raise Exception('No county or state-level date for {}, {}'.format(state, country))
 
-        # Now we fill in whatever gaps we can in the state data using the county data
-        curr_date = max(state_data[self.DATE_FIELD].max(), county_data[self.DATE_FIELD].max()) # Start on the last date of state data we have
-        county_data_to_insert = []
-        while curr_date > self._START_DATE:
-            # If there is no state data for a day, we need to get some country data for the day
-            if len(state_data[state_data[self.DATE_FIELD] == curr_date]) == 0:
-                county_data_for_date = copy(county_data[county_data[self.DATE_FIELD] == curr_date])
-                if len(county_data_for_date) > 0:
-                    county_data_for_date = county_data_for_date.iloc[0]
-                    new_state_row = copy(state_data.iloc[0])  # Copy the first row of the state data to get the right format
-                    new_state_row[self.DATE_FIELD] = county_data_for_date[self.DATE_FIELD]
-                    new_state_row[self.CASE_FIELD] = county_data_for_date[self.CASE_FIELD]
-                    new_state_row[self.DEATH_FIELD] = county_data_for_date[self.DEATH_FIELD]
-                    new_state_row[self.RECOVERED_FIELD] = county_data_for_date[self.RECOVERED_FIELD]
-                    county_data_to_insert.append(copy(new_state_row))
-                else:
-                    # If there's no county data, we're SOL.
-                    _logger.info("NO COUNTY DATA: {}".format(curr_date))
-            curr_date -= datetime.timedelta(days=1)
-        return state_data.append(pd.DataFrame(county_data_to_insert)).sort_values(self.DATE_FIELD)
+        # Now we fill in whatever gaps we can in the state data using the county data, for every day from the last
+        #  date we have back to (but not including) the start date, latest first.
+        last_date = max(state_data[self.DATE_FIELD].max(), county_data[self.DATE_FIELD].max())
+        num_days = 0
+        if not pd.isnull(last_date) and last_date > self._START_DATE:
+            num_days = math.ceil((last_date - self._START_DATE) / datetime.timedelta(days=1))
+        dates = last_date - pd.to_timedelta(np.arange(num_days), unit='D')
+
+        # If there is no state data for a day, we need to get some county data for the day
+        missing_dates = dates[~dates.isin(state_data[self.DATE_FIELD])]
+        has_county_data = missing_dates.isin(county_data[self.DATE_FIELD])
+        for date in missing_dates[~has_county_data]:
+            # If there's no county data, we're SOL.
+            _logger.info("NO COUNTY DATA: {}".format(date))
+
+        fill_dates = missing_dates[has_county_data]
+        county_values = county_data.drop_duplicates(self.DATE_FIELD).set_index(self.DATE_FIELD).loc[fill_dates]
+        # Copy the first row of the state data to get the right format
+        county_data_to_insert = state_data.iloc[[0] * len(fill_dates)].copy()
+        county_data_to_insert[self.DATE_FIELD] = fill_dates
+        for field in [self.CASE_FIELD, self.DEATH_FIELD, self.RECOVERED_FIELD]:
+            county_data_to_insert[field] = county_values[field].values
+        return state_data.append(county_data_to_insert).sort_values(self.DATE_FIELD)
 
     def get_timeseries_by_country_state(self, country, state, model_interval):
         #  Prepare a state-level dataset that uses county data to fill in any potential gaps
@@ -1,5 +1,6 @@
 import logging
 import math
+import numpy as np
 import pandas as pd
 import datetime
 
@@ -9,6 +10,13 @@ _logger = logging.getLogger(__name__)
 class CovidTimeseriesModel:
     # Initializer / Instance Attributes
 
+    # Numeric fields of each cycle that make it into the forecast
+    CYCLE_FIELDS = [
+        'r', 'effective_r', 'newly_infected', 'currently_infected', 'recovered_or_died', 'ending_susceptible',
+        'actual_reported', 'predicted_hospitalized', 'cumulative_infected', 'cumulative_deaths',
+        'available_hospital_beds', 'est_actual_chance_of_infection',
+    ]
+
     def calculate_r(self, current_cycle, previous_cycle, model_parameters):
         # Calculate the r0 value based on the current and past number of confirmed cases
         if current_cycle['cases'] is not None:
@@ -249,32 +257,142 @@ class CovidTimeseriesModel:
             previous_cycle = current_cycle
         return cycle_series
 
+    def iterate_model_arrays(self, model_parameters):
+        """Array engine for iterate_model. Computes the same cycles, but keeps every cycle field in a preallocated
+        NumPy array and looks observed data up by cycle number instead of building a dict per cycle"""
+        cycle_series, model_parameters = self.initialize_parameters(model_parameters)
+        init_cycle = cycle_series[0]
+        num_cycles = max(model_parameters['total_iterations'], 1)
+        rolling_intervals = model_parameters['rolling_intervals_for_current_infected']
+        population = model_parameters['population']
+        hospitalization_rate = model_parameters['hospitalization_rate']
+        case_fatality_rate = model_parameters['case_fatality_rate']
+        case_fatality_rate_overwhelmed = (
+            case_fatality_rate + model_parameters['case_fatality_rate_hospitals_overwhelmed']
+        )
+        max_hospital_beds = (
+            model_parameters['max_hospital_capacity_factor'] * model_parameters['original_available_hospital_beds']
+        )
+        interventions = model_parameters['interventions']
+        intervention_dates = sorted(interventions.keys())[::-1] if interventions is not None else []
+
+        # Pre-index the observed cases by cycle, None when projecting past the data
+        timeseries = model_parameters['timeseries'].drop_duplicates('date')
+        cases_by_date = dict(zip(timeseries['date'], timeseries['cases']))
+        dates = [
+            model_parameters['init_date'] + datetime.timedelta(days=model_parameters['model_interval'] * i)
+            for i in range(num_cycles)
+        ]
+        cases = [init_cycle['cases']] + [cases_by_date.get(date) for date in dates[1:]]
+
+        cycles = {field: np.full(num_cycles, np.nan) for field in self.CYCLE_FIELDS}
+        for field in self.CYCLE_FIELDS:
+            if init_cycle[field] is not None:
+                cycles[field][0] = init_cycle[field]
+        r = cycles['r']
+        effective_r = cycles['effective_r']
+        newly_infected = cycles['newly_infected']
+        currently_infected = cycles['currently_infected']
+        recovered_or_died = cycles['recovered_or_died']
+        ending_susceptible = cycles['ending_susceptible']
+        actual_reported = cycles['actual_reported']
+        predicted_hospitalized = cycles['predicted_hospitalized']
+        cumulative_infected = cycles['cumulative_infected']
+        cumulative_deaths = cycles['cumulative_deaths']
+        available_hospital_beds = cycles['available_hospital_beds']
+        est_actual_chance_of_infection = cycles['est_actual_chance_of_infection']
+
+        for i in range(1, num_cycles):
+            case = cases[i]
+            # Same branches as the calculate_* methods, reading the previous cycle from the arrays
+            if case is not None and cases[i - 1] > 0:
+                r[i] = case / cases[i - 1]
+            else:
+                r[i] = model_parameters['r0']
+
+            susceptible_ratio = ending_susceptible[i - 1] / population
+            for d in intervention_dates:
+                if dates[i] >= d:
+                    effective_r[i] = interventions[d] * susceptible_ratio
+                    break
+            else:
+                effective_r[i] = r[i] * susceptible_ratio
+
+            if newly_infected[i - 1] > 0:
+                newly_infected[i] = newly_infected[i - 1] * effective_r[i]
+            elif case is not None:
+                # The dict engine reads the cycle's own, not yet set, newly infected here
+                raise KeyError('newly_infected')
+            else:
+                newly_infected[i] = 0
+
+            if i == 1:
+                cumulative_infected[i] = newly_infected[i]
+            else:
+                cumulative_infected[i] = cumulative_infected[i - 1] + newly_infected[i]
+
+            # Sum in order, matching summing the last cycles one by one
+            start = max(i - rolling_intervals, 0) if rolling_intervals else 0
+            currently_infected[i] = sum(newly_infected[start:i])
+
+            if i >= rolling_intervals + 1:
+                recovered_or_died[i] = recovered_or_died[i - 1] + newly_infected[i - (rolling_intervals + 1)]
+            else:
+                recovered_or_died[i] = recovered_or_died[i - 1]
+
+            predicted_hospitalized[i] = newly_infected[i] * hospitalization_rate
+
+            if i == 1:
+                cumulative_deaths[i] = cumulative_infected[i] * case_fatality_rate
+            elif not available_hospital_beds[i - 1] < predicted_hospitalized[i]:
+                cumulative_deaths[i] = cumulative_deaths[i - 1] + (newly_infected[i] * case_fatality_rate)
+            else:
+                cumulative_deaths[i] = cumulative_deaths[i - 1] + (newly_infected[i] * case_fatality_rate_overwhelmed)
+
+            if case is not None:
+                est_actual_chance_of_infection[i] = ((case / hospitalization_rate) * 2) / population
+                actual_reported[i] = case
+
+            ending_susceptible[i] = population - (newly_infected[i] + currently_infected[i] + recovered_or_died[i])
+
+            available_hospital_beds[i] = available_hospital_beds[i - 1]
+            if i >= 3 and available_hospital_beds[i] < max_hospital_beds:
+                available_hospital_beds[i] *= model_parameters['hospital_capacity_change_daily_rate']
+
+        cycles['date'] = dates
+        return cycles
+
     def forecast(self, model_parameters):
-        cycle_series = self.iterate_model(model_parameters)
+        if model_parameters.get('array_engine'):
+            cycles = self.iterate_model_arrays(model_parameters)
+        else:
+            cycle_series = self.iterate_model(model_parameters)
+            cycles = {field: [s[field] for s in cycle_series] for field in ['date'] + self.CYCLE_FIELDS}
+        num_cycles = len(cycles['date'])
         return pd.DataFrame({
-            'Note': ['' for s in cycle_series],
-            'Date': [s['date'] for s in cycle_series],
+            'Note': ['' for _ in range(num_cycles)],
+            'Date': cycles['date'],
             'Timestamp': [
                 # Create a UNIX timestamp for each datetime. Easier for graphs to digest down the road
-                datetime.datetime(year=s['date'].year, month=s['date'].month, day=s['date'].day).timestamp()
-                for s in cycle_series
+                datetime.datetime(year=d.year, month=d.month, day=d.day).timestamp()
+                for d in cycles['date']
             ],
-            'R': [s['r'] for s in cycle_series],
-            'Effective R.': [s['effective_r'] for s in cycle_series],
-            'Beg. Susceptible': [s['ending_susceptible'] for s in cycle_series],
-            'New Inf.': [s['newly_infected'] for s in cycle_series],
-            'Curr. Inf.': [s['currently_infected'] for s in cycle_series],
-            'Recov. or Died': [s['recovered_or_died'] for s in cycle_series],
-            'End Susceptible': [s['ending_susceptible'] for s in cycle_series],
-            'Actual Reported': [s['actual_reported'] for s in cycle_series],
-            'Pred. Hosp.': [s['predicted_hospitalized'] for s in cycle_series],
-            'Cum. Inf.': [s['cumulative_infected'] for s in cycle_series],
-            'Cum. Deaths': [s['cumulative_deaths'] for s in cycle_series],
-            'Avail. Hosp. Beds': [s['available_hospital_beds'] for s in cycle_series],
-            'S&P 500': [None for s in cycle_series],
-            'Est. Actual Chance of Inf.': [s['est_actual_chance_of_infection'] for s in cycle_series],
-            'Pred. Chance of Inf.': [None for s in cycle_series],
-            'Cum. Pred. Chance of Inf.': [None for s in cycle_series],
-            'R0': [None for s in cycle_series],
-            '% Susceptible': [None for s in cycle_series]
+            'R': cycles['r'],
+            'Effective R.': cycles['effective_r'],
+            'Beg. Susceptible': cycles['ending_susceptible'],
+            'New Inf.': cycles['newly_infected'],
+            'Curr. Inf.': cycles['currently_infected'],
+            'Recov. or Died': cycles['recovered_or_died'],
+            'End Susceptible': cycles['ending_susceptible'],
+            'Actual Reported': cycles['actual_reported'],
+            'Pred. Hosp.': cycles['predicted_hospitalized'],
+            'Cum. Inf.': cycles['cumulative_infected'],
+            'Cum. Deaths': cycles['cumulative_deaths'],
+            'Avail. Hosp. Beds': cycles['available_hospital_beds'],
+            'S&P 500': [None for _ in range(num_cycles)],
+            'Est. Actual Chance of Inf.': cycles['est_actual_chance_of_infection'],
+            'Pred. Chance of Inf.': [None for _ in range(num_cycles)],
+            'Cum. Pred. Chance of Inf.': [None for _ in range(num_cycles)],
+            'R0': [None for _ in range(num_cycles)],
+            '% Susceptible': [None for _ in range(num_cycles)]
         })
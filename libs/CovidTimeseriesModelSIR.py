@@ -9,6 +9,8 @@ import pandas as pd
 
 from .epi_models.HarvardEpi import (
     seir,
+    seir_schedule,
+    steps_between,
     dataframe_ify,
     generate_epi_params,
     harvard_model_params,
@@ -16,6 +18,8 @@ from .epi_models.HarvardEpi import (
     generate_r0,
     brute_force_r0,
 )
+from .epi_models.segment_cache import SegmentCache
+from .model_results import ModelResults
 
 # from .epi_models.SIR import (
 #    seir,
@@ -25,6 +29,10 @@ from .epi_models.HarvardEpi import (
 #    brute_force_r0,
 # )
 
+# shared by every model run in the process, so the intervention scenarios for a
+# region reuse the segments they have in common
+SEGMENT_CACHE = SegmentCache(maxsize=128)
+
 
 class CovidTimeseriesModelSIR:
     # Initializer / Instance Attributes
@@ -56,6 +64,11 @@ class CovidTimeseriesModelSIR:
 
         return model_parameters
 
+    def segment_cache(self, model_parameters):
+        if model_parameters.get("cache_segments", False):
+            return SEGMENT_CACHE
+        return None
+
     # get the largest key (intervention date) that is less than the init_date and reurn the relevant r0
     def get_latest_past_intervention(self, interventions, init_date):
         past_dates = [
@@ -132,6 +145,8 @@ class CovidTimeseriesModelSIR:
                     new_seir_params["gamma"],
                     new_seir_params["rho"],
                     new_seir_params["mu"],
+                    cache=self.segment_cache(model_parameters),
+                    steps=steps_between(date, end_date),
                 )
 
                 new_df = dataframe_ify(data, date, end_date, steps,)
@@ -156,6 +171,115 @@ class CovidTimeseriesModelSIR:
 
         return (combined_df, counterfactuals)
 
+    def intervention_beta_schedule(
+        self, model_parameters, seir_params, model_seir_init, r0
+    ):
+        """Turns the interventions into the piecewise-constant beta schedule
+        seir_schedule integrates in one pass, as [(day, beta), ...] with days
+        counted from init_date"""
+        interventions = model_parameters["interventions"]
+        init_date = model_parameters["init_date"]
+        end_date = model_parameters["last_date"]
+
+        beta_schedule = [(0, seir_params["beta"])]
+
+        for date, new_r0 in sorted(interventions.items()):
+            if (pd.Timestamp(date) >= init_date) and (pd.Timestamp(date) <= end_date):
+                if new_r0 is None:
+                    new_r0 = generate_r0(
+                        model_seir_init, model_parameters["population"]
+                    )
+
+                new_seir_params = brute_force_r0(
+                    seir_params, new_r0, r0, model_parameters["population"]
+                )
+
+                day = (pd.Timestamp(date) - init_date).days
+                beta_schedule.append((day, new_seir_params["beta"]))
+
+        return beta_schedule
+
+    def initial_seir_params(self, model_parameters, init_date):
+        """Picks the SEIR params the model starts from, adjusted for the latest
+        intervention already in effect on init_date. Returns the params and the
+        unadjusted ones a "return to normal" intervention goes back to"""
+        model_seir_init = None
+
+        if model_parameters["use_harvard_params"]:
+            init_params = harvard_model_params(model_parameters["population"])
+        elif model_parameters["fix_r0"]:
+            init_params = r0_24_params(model_parameters["population"])
+        else:
+            init_params = generate_epi_params(model_parameters)
+
+            if model_parameters["interventions"] is not None:
+                new_r0 = self.get_latest_past_intervention(
+                    model_parameters["interventions"], init_date
+                )
+
+                # keep these in case we need to go back due to a final
+                # "return to normal" intervention
+                model_seir_init = init_params.copy()
+
+                if new_r0 is not None:
+                    init_params = brute_force_r0(
+                        init_params,
+                        new_r0,
+                        generate_r0(init_params, model_parameters["population"]),
+                        model_parameters["population"],
+                    )
+
+        return init_params, model_seir_init
+
+    def solve_initial_segment(
+        self, model_parameters, pop_dict, init_params, model_seir_init, r0
+    ):
+        """Runs the model from init_date to last_date. Returns seir's
+        (data, steps, ret) and whether the interventions were already solved
+        in the same pass"""
+        # single pass: the interventions become a beta(t) schedule for one
+        # integration rather than restarting the model at each intervention.
+        # The state carries straight through each intervention date, where the
+        # restarts re-derive exposed from infected_a and truncate to whole
+        # people, so the two modes drift apart slightly after the first one.
+        single_pass = (
+            model_parameters.get("single_pass_interventions", False)
+            and model_parameters["interventions"] is not None
+            and model_parameters["model"] == "seir"
+        )
+
+        horizon = steps_between(
+            model_parameters["init_date"], model_parameters["last_date"]
+        )
+
+        if single_pass:
+            (data, steps, ret) = seir_schedule(
+                pop_dict,
+                model_parameters,
+                self.intervention_beta_schedule(
+                    model_parameters, init_params, model_seir_init, r0
+                ),
+                init_params["alpha"],
+                init_params["gamma"],
+                init_params["rho"],
+                init_params["mu"],
+                steps=horizon,
+            )
+        else:
+            (data, steps, ret) = seir(
+                pop_dict,
+                model_parameters,
+                init_params["beta"],
+                init_params["alpha"],
+                init_params["gamma"],
+                init_params["rho"],
+                init_params["mu"],
+                cache=self.segment_cache(model_parameters),
+                steps=horizon,
+            )
+
+        return (data, steps, ret, single_pass)
+
     def iterate_model(self, model_parameters):
         """The guts. Creates the initial conditions, and runs the SIR model for the
         specified number of iterations with the given inputs"""
@@ -198,40 +322,14 @@ class CovidTimeseriesModelSIR:
                 model_parameters["exposed_infected_ratio"] * pop_dict["infected"]
             )
 
-        if model_parameters["use_harvard_params"]:
-            init_params = harvard_model_params(model_parameters["population"])
-        elif model_parameters["fix_r0"]:
-            init_params = r0_24_params(model_parameters["population"])
-        else:
-            init_params = generate_epi_params(model_parameters)
-
-            if model_parameters["interventions"] is not None:
-                new_r0 = self.get_latest_past_intervention(
-                    model_parameters["interventions"], init_date
-                )
-
-                # keep these in case we need to go back due to a final
-                # "return to normal" intervention
-                model_seir_init = init_params.copy()
-
-                if new_r0 is not None:
-                    init_params = brute_force_r0(
-                        init_params,
-                        new_r0,
-                        generate_r0(init_params, model_parameters["population"]),
-                        model_parameters["population"],
-                    )
+        init_params, model_seir_init = self.initial_seir_params(
+            model_parameters, init_date
+        )
 
         r0 = generate_r0(init_params, model_parameters["population"])
 
-        (data, steps, ret) = seir(
-            pop_dict,
-            model_parameters,
-            init_params["beta"],
-            init_params["alpha"],
-            init_params["gamma"],
-            init_params["rho"],
-            init_params["mu"],
+        (data, steps, ret, single_pass) = self.solve_initial_segment(
+            model_parameters, pop_dict, init_params, model_seir_init, r0
         )
 
         # this dataframe should start on the last day of the actual data
@@ -293,7 +391,11 @@ class CovidTimeseriesModelSIR:
 
         combined_df = pd.concat([actuals, sir_df])
 
-        if model_parameters["interventions"] is not None:
+        if single_pass:
+            # run_interventions' appends leave the columns sorted, match that
+            combined_df = combined_df.loc[:, sorted(combined_df.columns)]
+
+        if model_parameters["interventions"] is not None and not single_pass:
             (combined_df, counterfactuals) = self.run_interventions(
                 model_parameters, combined_df, init_params, model_seir_init, r0
             )
@@ -342,3 +444,218 @@ class CovidTimeseriesModelSIR:
         cycle_series = self.iterate_model(model_parameters)
 
         return cycle_series
+
+    def model_segment(self, model_parameters, data, start, steps, restart=False):
+        """ModelResults equivalent of dataframe_ify, with the columns iterate_model
+        fills in for the segment. Segments from run_interventions leave total,
+        susceptible and infected empty, as DataFrame.append does there"""
+        dates = np.datetime64(pd.Timestamp(start), "ns") + np.arange(steps).astype(
+            "timedelta64[D]"
+        )
+        # drop anything after the end day
+        rows = int(
+            np.searchsorted(
+                dates, np.datetime64(model_parameters["last_date"], "ns"), "right"
+            )
+        )
+        exposed, infected_a, infected_b, infected_c, recovered, dead = np.asarray(data)[
+            :, :rows
+        ]
+
+        empty = np.full(rows, np.nan)
+        if restart:
+            total, susceptible, infected = empty, empty, empty
+        else:
+            total = np.full(rows, model_parameters["population"])
+            susceptible = np.zeros(rows)
+            infected = empty
+            if model_parameters["model"] == "seir":
+                infected = infected_a + infected_b + infected_c
+
+        return ModelResults(
+            dates[:rows],
+            {
+                "total": total,
+                "susceptible": susceptible,
+                "exposed": exposed,
+                "infected": infected,
+                "infected_a": infected_a,
+                "infected_b": infected_b,
+                "infected_c": infected_c,
+                "recovered": recovered,
+                "dead": dead,
+            },
+        )
+
+    def run_interventions_arrays(
+        self, model_parameters, segments, seir_params, model_seir_init, r0
+    ):
+        """run_interventions on a list of ModelResults segments. Each restart
+        keeps the rows up to and including the intervention date and adds the
+        new segment after them, so the rows match the DataFrame version,
+        including the repeated intervention date"""
+        interventions = model_parameters["interventions"]
+        end_date = model_parameters["last_date"]
+
+        for date, new_r0 in interventions.items():
+            if (pd.Timestamp(date) >= model_parameters["init_date"]) and (
+                pd.Timestamp(date) <= end_date
+            ):
+                if new_r0 is None:
+                    new_r0 = generate_r0(
+                        model_seir_init, model_parameters["population"]
+                    )
+
+                new_seir_params = brute_force_r0(
+                    seir_params, new_r0, r0, model_parameters["population"]
+                )
+
+                # equivalent of .loc[:date], the segments are in date order
+                cutoff = np.datetime64(pd.Timestamp(date), "ns")
+                while segments[-1].dates[0] > cutoff:
+                    segments.pop()
+                last = segments[-1].head(
+                    int(np.searchsorted(segments[-1].dates, cutoff, "right"))
+                )
+                segments[-1] = last
+                if last.dates[-1] != cutoff:
+                    raise KeyError(date)
+
+                pop_dict = {
+                    "total": model_parameters["population"],
+                    "exposed": last["exposed"][-1],
+                    "infected": last["infected"][-1],
+                    "recovered": last["recovered"][-1],
+                    "deaths": last["dead"][-1],
+                }
+
+                if model_parameters["model"] == "seir":
+                    pop_dict["infected_a"] = last["infected_a"][-1]
+                    pop_dict["infected_b"] = last["infected_b"][-1]
+                    pop_dict["infected_c"] = last["infected_c"][-1]
+
+                (data, steps, ret) = seir(
+                    pop_dict,
+                    model_parameters,
+                    new_seir_params["beta"],
+                    new_seir_params["alpha"],
+                    new_seir_params["gamma"],
+                    new_seir_params["rho"],
+                    new_seir_params["mu"],
+                    cache=self.segment_cache(model_parameters),
+                    steps=steps_between(date, end_date),
+                )
+
+                segments.append(
+                    self.model_segment(model_parameters, data, date, steps, True)
+                )
+
+        return segments
+
+    def iterate_model_arrays(self, model_parameters):
+        """iterate_model without the intermediate DataFrames. Returns the same
+        rows and columns as a ModelResults, built straight from the solver
+        output, plus seir's raw result"""
+        timeseries = model_parameters["timeseries"].sort_values("date")
+        model_parameters["timeseries"] = timeseries
+        model_parameters = self.initialize_parameters(model_parameters)
+
+        # calc values if missing
+        cases, deaths, recovered = [
+            timeseries[column].fillna(0).values
+            for column in ["cases", "deaths", "recovered"]
+        ]
+        active = cases - deaths - recovered
+        days = pd.to_datetime(timeseries["date"]).values.astype("datetime64[D]")
+
+        init_date = model_parameters["init_date"].to_pydatetime().date()
+
+        # load the initial populations
+        pop_dict = {
+            "total": model_parameters["population"],
+            "infected": active[-1],
+            "recovered": recovered[-1],
+            "deaths": deaths[-1],
+        }
+
+        if model_parameters["exposed_from_infected"]:
+            pop_dict["exposed"] = (
+                model_parameters["exposed_infected_ratio"] * pop_dict["infected"]
+            )
+
+        init_params, model_seir_init = self.initial_seir_params(
+            model_parameters, init_date
+        )
+
+        r0 = generate_r0(init_params, model_parameters["population"])
+
+        (data, steps, ret, single_pass) = self.solve_initial_segment(
+            model_parameters, pop_dict, init_params, model_seir_init, r0
+        )
+
+        # kill last row that is initial conditions on SEIR
+        history = len(days) - 1
+        actuals = ModelResults(
+            days[:history].astype("datetime64[ns]"),
+            {
+                "total": np.full(history, model_parameters["population"]),
+                "susceptible": np.zeros(history, dtype=int),
+                "exposed": np.zeros(history, dtype=int),
+                "infected": active[:history],
+                "infected_a": np.zeros(history, dtype=int),
+                "infected_b": np.zeros(history, dtype=int),
+                "infected_c": np.zeros(history, dtype=int),
+                "recovered": recovered[:history],
+                "dead": deaths[:history],
+            },
+        )
+
+        segments = [
+            actuals,
+            self.model_segment(
+                model_parameters, data, model_parameters["init_date"], steps
+            ),
+        ]
+
+        # the appends in run_interventions leave the columns sorted
+        sort_columns = single_pass
+
+        if model_parameters["interventions"] is not None and not single_pass:
+            restarts = len(segments)
+            segments = self.run_interventions_arrays(
+                model_parameters, segments, init_params, model_seir_init, r0
+            )
+            sort_columns = len(segments) != restarts
+
+        results = ModelResults.concatenate(segments)
+        if sort_columns:
+            results.columns = {
+                name: results.columns[name] for name in sorted(results.columns)
+            }
+
+        results["total"] = pop_dict["total"]
+
+        # move the actual infected numbers into infected_a where its NA
+        results["infected_a"] = np.where(
+            np.isnan(results["infected_a"]), results["infected"], results["infected_a"]
+        )
+
+        results["susceptible"] = results["total"] - (
+            results["exposed"]
+            + results["infected"]
+            + results["recovered"]
+            + results["dead"]
+        )
+
+        infected_b = results["infected_b"]
+        previous = np.concatenate([[np.nan], infected_b[:-1]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results["pct_change"] = infected_b / previous - 1
+            results["doubling_time"] = math.log(2) / results["pct_change"]
+
+        results["beds"] = model_parameters["beds"]
+
+        return [results, ret]
+
+    def forecast_region_arrays(self, model_parameters):
+        return self.iterate_model_arrays(model_parameters)
@@ -34,6 +34,7 @@ class CovidUtil:
             'initial_hospital_bed_utilization': .6,
             'model_interval': 4,  # In days
             'total_infected_period': 12,  # In days
+            'array_engine': True,  # Same results as the dict per cycle engine, much faster
         }
         MODEL_PARAMETERS = self.initialize_model_parameters(MODEL_PARAMETERS)
         return CovidTimeseriesModel().forecast(model_parameters=MODEL_PARAMETERS)
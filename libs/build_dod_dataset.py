@@ -9,6 +9,7 @@ import simplejson
 from urllib.parse import urlparse
 
 from .build_params import OUTPUT_DIR
+from .results_bundle import BUNDLE_NAME, ResultsBundle, is_current, results_file_name
 from .CovidDatasets import get_public_data_base_url
 from .us_state_abbrev import us_state_abbrev, us_fips
 
@@ -61,20 +62,30 @@ def get_projections_df():
     #save results in a list of lists, converted to df later
     results = []
 
+    # read from the bundle when the run wrote one, instead of every json file,
+    # unless results were written since it was built
+    bundle_path = os.path.join(OUTPUT_DIR, BUNDLE_NAME)
+    bundle = ResultsBundle(bundle_path) if is_current(OUTPUT_DIR) else None
+
     for state in list(us_state_abbrev.values()):
-        file_name = f"{state}.{intervention_type}.json"
+        file_name = results_file_name(state, intervention_type)
         path = os.path.join(OUTPUT_DIR, file_name)
 
+        projection = None
+        if bundle is not None:
+            if file_name in bundle:
+                projection = bundle.rows(state, intervention_type)
         # if the file exists in that directory then process
-        if os.path.exists(path):
+        if projection is None and os.path.exists(path):
             with open(path, "r") as projections:
                 # note that the projections have an extra column vs the web data
                 projection =  simplejson.load(projections)
 
-                hosp_16_days, short_fall_16_days = get_hospitals_and_shortfalls(projection, sixteen_days)
-                hosp_32_days, short_fall_32_days = get_hospitals_and_shortfalls(projection, thirty_two_days)
+        if projection is not None:
+            hosp_16_days, short_fall_16_days = get_hospitals_and_shortfalls(projection, sixteen_days)
+            hosp_32_days, short_fall_32_days = get_hospitals_and_shortfalls(projection, thirty_two_days)
 
-                results.append([state, hosp_16_days, hosp_32_days, short_fall_16_days, short_fall_32_days])
+            results.append([state, hosp_16_days, hosp_32_days, short_fall_16_days, short_fall_32_days])
    
     headers = [
         'State',
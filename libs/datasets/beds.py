@@ -99,7 +99,7 @@ class BedsDataset(object):
         fips_data = dataset_utils.build_fips_data_frame()
         data = dataset_utils.add_county_using_fips(data, fips_data)
 
-        return cls(data)
+        return cls(dataset_utils.make_categorical(data))
 
     def get_state_level(self, state) -> Optional[int]:
         """Get beds for a specific state.
@@ -109,8 +109,12 @@ class BedsDataset(object):
 
         Returns: Beds for a state.
         """
-        state_filter = self.state_data.state == state
-        beds = self.state_data[state_filter]
+        beds = dataset_utils.region_index(self).lookup(
+            **{
+                self.Fields.AGGREGATE_LEVEL: AggregationLevel.STATE.value,
+                self.Fields.STATE: state,
+            }
+        )
 
         if len(beds):
             return beds.iloc[0][self.Fields.MAX_BED_COUNT]
@@ -129,14 +133,16 @@ class BedsDataset(object):
         if not (county or fips) or (county and fips):
             raise ValueError("Must only pass fips or county")
 
-        data = self.county_data
-        state_filter = data.state == state
+        filters = {
+            self.Fields.AGGREGATE_LEVEL: AggregationLevel.COUNTY.value,
+            self.Fields.STATE: state,
+        }
         if fips:
-            location_filter = data.fips == fips
+            filters[self.Fields.FIPS] = fips
         elif county:
-            location_filter = data.county == county
+            filters[self.Fields.COUNTY] = county
 
-        beds = data[state_filter & location_filter]
+        beds = dataset_utils.region_index(self).lookup(**filters)
         if len(beds):
             return beds.iloc[0][self.Fields.MAX_BED_COUNT]
 
@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import pathlib
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    from pyarrow import feather
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+CACHE_DIR = pathlib.Path(
+    os.getenv(
+        "DATASET_CACHE_DIR", pathlib.Path(__file__).parent.parent.parent / ".cache"
+    )
+)
+
+# Bump when the way a cached frame is built changes, so stale caches built by
+# older code are not read back.
+CACHE_VERSION = 3
+
+_logger = logging.getLogger(__name__)
+
+
+def file_stamp(path: pathlib.Path) -> List[int]:
+    """Size and modification time of a file, changes whenever it does."""
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class IncrementalCache(object):
+    """Feather cache of a frame built from many input files.
+
+    Next to the frame, a manifest records the size and modification time of
+    every input file it was built from. Callers compare the current inputs
+    against it with `stale_paths` and `removed_names`, rebuild only the rows
+    coming from those files, and `write` the updated frame back.
+
+    Frames are written with a default RangeIndex, and missing strings read
+    back as NaN as they would from read_csv.
+    """
+
+    def __init__(self, name: str, cache_dir: pathlib.Path = None):
+        self.name = name
+        cache_dir = pathlib.Path(cache_dir or CACHE_DIR)
+        self.data_path = cache_dir / f"{name}.feather"
+        self.manifest_path = cache_dir / f"{name}.manifest.json"
+        self.manifest = self._read_manifest()
+
+    @property
+    def enabled(self) -> bool:
+        return pyarrow is not None
+
+    def _read_manifest(self) -> dict:
+        if not self.manifest_path.exists() or not self.data_path.exists():
+            return {}
+        with self.manifest_path.open() as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CACHE_VERSION:
+            return {}
+        return manifest["files"]
+
+    def stale_paths(self, paths: List[pathlib.Path]) -> List[pathlib.Path]:
+        """Input files that are new or changed since the cached frame was built."""
+        return [
+            path for path in paths if self.manifest.get(path.name) != file_stamp(path)
+        ]
+
+    def removed_names(self, paths: List[pathlib.Path]) -> List[str]:
+        """Names of input files the cached frame was built from that are gone."""
+        names = {path.name for path in paths}
+        return sorted(name for name in self.manifest if name not in names)
+
+    def read(self) -> Optional[pd.DataFrame]:
+        """Returns the cached frame, or None if there isn't one."""
+        if not self.enabled or not self.manifest:
+            return None
+
+        data = feather.read_table(pyarrow.memory_map(str(self.data_path))).to_pandas()
+        # Missing strings come back as None, use NaN as read_csv does.
+        for column in data.columns[data.dtypes == object]:
+            data.loc[data[column].isnull(), column] = np.nan
+        return data
+
+    def write(self, data: pd.DataFrame, paths: List[pathlib.Path]):
+        """Caches `data` as built from the current contents of `paths`."""
+        if not self.enabled:
+            _logger.debug(f"pyarrow is not installed, not caching {self.name}")
+            return
+
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.data_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            data.reset_index(drop=True).to_feather(temp_path)
+        except (pyarrow.ArrowException, ValueError) as e:
+            _logger.warning(f"Could not cache {self.name}: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+            return
+
+        # Manifest is dropped first and written last, so an interrupted write
+        # never pairs a manifest with the wrong frame.
+        if self.manifest_path.exists():
+            self.manifest_path.unlink()
+        os.replace(temp_path, self.data_path)
+
+        self.manifest = {path.name: file_stamp(path) for path in paths}
+        temp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with temp_path.open("w") as f:
+            json.dump({"version": CACHE_VERSION, "files": self.manifest}, f)
+        os.replace(temp_path, self.manifest_path)
+        _logger.info(f"Cached {self.name} to {self.data_path}")
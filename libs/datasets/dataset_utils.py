@@ -1,6 +1,7 @@
 import enum
 import logging
 import pathlib
+import numpy as np
 import pandas as pd
 from libs import build_params
 
@@ -16,6 +17,40 @@ class AggregationLevel(enum.Enum):
     COUNTY = "county"
 
 
+# Region and label columns shared by the generic datasets. Each has a handful
+# of distinct values repeated over every row.
+CATEGORICAL_FIELDS = [
+    "country",
+    "state",
+    "county",
+    "fips",
+    "source",
+    "aggregate_level",
+]
+
+
+def make_categorical(data: pd.DataFrame, fields=CATEGORICAL_FIELDS) -> pd.DataFrame:
+    """Converts string columns in `fields` to categoricals.
+
+    Equality filters on a categorical compare integer codes instead of
+    strings, and each distinct string is only stored once.
+
+    Note: Group by categorical columns with `observed=True`, otherwise every
+    combination of categories is returned.
+
+    Args:
+        data: DataFrame
+        fields: Columns to convert, missing columns are skipped.
+
+    Returns: New DataFrame with categorical columns.
+    """
+    data = data.copy()
+    for field in fields:
+        if field in data.columns and data[field].dtype == object:
+            data[field] = data[field].astype("category")
+    return data
+
+
 def strip_whitespace(data: pd.DataFrame) -> pd.DataFrame:
     """Removes all whitespace from string values.
 
@@ -26,8 +61,52 @@ def strip_whitespace(data: pd.DataFrame) -> pd.DataFrame:
 
     Returns: New DataFrame with no whitespace.
     """
-    # Remove all whitespace
-    return data.applymap(lambda x: x.strip() if type(x) == str else x)
+    data = data.copy()
+    for column in data.columns[data.dtypes == object]:
+        data[column] = map_strings(data[column], "strip")
+    return data
+
+
+def map_strings(values: pd.Series, method: str, *args) -> pd.Series:
+    """Applies a string method to the string values of a series.
+
+    Vectorized equivalent of
+    `values.apply(lambda x: getattr(x, method)(*args) if type(x) == str else x)`,
+    including the dtype `apply` infers for the result.
+
+    Args:
+        values: Series to transform.
+        method: Name of a `Series.str` method, such as "strip" or "zfill".
+        *args: Arguments to the method.
+
+    Returns: New Series with string values transformed, others left as is.
+    """
+    try:
+        transformed = getattr(values.str, method)(*args)
+    except AttributeError:
+        # No string values at all
+        return values.infer_objects()
+    # .str gives NaN for anything that isn't a string, keep those values.
+    return values.where(transformed.isnull(), transformed).infer_objects()
+
+
+def map_unique_values(values: pd.Series, function) -> pd.Series:
+    """Applies `function` once per distinct value of a series.
+
+    Equivalent to `values.apply(function)` for series with many repeated
+    values, such as region names, where calling the function on every row
+    dominates.
+    """
+    codes, uniques = pd.factorize(values)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [function(value) for value in uniques]
+
+    result = values.to_numpy(dtype=object, copy=True)
+    has_value = codes >= 0
+    result[has_value] = mapped[codes[has_value]]
+    # factorize skips missing values, map those one by one
+    result[~has_value] = [function(value) for value in result[~has_value]]
+    return pd.Series(result, index=values.index, name=values.name).infer_objects()
 
 
 def parse_county_from_state(state):
@@ -48,7 +127,7 @@ def parse_state(state):
 
 
 def plot_grouped_data(data, group, series="source", values="cases"):
-    data_by_source = data.groupby(group).sum().reset_index()
+    data_by_source = data.groupby(group, observed=True).sum().reset_index()
     cases_by_source = data_by_source.pivot_table(
         index=["date"], columns=series, values=values
     ).fillna(0)
@@ -91,8 +170,10 @@ def check_index_values_are_unique(data):
 def compare_datasets(
     base, other, group, first_name="first", other_name="second", values="cases"
 ):
-    other = other.groupby(group).sum().reset_index().set_index(group)
-    base = base.groupby(group).sum().reset_index().set_index(group)
+    other = other.groupby(group, observed=True).sum()
+    other = other.reset_index().set_index(group)
+    base = base.groupby(group, observed=True).sum()
+    base = base.reset_index().set_index(group)
     # Filling missing values
     base.loc[:, values] = base[values].fillna(0)
     other.loc[:, values] = other[values].fillna(0)
@@ -127,7 +208,7 @@ def aggregate_and_get_nonmatching(
 ):
 
     from_data = data[data.aggregate_level == from_aggregation.value]
-    new_data = from_data.groupby(groupby_fields).sum().reset_index()
+    new_data = from_data.groupby(groupby_fields, observed=True).sum().reset_index()
     new_data["aggregate_level"] = to_aggregation.value
     new_data = new_data.set_index(groupby_fields)
 
@@ -138,6 +219,85 @@ def aggregate_and_get_nonmatching(
     return non_matching
 
 
+class RegionIndex(object):
+    """Positional index over the region columns of a dataset.
+
+    Filtering with `data.state == state` scans the whole table on every call.
+    This builds a mapping from each distinct combination of the queried columns
+    to the positions of its rows the first time those columns are queried, so
+    every lookup after that is a dictionary access.
+
+    Rows come back in their original order, matching the equivalent boolean
+    filter. Missing values never match, as with `==`.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self._field_codes = {}
+        self._indexes = {}
+
+    def _codes(self, field):
+        if field not in self._field_codes:
+            values = self.data[field]
+            if pd.api.types.is_categorical_dtype(values):
+                # Categorical columns already carry their codes
+                codes = values.cat.codes.to_numpy()
+                uniques = values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            lookup = {value: code for code, value in enumerate(uniques)}
+            self._field_codes[field] = (codes, lookup)
+        return self._field_codes[field]
+
+    def _index(self, fields):
+        if fields not in self._indexes:
+            field_codes = [self._codes(field) for field in fields]
+            # factorize marks missing values as -1, shift so they get a slot
+            shape = tuple(len(lookup) + 1 for _, lookup in field_codes)
+            keys = np.ravel_multi_index(
+                tuple(codes + 1 for codes, _ in field_codes), shape
+            )
+            order = np.argsort(keys, kind="stable")
+            group_keys, starts = np.unique(keys[order], return_index=True)
+            positions = np.split(order, starts[1:])
+            self._indexes[fields] = (shape, dict(zip(group_keys.tolist(), positions)))
+        return self._indexes[fields]
+
+    def positions(self, **values) -> np.ndarray:
+        """Returns positions of rows where every given column equals its value."""
+        fields = tuple(sorted(values))
+        shape, index = self._index(fields)
+
+        codes = []
+        for field in fields:
+            _, lookup = self._codes(field)
+            code = lookup.get(values[field])
+            if code is None:
+                return np.array([], dtype=int)
+            codes.append(code + 1)
+
+        key = int(np.ravel_multi_index(tuple(codes), shape))
+        return index.get(key, np.array([], dtype=int))
+
+    def lookup(self, **values) -> pd.DataFrame:
+        """Returns rows where every given column equals its value."""
+        if not values:
+            return self.data
+        return self.data.iloc[self.positions(**values)]
+
+
+def region_index(dataset) -> RegionIndex:
+    """Returns the RegionIndex for a dataset's data, building it on first use.
+
+    Rebuilt if `dataset.data` has been replaced since the last lookup.
+    """
+    index = getattr(dataset, "_region_index", None)
+    if index is None or index.data is not dataset.data:
+        index = RegionIndex(dataset.data)
+        dataset._region_index = index
+    return index
+
+
 def get_state_level_data(data, country, state):
     country_filter = data.country == country
     state_filter = data.state == state
@@ -232,7 +392,7 @@ def summarize(data, aggregate_level, groupby):
 
     data = data[data['aggregate_level'] == aggregate_level.value]
     missing_fips = sum(data.fips.isna())
-    index_size = data.groupby(groupby).size()
+    index_size = data.groupby(groupby, observed=True).size()
     non_unique = index_size > 1
     num_non_unique = sum(non_unique)
     print(key_fmt.format("Aggregate Level:", aggregate_level.value))
@@ -62,10 +62,16 @@ class PopulationDataset(object):
             data = pd.concat([data, non_matching])
 
         data[cls.Fields.POPULATION] = data[cls.Fields.POPULATION].fillna(0)
-        return cls(data)
+        return cls(dataset_utils.make_categorical(data))
 
     def get_state_level(self, country, state):
-        data = dataset_utils.get_state_level_data(self.data, country, state).population
+        data = dataset_utils.region_index(self).lookup(
+            **{
+                self.Fields.COUNTRY: country,
+                self.Fields.STATE: state,
+                self.Fields.AGGREGATE_LEVEL: AggregationLevel.STATE.value,
+            }
+        )[self.Fields.POPULATION]
 
         if len(data):
             return data.iloc[0]
@@ -74,9 +80,19 @@ class PopulationDataset(object):
     def get_county_level(self, country, state, county=None, fips=None):
         if not (county or fips) or (county and fips):
             raise ValueError("Must only pass fips or county")
-        data = dataset_utils.get_county_level_data(
-            self.data, country, state, county=county, fips=fips
-        ).population
+        filters = {
+            self.Fields.COUNTRY: country,
+            self.Fields.STATE: state,
+            self.Fields.AGGREGATE_LEVEL: AggregationLevel.COUNTY.value,
+        }
+        if county:
+            filters[self.Fields.COUNTY] = county
+        else:
+            filters[self.Fields.FIPS] = fips
+
+        data = dataset_utils.region_index(self).lookup(**filters)[
+            self.Fields.POPULATION
+        ]
         if len(data):
             return data.iloc[0]
         return None
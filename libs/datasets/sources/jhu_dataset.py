@@ -1,10 +1,14 @@
+import copy
 import logging
+import pathlib
 import numpy
 import pandas as pd
 from libs.datasets.timeseries import TimeseriesDataset
 from libs.datasets import dataset_utils
+from libs.datasets import dataset_cache
 from libs.datasets import data_source
 from libs.datasets.dataset_utils import AggregationLevel
+from libs.datasets.sources.fips_population import FIPSPopulation
 
 _logger = logging.getLogger(__name__)
 
@@ -56,17 +60,92 @@ class JHUDataset(data_source.DataSource):
     }
 
     def __init__(self, input_dir):
+        self._paths = sorted(input_dir.glob("*.csv"))
+        cache = dataset_cache.IncrementalCache("jhu_daily_reports")
+        data = cache.read()
+        stale_paths = cache.stale_paths(self._paths)
+        removed = cache.removed_names(self._paths)
+
+        if data is None:
+            data = self._load_daily_reports(self._paths)
+            cache.write(data, self._paths)
+        elif stale_paths or removed:
+            _logger.info(
+                f"Updating {len(stale_paths)} daily reports, removing {len(removed)}"
+            )
+            dates = self._report_dates([path.name for path in stale_paths] + removed)
+            data = data[~data[self.Fields.DATE].isin(dates)]
+            if stale_paths:
+                data = pd.concat([data, self._load_daily_reports(stale_paths)])
+            # Stable sort keeps the rows of each report in file order, same as
+            # loading every report in date order.
+            data = data.sort_values(self.Fields.DATE, kind="mergesort")
+            data = data.reset_index(drop=True)
+            cache.write(data, self._paths)
+
+        super().__init__(data)
+
+    @classmethod
+    def _report_dates(cls, names):
+        return pd.to_datetime([pathlib.Path(name).stem for name in names])
+
+    @classmethod
+    def _load_daily_reports(cls, paths) -> pd.DataFrame:
         loaded_data = []
-        for path in sorted(input_dir.glob("*.csv")):
+        for path in paths:
             date = path.stem
             data = pd.read_csv(path, dtype={"FIPS": str})
-            data = data.rename(columns=self.RENAMED_COLUMNS)
-            data[self.Fields.DATE] = pd.to_datetime(date)
+            data = data.rename(columns=cls.RENAMED_COLUMNS)
+            data[cls.Fields.DATE] = pd.to_datetime(date)
             loaded_data.append(data)
 
-        data = pd.concat(loaded_data)
-        data = self.standardize_data(data)
-        super().__init__(data)
+        data = pd.concat(loaded_data, ignore_index=True)
+        # Reports before late March have no county columns, make sure they
+        # exist when only those are loaded.
+        for field in [cls.Fields.FIPS, cls.Fields.COUNTY]:
+            if field not in data.columns:
+                data[field] = numpy.nan
+        return cls.standardize_data(data)
+
+    def timeseries(self) -> TimeseriesDataset:
+        """Builds the timeseries, aggregating only the dates whose reports changed
+        since the cached timeseries was built.
+        """
+        # County names come from the FIPS data, rebuild everything if it changes.
+        fips_path = FIPSPopulation.FILE_PATH
+        paths = self._paths + [fips_path]
+        cache = dataset_cache.IncrementalCache("jhu_timeseries")
+        data = cache.read()
+        stale_names = [path.name for path in cache.stale_paths(paths)]
+        stale_names += cache.removed_names(paths)
+
+        if data is not None and not stale_names:
+            return TimeseriesDataset(data)
+
+        dates = self._report_dates(
+            [name for name in stale_names if name != fips_path.name]
+        )
+        updated = self.data[self.data[self.Fields.DATE].isin(dates)]
+        # from_source needs county rows to combine the New York counties, which
+        # the earliest reports don't have.
+        has_counties = (
+            updated[self.Fields.AGGREGATE_LEVEL] == AggregationLevel.COUNTY.value
+        ).any()
+        if data is None or fips_path.name in stale_names or not has_counties:
+            data = super().timeseries().data
+        else:
+            _logger.info(f"Aggregating timeseries for {len(dates)} updated dates")
+            source = copy.copy(self)
+            source.data = updated
+            data = data[~data[TimeseriesDataset.Fields.DATE].isin(dates)]
+            data = pd.concat([data, TimeseriesDataset.from_source(source).data])
+            data = data.sort_values(TimeseriesDataset.Fields.DATE, kind="mergesort")
+            # Categories differ between the two, so concat gives back strings.
+            data = dataset_utils.make_categorical(data)
+
+        data = data.reset_index(drop=True)
+        cache.write(data, paths)
+        return TimeseriesDataset(data)
 
     @classmethod
     def standardize_data(cls, data: pd.DataFrame) -> pd.DataFrame:
@@ -86,10 +165,12 @@ class JHUDataset(data_source.DataSource):
             "US": "USA",
         }
         data = data.replace({cls.Fields.COUNTRY: country_remap})
-        states = data[cls.Fields.STATE].apply(dataset_utils.parse_state)
+        states = dataset_utils.map_unique_values(
+            data[cls.Fields.STATE], dataset_utils.parse_state
+        )
 
-        county_from_state = data[cls.Fields.STATE].apply(
-            dataset_utils.parse_county_from_state
+        county_from_state = dataset_utils.map_unique_values(
+            data[cls.Fields.STATE], dataset_utils.parse_county_from_state
         )
         data[cls.Fields.COUNTY] = data[cls.Fields.COUNTY].combine_first(
             county_from_state
@@ -99,8 +180,8 @@ class JHUDataset(data_source.DataSource):
         state_only = data[cls.Fields.FIPS].isnull() & data[cls.Fields.COUNTY].isnull()
 
         # Pad fips values to 5 spots
-        data[cls.Fields.FIPS] = data[cls.Fields.FIPS].apply(
-            lambda x: f"{x.zfill(5)}" if type(x) == str else x
+        data[cls.Fields.FIPS] = dataset_utils.map_strings(
+            data[cls.Fields.FIPS], "zfill", 5
         )
         data[cls.Fields.AGGREGATE_LEVEL] = numpy.where(state_only, "state", "county")
 
@@ -45,7 +45,9 @@ class NYTimesDataset(data_source.DataSource):
     def standardize_data(cls, data: pd.DataFrame) -> pd.DataFrame:
         data[cls.Fields.COUNTRY] = "USA"
         data = dataset_utils.strip_whitespace(data)
-        data[cls.Fields.STATE] = data[cls.Fields.STATE].apply(dataset_utils.parse_state)
+        data[cls.Fields.STATE] = dataset_utils.map_unique_values(
+            data[cls.Fields.STATE], dataset_utils.parse_state
+        )
         # Super hacky way of filling in new york.
         data.loc[data[cls.Fields.COUNTY] == 'New York City', 'county'] = 'New York County'
         data.loc[data[cls.Fields.COUNTY] == 'New York County', 'fips'] = '36061'
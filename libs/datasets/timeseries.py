@@ -72,7 +72,7 @@ class TimeseriesDataset(object):
         data = self.data[
             self.data[self.Fields.AGGREGATE_LEVEL] == aggregation_level.value
         ].reset_index()
-        return data.iloc[data.groupby(group).date.idxmax(), :]
+        return data.iloc[data.groupby(group, observed=True).date.idxmax(), :]
 
     def get_subset(
         self,
@@ -110,16 +110,14 @@ class TimeseriesDataset(object):
     def get_data(
         self, country=None, state=None, county=None, fips=None
     ) -> pd.DataFrame:
-        data = self.data
-        if country:
-            data = data[data.country == country]
-        if state:
-            data = data[data.state == state]
-        if county:
-            data = data[data.county == county]
-        if fips:
-            data = data[data.fips == fips]
-        return data
+        filters = {
+            self.Fields.COUNTRY: country,
+            self.Fields.STATE: state,
+            self.Fields.COUNTY: county,
+            self.Fields.FIPS: fips,
+        }
+        filters = {field: value for field, value in filters.items() if value}
+        return dataset_utils.region_index(self).lookup(**filters)
 
     @classmethod
     def from_source(cls, source: "DataSource", fill_missing_state=True):
@@ -169,7 +167,7 @@ class TimeseriesDataset(object):
 
         # Choosing to sort by date
         data = data.sort_values(cls.Fields.DATE)
-        return cls(data)
+        return cls(dataset_utils.make_categorical(data))
 
     def summarize(self):
         dataset_utils.summarize(
@@ -0,0 +1,270 @@
+import itertools
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from numpy.random import RandomState
+
+# Columns summarized for every member of an ensemble.
+ENSEMBLE_COLUMNS = ["all_hospitalized", "dead"]
+
+DEFAULT_QUANTILES = (5, 50, 95)
+
+# Largest ensemble model_ensemble summarizes with exact QuantileBands by
+# default, which keeps members x dates values per column. Larger ensembles use
+# StreamingBands, so memory stays bounded whatever the ensemble size.
+MAX_EXACT_MEMBERS = 1000
+
+
+def parameter_grid(**values: Sequence) -> List[dict]:
+    """Every combination of the given parameter values.
+
+    >>> parameter_grid(beta=[0.5, 0.6], beta_icu=[0.1])
+    [{'beta': 0.5, 'beta_icu': 0.1}, {'beta': 0.6, 'beta_icu': 0.1}]
+    """
+    names = list(values)
+    return [
+        dict(zip(names, combination))
+        for combination in itertools.product(*(values[name] for name in names))
+    ]
+
+
+def sample_parameters(
+    ranges: Dict[str, Tuple[float, float]], size: int, seed: int = None
+) -> List[dict]:
+    """Draws `size` sets of parameters, each uniformly from its (low, high) range."""
+    random = RandomState(seed)
+    samples = {
+        name: random.uniform(low, high, size) for name, (low, high) in ranges.items()
+    }
+    return [{name: float(samples[name][i]) for name in ranges} for i in range(size)]
+
+
+def ensemble_columns(
+    results, names: Sequence[str] = ENSEMBLE_COLUMNS
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Pulls the summarized columns out of one member's results.
+
+    Takes the DataFrame from forecast_region or model_state, or their
+    ModelResults. Intervention restarts repeat the intervention date, the last
+    row for a date is the one after the restart, as on the website.
+
+    Args:
+        results: One member's results.
+        names: Result columns to pull, all_hospitalized is infected_b plus
+            infected_c as on the website.
+
+    Returns: Dates and a dict of the named columns, one value per date.
+    """
+    if isinstance(results, pd.DataFrame):
+        dates = results["date"].values
+        columns = {name: results[name].values for name in results.columns}
+    else:
+        dates = results.dates
+        columns = results.columns
+
+    # keep the last row of every date
+    keep = np.append(dates[1:] != dates[:-1], True)
+    values = {}
+    for name in names:
+        if name == "all_hospitalized":
+            column = columns["infected_b"] + columns["infected_c"]
+        else:
+            column = columns[name]
+        values[name] = column[keep].astype(float)
+    return dates[keep], values
+
+
+class QuantileBands(object):
+    """Collects the summarized columns of ensemble members into per-date bands.
+
+    Only ENSEMBLE_COLUMNS are kept from each member, in arrays sized for the
+    whole ensemble up front, rather than every member's full results. That is
+    still O(members x dates) memory, see StreamingBands for bounded memory.
+    """
+
+    def __init__(self, size: int, quantiles: Sequence[float] = DEFAULT_QUANTILES):
+        self.size = size
+        self.quantiles = list(quantiles)
+        self.count = 0
+        self.dates = None
+        self._values = {}
+
+    def add(self, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        if self.count >= self.size:
+            raise ValueError(f"Ensemble already has {self.size} members")
+
+        if self.dates is None:
+            self.dates = dates
+            self._values = {
+                name: np.empty((self.size, len(dates)), dtype=np.float32)
+                for name in ENSEMBLE_COLUMNS
+            }
+        elif not np.array_equal(dates, self.dates):
+            raise ValueError("Ensemble members must cover the same dates")
+
+        for name in ENSEMBLE_COLUMNS:
+            self._values[name][self.count] = columns[name]
+        self.count += 1
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Date column plus `{column}_mean`, `{column}_std` and a
+        `{column}_p{quantile}` column per quantile, as StreamingBands."""
+        if not self.count:
+            raise ValueError("Ensemble has no members")
+
+        data = {"date": self.dates}
+        for name in ENSEMBLE_COLUMNS:
+            values = self._values[name][: self.count].astype(float)
+            data[f"{name}_mean"] = values.mean(axis=0)
+            if self.count > 1:
+                data[f"{name}_std"] = values.std(axis=0, ddof=1)
+            else:
+                data[f"{name}_std"] = np.full(len(self.dates), np.nan)
+            bands = np.percentile(values, self.quantiles, axis=0)
+            for quantile, band in zip(self.quantiles, bands):
+                data[f"{name}_p{quantile:g}"] = band
+        return pd.DataFrame(data)
+
+
+class P2Quantiles(object):
+    """Streaming estimates of several quantiles of many series at once.
+
+    Implements the P-square algorithm (Jain and Chlamtac, 1985): each quantile
+    of each series is tracked by five markers whose heights are adjusted with
+    a piecewise-parabolic formula as observations arrive, so memory does not
+    grow with the number of observations. Observations are vectors, one value
+    per series (e.g. per date), and all series are updated together.
+
+    Until a sixth observation arrives the quantiles are exact.
+    """
+
+    def __init__(self, quantiles: Sequence[float], size: int):
+        # (quantile, marker, series) arrays
+        p = np.asarray(quantiles, dtype=float)[:, np.newaxis, np.newaxis] / 100
+        self.quantiles = list(quantiles)
+        self.count = 0
+        self._heights = np.zeros((len(self.quantiles), 5, size))
+        self._positions = np.broadcast_to(
+            np.arange(5.0)[np.newaxis, :, np.newaxis], self._heights.shape
+        ).copy()
+        self._desired = np.broadcast_to(
+            np.concatenate([0 * p, 2 * p, 4 * p, 2 + 2 * p, 4 + 0 * p], axis=1),
+            self._heights.shape,
+        ).copy()
+        self._increments = np.concatenate(
+            [0 * p, p / 2, p, (1 + p) / 2, 1 + 0 * p], axis=1
+        )
+
+    def add(self, values: np.ndarray):
+        if self.count < 5:
+            self._heights[:, self.count] = values
+            self.count += 1
+            if self.count == 5:
+                self._heights.sort(axis=1)
+            return
+
+        self.count += 1
+        heights = self._heights
+        positions = self._positions
+
+        # extend the end markers to the new value, then find the cell it is in
+        np.minimum(heights[:, 0], values, out=heights[:, 0])
+        np.maximum(heights[:, 4], values, out=heights[:, 4])
+        positions[:, 1:4] += heights[:, 1:4] > values
+        positions[:, 4] += 1
+        self._desired += self._increments
+
+        for i in range(1, 4):
+            offset = self._desired[:, i] - positions[:, i]
+            step_up = positions[:, i + 1] - positions[:, i]
+            step_down = positions[:, i - 1] - positions[:, i]
+            move = ((offset >= 1) & (step_up > 1)) | ((offset <= -1) & (step_down < -1))
+            if not move.any():
+                continue
+
+            d = np.sign(offset)
+            height = heights[:, i]
+            up = heights[:, i + 1] - height
+            down = height - heights[:, i - 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = height + d / (step_up - step_down) * (
+                    (d - step_down) * up / step_up + (step_up - d) * down / -step_down
+                )
+                linear = height + d * np.where(d > 0, up / step_up, down / -step_down)
+            inside = (heights[:, i - 1] < parabolic) & (parabolic < heights[:, i + 1])
+            heights[:, i] = np.where(move, np.where(inside, parabolic, linear), height)
+            positions[:, i] += np.where(move, d, 0)
+
+    def estimates(self) -> np.ndarray:
+        """Current estimates, one row per quantile."""
+        if self.count <= 5:
+            return np.percentile(self._heights[0, : self.count], self.quantiles, axis=0)
+        return self._heights[:, 2].copy()
+
+
+class StreamingBands(object):
+    """Per-date summary of an ensemble, updated as each member arrives.
+
+    Keeps the running mean and variance (Welford's algorithm) and P-square
+    estimates of the quantiles of every column, so memory only depends on the
+    number of dates, not on how many members are added. Quantiles are
+    approximate once more than five members have been added, use
+    QuantileBands when exact bands are needed.
+
+    Members can be added straight from forecast_region or model_state with
+    `add_results`, or as extracted columns with `add`.
+    """
+
+    def __init__(
+        self,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        columns: Sequence[str] = ENSEMBLE_COLUMNS,
+    ):
+        self.quantiles = list(quantiles)
+        self.columns = list(columns)
+        self.count = 0
+        self.dates = None
+        self._mean = {}
+        self._squares = {}
+        self._sketches = {}
+
+    def add_results(self, results):
+        """Adds one member's forecast_region or model_state results."""
+        self.add(*ensemble_columns(results, self.columns))
+
+    def add(self, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        if self.dates is None:
+            self.dates = dates
+            for name in self.columns:
+                self._mean[name] = np.zeros(len(dates))
+                self._squares[name] = np.zeros(len(dates))
+                self._sketches[name] = P2Quantiles(self.quantiles, len(dates))
+        elif not np.array_equal(dates, self.dates):
+            raise ValueError("Ensemble members must cover the same dates")
+
+        self.count += 1
+        for name in self.columns:
+            values = columns[name]
+            mean = self._mean[name]
+            delta = values - mean
+            mean += delta / self.count
+            self._squares[name] += delta * (values - mean)
+            self._sketches[name].add(values)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Date column plus `{column}_mean`, `{column}_std` and a
+        `{column}_p{quantile}` column per quantile."""
+        if not self.count:
+            raise ValueError("Ensemble has no members")
+
+        data = {"date": self.dates}
+        for name in self.columns:
+            data[f"{name}_mean"] = self._mean[name].copy()
+            if self.count > 1:
+                data[f"{name}_std"] = np.sqrt(self._squares[name] / (self.count - 1))
+            else:
+                data[f"{name}_std"] = np.full(len(self.dates), np.nan)
+            bands = self._sketches[name].estimates()
+            for quantile, band in zip(self.quantiles, bands):
+                data[f"{name}_p{quantile:g}"] = band
+        return pd.DataFrame(data)
@@ -1,3 +1,4 @@
+import bisect
 import datetime
 
 import numpy as np
@@ -7,34 +8,62 @@ import pandas as pd
 # but for now let's keep doing the integration manually, it's
 # clearer what's going on and performance didn't seem to take a hit
 from scipy.integrate import odeint
+from scipy.optimize import brentq
 
 
 def brute_force_r0(seir_params, new_r0, r0, N):
-    calc_r0 = r0
-
-    change = np.sign(new_r0 - calc_r0) * 0.00005
-    # step = 0.1
-    # direction = 1 if change > 0 else -1
-
     new_seir_params = seir_params.copy()
 
-    while round(new_r0, 4) != round(calc_r0, 4):
+    # already there to the precision we've always searched to, leave the
+    # params untouched
+    if round(new_r0, 4) == round(r0, 4):
+        return new_seir_params
+
+    def r0_for(beta_1):
         new_seir_params["beta"] = [
             0.0,
-            new_seir_params["beta"][1] + change,
-            new_seir_params["beta"][2],
-            new_seir_params["beta"][3],
+            beta_1,
+            seir_params["beta"][2],
+            seir_params["beta"][3],
         ]
-        calc_r0 = generate_r0(new_seir_params, N)
+        return generate_r0(new_seir_params, N)
+
+    # generate_r0 is linear in beta[1], so two evaluations pin down the line
+    # and we can solve for the beta[1] that gives new_r0 directly
+    beta_1 = seir_params["beta"][1]
+    step = max(abs(beta_1), 1.0 / N)
+    calc_r0 = r0_for(beta_1)
+    slope = (r0_for(beta_1 + step) - calc_r0) / step
+
+    if slope != 0:
+        beta_1 = beta_1 + (new_r0 - calc_r0) / slope
+        if abs(r0_for(beta_1) - new_r0) <= 1e-9 * max(1.0, abs(new_r0)):
+            return new_seir_params
+
+    # not linear after all, fall back to a bracketed root finder
+    beta_1 = _bracketed_beta(
+        lambda beta: r0_for(beta) - new_r0, seir_params["beta"][1], step
+    )
+    r0_for(beta_1)
+
+    return new_seir_params
 
-        diff_r0 = new_r0 - calc_r0
 
-        # if the sign has changed, we overshot, turn around with a smaller
-        # step
-        if np.sign(diff_r0) != np.sign(change):
-            change = -change / 2
+def _bracketed_beta(f, guess, width, max_expansions=60):
+    lower, upper = guess - width, guess + width
+    for _ in range(max_expansions):
+        if np.sign(f(lower)) != np.sign(f(upper)):
+            return brentq(f, lower, upper, xtol=width * 1e-12)
+        width *= 2
+        lower, upper = guess - width, guess + width
+
+    raise ValueError("Unable to bracket a beta that reaches the requested R0")
 
-    return new_seir_params
+
+# Number of daily steps a solve needs to cover start through end inclusive, so
+# callers only integrate the horizon they'll keep.
+def steps_between(start, end):
+    return (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
 
 
 def dataframe_ify(data, start, end, steps):
@@ -69,6 +98,11 @@ def dataframe_ify(data, start, end, steps):
     return sir_df
 
 
+# Splits seir_batch output back into one dataframe_ify frame per region.
+def dataframe_ify_batch(data, start, end, steps):
+    return [dataframe_ify(region_data, start, end, steps) for region_data in data]
+
+
 # The SEIR model differential equations.
 # https://github.com/alsnhll/SEIR_COVID19/blob/master/SEIR_COVID19.ipynb
 # but these are the basics
@@ -94,17 +128,112 @@ def deriv(y0, t, beta, alpha, gamma, rho, mu, N):
     return dy
 
 
-# Sets up and runs the integration
-# start date and end date give the bounds of the simulation
-# pop_dict contains the initial populations
-# beta = contact rate
-# gamma = mean recovery rate
-# TODO: add other params from doc
-def seir(
-    pop_dict, model_parameters, beta, alpha, gamma, rho, mu,
+# Flattens the SEIR parameters into the argument tuple expected by fast_deriv
+# and fast_jacobian, so the per-evaluation work is plain float arithmetic
+# instead of slicing and reducing small lists.
+def fast_deriv_args(beta, alpha, gamma, rho, mu, N):
+    return (
+        float(beta[1]),
+        float(beta[2]),
+        float(beta[3]),
+        float(alpha),
+        float(gamma[1]),
+        float(gamma[2]),
+        float(gamma[3]),
+        float(rho[1]),
+        float(rho[2]),
+        float(mu),
+        float(N),
+    )
+
+
+# Same equations as deriv, written against the flattened parameters from
+# fast_deriv_args. odeint calls this hundreds of times per solve, so it avoids
+# building numpy temporaries for the clamps and dot products.
+def fast_deriv(y, t, b1, b2, b3, alpha, g1, g2, g3, r1, r2, mu, N):
+    exposed, mild, hospitalized, icu, recovered, dead = y.tolist()
+    S = N - (exposed + mild + hospitalized + icu + recovered + dead)
+    if S < 0:
+        S = 0.0
+
+    new_exposed = (b1 * mild + b2 * hospitalized + b3 * icu) * S
+    if new_exposed > S:
+        new_exposed = S
+
+    new_recovered = g1 * mild + g2 * hospitalized + g3 * icu
+    infected = mild + hospitalized + icu
+    if new_recovered > infected:
+        new_recovered = infected
+
+    return [
+        new_exposed - alpha * exposed,  # Exposed
+        alpha * exposed - (g1 + r1) * mild,  # Ia - Mildly ill
+        r1 * mild - (g2 + r2) * hospitalized,  # Ib - Hospitalized
+        r2 * hospitalized - (g3 + mu) * icu,  # Ic - ICU
+        new_recovered,  # Recovered
+        mu * icu,  # Deaths
+    ]
+
+
+# Analytic jacobian of fast_deriv, d(dy[i]) / d(y[j]), for odeint's Dfun.
+# The clamps in the equations are piecewise, so the jacobian follows whichever
+# branch is active at y.
+def fast_jacobian(y, t, b1, b2, b3, alpha, g1, g2, g3, r1, r2, mu, N):
+    exposed, mild, hospitalized, icu, recovered, dead = y.tolist()
+    S = N - (exposed + mild + hospitalized + icu + recovered + dead)
+    dS = -1.0 if S > 0 else 0.0
+    if S < 0:
+        S = 0.0
+
+    jac = np.zeros((6, 6))
+
+    force = b1 * mild + b2 * hospitalized + b3 * icu
+    if force * S < S:
+        jac[0, :] = force * dS
+        jac[0, 1] += b1 * S
+        jac[0, 2] += b2 * S
+        jac[0, 3] += b3 * S
+    else:
+        jac[0, :] = dS
+    jac[0, 0] -= alpha
+
+    jac[1, 0] = alpha
+    jac[1, 1] = -(g1 + r1)
+    jac[2, 1] = r1
+    jac[2, 2] = -(g2 + r2)
+    jac[3, 2] = r2
+    jac[3, 3] = -(g3 + mu)
+
+    if g1 * mild + g2 * hospitalized + g3 * icu < mild + hospitalized + icu:
+        jac[4, 1:4] = [g1, g2, g3]
+    else:
+        jac[4, 1:4] = 1.0
+
+    jac[5, 3] = mu
+    return jac
+
+
+# Piecewise-constant beta version of fast_deriv for intervention schedules.
+# breakpoints = sorted days at which the transmission rates change
+# betas[k] = (b1, b2, b3) in effect from breakpoints[k - 1] up to breakpoints[k],
+# betas[0] before the first breakpoint
+def scheduled_deriv(
+    y, t, breakpoints, betas, alpha, g1, g2, g3, r1, r2, mu, N,
 ):
+    b1, b2, b3 = betas[bisect.bisect_right(breakpoints, t)]
+    return fast_deriv(y, t, b1, b2, b3, alpha, g1, g2, g3, r1, r2, mu, N)
 
-    N = pop_dict["total"]
+
+def scheduled_jacobian(
+    y, t, breakpoints, betas, alpha, g1, g2, g3, r1, r2, mu, N,
+):
+    b1, b2, b3 = betas[bisect.bisect_right(breakpoints, t)]
+    return fast_jacobian(y, t, b1, b2, b3, alpha, g1, g2, g3, r1, r2, mu, N)
+
+
+# Builds the initial state vector [exposed, mild, hospitalized, icu, recovered,
+# dead] for an integration from the populations in pop_dict.
+def initial_conditions(pop_dict, model_parameters):
     # assume that the first time you see an infected population it is mildly so
     # after that, we'll have them broken out
     if "infected_b" in pop_dict:
@@ -118,11 +247,7 @@ def seir(
 
     exposed = model_parameters["exposed_infected_ratio"] * mild
 
-    susceptible = pop_dict["total"] - (
-        pop_dict["infected"] + pop_dict["recovered"] + pop_dict["deaths"]
-    )
-
-    y0 = [
+    return [
         int(exposed),
         int(mild),
         int(hospitalized),
@@ -131,14 +256,187 @@ def seir(
         int(pop_dict.get("deaths", 0)),
     ]
 
-    steps = 365
+
+# Sets up and runs the integration
+# start date and end date give the bounds of the simulation
+# pop_dict contains the initial populations
+# beta = contact rate
+# gamma = mean recovery rate
+# cache = optional SegmentCache, a previously solved segment with the same
+# initial state, params and horizon is returned (read-only) instead of solving
+# steps = number of days to solve for, including the start day, see
+# steps_between
+# TODO: add other params from doc
+def seir(
+    pop_dict, model_parameters, beta, alpha, gamma, rho, mu, cache=None, steps=365,
+):
+
+    N = pop_dict["total"]
+    y0 = initial_conditions(pop_dict, model_parameters)
+
     t = np.arange(0, steps, 1)
 
-    ret = odeint(deriv, y0, t, args=(beta, alpha, gamma, rho, mu, N))
+    fast = model_parameters.get("fast_deriv", False)
+    use_jacobian = fast and model_parameters.get("use_jacobian", False)
+
+    if cache is not None:
+        key = cache.key(y0, N, beta, alpha, gamma, rho, mu, steps, fast, use_jacobian)
+        ret = cache.get(key)
+        if ret is not None:
+            return np.transpose(ret), steps, ret
+
+    if fast:
+        args = fast_deriv_args(beta, alpha, gamma, rho, mu, N)
+        jacobian = fast_jacobian if use_jacobian else None
+        ret = odeint(fast_deriv, y0, t, args=args, Dfun=jacobian)
+    else:
+        ret = odeint(deriv, y0, t, args=(beta, alpha, gamma, rho, mu, N))
+
+    if cache is not None:
+        cache.put(key, ret)
 
     return np.transpose(ret), steps, ret
 
 
+# Runs the integration once over an intervention schedule instead of restarting
+# seir at each intervention date.
+# beta_schedule = [(day, beta), ...] sorted by day, the first entry applies
+# from day 0 and each following beta replaces it from its day onwards
+# odeint is told about the breakpoints so it doesn't step across them
+# steps = number of days to solve for, as in seir
+def seir_schedule(
+    pop_dict, model_parameters, beta_schedule, alpha, gamma, rho, mu, steps=365,
+):
+
+    N = pop_dict["total"]
+    y0 = initial_conditions(pop_dict, model_parameters)
+
+    t = np.arange(0, steps, 1)
+
+    breakpoints = [float(day) for day, _ in beta_schedule[1:]]
+    betas = [
+        (float(beta[1]), float(beta[2]), float(beta[3])) for _, beta in beta_schedule
+    ]
+    args = (breakpoints, betas) + fast_deriv_args(
+        beta_schedule[0][1], alpha, gamma, rho, mu, N
+    )[3:]
+    jacobian = scheduled_jacobian if model_parameters.get("use_jacobian") else None
+
+    ret = odeint(
+        scheduled_deriv,
+        y0,
+        t,
+        args=args,
+        Dfun=jacobian,
+        tcrit=np.array(breakpoints) if breakpoints else None,
+    )
+
+    return np.transpose(ret), steps, ret
+
+
+# Vectorized fast_deriv over many regions integrated as one system. y is the
+# flattened (regions x 6) state and params the (11 x regions) array built from
+# fast_deriv_args, so each row unpacks to one parameter for every region.
+def batch_deriv(y, t, params):
+    b1, b2, b3, alpha, g1, g2, g3, r1, r2, mu, N = params
+    state = y.reshape(-1, 6)
+    exposed, mild, hospitalized, icu = (
+        state[:, 0],
+        state[:, 1],
+        state[:, 2],
+        state[:, 3],
+    )
+
+    S = np.maximum(N - state.sum(axis=1), 0.0)
+    infected = mild + hospitalized + icu
+
+    dy = np.empty_like(state)
+    dy[:, 0] = np.minimum((b1 * mild + b2 * hospitalized + b3 * icu) * S, S) - (
+        alpha * exposed
+    )
+    dy[:, 1] = alpha * exposed - (g1 + r1) * mild
+    dy[:, 2] = r1 * mild - (g2 + r2) * hospitalized
+    dy[:, 3] = r2 * hospitalized - (g3 + mu) * icu
+    dy[:, 4] = np.minimum(g1 * mild + g2 * hospitalized + g3 * icu, infected)
+    dy[:, 5] = mu * icu
+    return dy.ravel()
+
+
+# Jacobian of batch_deriv in odeint's banded layout. Regions don't interact, so
+# the full jacobian is block diagonal with 6x6 blocks and fits in 5 bands
+# either side of the diagonal: banded[i - j + 5, j] = d(dy[i]) / d(y[j]).
+def batch_jacobian(y, t, params):
+    b1, b2, b3, alpha, g1, g2, g3, r1, r2, mu, N = params
+    state = y.reshape(-1, 6)
+    mild, hospitalized, icu = state[:, 1], state[:, 2], state[:, 3]
+
+    S = N - state.sum(axis=1)
+    dS = np.where(S > 0, -1.0, 0.0)
+    S = np.maximum(S, 0.0)
+
+    blocks = np.zeros((len(state), 6, 6))
+
+    force = b1 * mild + b2 * hospitalized + b3 * icu
+    unclamped = force * S < S
+    blocks[:, 0, :] = np.where(unclamped, force * dS, dS)[:, np.newaxis]
+    blocks[:, 0, 1] += np.where(unclamped, b1 * S, 0.0)
+    blocks[:, 0, 2] += np.where(unclamped, b2 * S, 0.0)
+    blocks[:, 0, 3] += np.where(unclamped, b3 * S, 0.0)
+    blocks[:, 0, 0] -= alpha
+
+    blocks[:, 1, 0] = alpha
+    blocks[:, 1, 1] = -(g1 + r1)
+    blocks[:, 2, 1] = r1
+    blocks[:, 2, 2] = -(g2 + r2)
+    blocks[:, 3, 2] = r2
+    blocks[:, 3, 3] = -(g3 + mu)
+
+    unclamped = g1 * mild + g2 * hospitalized + g3 * icu < mild + hospitalized + icu
+    blocks[:, 4, 1] = np.where(unclamped, g1, 1.0)
+    blocks[:, 4, 2] = np.where(unclamped, g2, 1.0)
+    blocks[:, 4, 3] = np.where(unclamped, g3, 1.0)
+
+    blocks[:, 5, 3] = mu
+
+    banded = np.zeros((11, y.size))
+    for i in range(6):
+        for j in range(6):
+            banded[i - j + 5, j::6] = blocks[:, i, j]
+    return banded
+
+
+# Integrates many regions at once. initial_states holds one
+# initial_conditions() vector per region, seir_params one generate_epi_params()
+# dict per region and populations the total population of each region.
+# Returns the per-region equivalents of seir's output: data[i] is the
+# (6 x steps) transposed trajectory dataframe_ify expects, and ret[i] the raw
+# (steps x 6) odeint result.
+# Only used for screening many regions, see benchmarks/seir_solver.py. The
+# county forecast still calls seir once per county and intervention: each
+# county is its own pool task restarting at its intervention dates, and one
+# odeint over many regions shares its step sizes between them, so results only
+# match the per-region solves to ~1e-5 relative and the website files would
+# no longer be byte-identical.
+def seir_batch(initial_states, seir_params, populations, use_jacobian=False, steps=365):
+    params = np.array(
+        [
+            fast_deriv_args(
+                p["beta"], p["alpha"], p["gamma"], p["rho"], p["mu"], population
+            )
+            for p, population in zip(seir_params, populations)
+        ]
+    ).T
+    y0 = np.asarray(initial_states, dtype=float).ravel()
+
+    t = np.arange(0, steps, 1)
+
+    jacobian = batch_jacobian if use_jacobian else None
+    ret = odeint(batch_deriv, y0, t, args=(params,), Dfun=jacobian, ml=5, mu=5)
+
+    ret = ret.reshape(steps, -1, 6).transpose(1, 0, 2)
+    return ret.transpose(0, 2, 1), steps, ret
+
+
 # for testing purposes, just load the Harvard output
 def harvard_model_params(N):
     return {
@@ -7,8 +7,12 @@ import pandas as pd
 from scipy.integrate import odeint
 import datetime
 
+# Fraction of the removed population that died, used when the params don't
+# carry their own mu.
+DEFAULT_DEATH_RATE = 0.008
 
-def dataframe_ify(data, start, end, steps):
+
+def dataframe_ify(data, start, end, steps, death_rate=DEFAULT_DEATH_RATE):
     last_period = start + datetime.timedelta(days=(steps - 1))
 
     timesteps = pd.date_range(
@@ -32,7 +36,7 @@ def dataframe_ify(data, start, end, steps):
     sir_df = sir_df.loc[:end]
 
     # calculate dead
-    sir_df["dead"] = sir_df["recovered"] * 0.008
+    sir_df["dead"] = sir_df["recovered"] * death_rate
     # reomve from recovered
     sir_df["recovered"] = sir_df["recovered"] - sir_df["dead"]
 
@@ -45,7 +49,17 @@ def dataframe_ify(data, start, end, steps):
     return sir_df
 
 
-# The SEIR model differential equations.
+# Splits seir_batch output back into one dataframe_ify frame per region.
+def dataframe_ify_batch(data, start, end, steps, death_rates=None):
+    if death_rates is None:
+        death_rates = [DEFAULT_DEATH_RATE] * len(data)
+    return [
+        dataframe_ify(region_data, start, end, steps, death_rate)
+        for region_data, death_rate in zip(data, death_rates)
+    ]
+
+
+# The SIR model differential equations.
 # https://github.com/alsnhll/SEIR_COVID19/blob/master/SEIR_COVID19.ipynb
 # but these are the basics
 # y = initial conditions
@@ -53,34 +67,33 @@ def dataframe_ify(data, start, end, steps):
 # N = total pop
 # beta = contact rate
 # gamma = mean recovery rate
-# Don't track S because all variables must add up to 1
-# include blank first entry in vector for beta, gamma, p so that indices align in equations and code.
-# In the future could include recovery or infection from the exposed class (asymptomatics)
 def deriv(y0, t, beta, gamma, N):
-    dy = [0, 0, 0]
+    S, I, R = y0
 
-    S = y0[0]
+    infections = beta * S * I / N
+    recoveries = gamma * I
 
-    beta, gamma = 0.2, 1.0 / 10
+    # Susceptible, Infected, Recovered
+    return [-infections, infections - recoveries, recoveries]
 
-    dy[0] = -beta * S * y0[1] / N  # Susceptible
-    dy[1] = beta * S * y0[1] / N - gamma * y0[1]  # Infected
-    dy[2] = gamma * y0[1]  # Recovered
 
-    return dy
+# Vectorized deriv over many regions integrated as one system. y is the
+# flattened (regions x 3) state and beta, gamma and N hold one value per
+# region.
+def batch_deriv(y, t, beta, gamma, N):
+    S, I, R = y.reshape(-1, 3).T
 
+    infections = beta * S * I / N
+    recoveries = gamma * I
 
-# Sets up and runs the integration
-# start date and end date give the bounds of the simulation
-# pop_dict contains the initial populations
-# beta = contact rate
-# gamma = mean recovery rate
-# TODO: add other params from doc
-def seir(
-    pop_dict, beta, alpha, gamma, rho, mu, harvard_flag=False,
-):
+    dy = np.empty((len(S), 3))
+    dy[:, 0] = -infections
+    dy[:, 1] = infections - recoveries
+    dy[:, 2] = recoveries
+    return dy.ravel()
 
-    N = pop_dict["total"]
+
+def initial_conditions(pop_dict):
     # assume that the first time you see an infected population it is mildly so
     # after that, we'll have them broken out
     if "infected_a" in pop_dict:
@@ -92,69 +105,90 @@ def seir(
         pop_dict["infected"] + pop_dict["recovered"] + pop_dict["deaths"]
     )
 
-    y0 = [
-        susceptible,
+    return [
+        float(susceptible),
         float(first_infected),
         float(pop_dict.get("recovered", 0)),
     ]
 
-    steps = 365
+
+# Sets up and runs the integration
+# start date and end date give the bounds of the simulation
+# pop_dict contains the initial populations
+# beta = contact rate
+# gamma = mean recovery rate
+# alpha, rho, mu and harvard_flag are ignored, SIR has no exposed or
+# hospitalized compartments and no separate death rate. Deaths are split off
+# the recovered by the death_rate passed to dataframe_ify instead
+# steps = number of days to solve for, including the start day
+def seir(
+    pop_dict, beta, alpha, gamma, rho, mu, harvard_flag=False, steps=365,
+):
+
+    N = pop_dict["total"]
+    y0 = initial_conditions(pop_dict)
+
     t = np.arange(0, steps, 1)
 
     ret = odeint(deriv, y0, t, args=(beta, gamma, N))
     return np.transpose(ret), steps, ret
 
 
+# Integrates many regions at once, e.g. to screen every county before running
+# the full SEIR model on the ones that need it. initial_states holds one
+# initial_conditions() vector per region, seir_params one generate_epi_params()
+# dict per region and populations the total population of each region.
+# Regions don't interact, so the jacobian is banded within each region's 3
+# compartments and odeint only needs a handful of evaluations to estimate it.
+# Returns the per-region equivalents of seir's output: data[i] is the
+# (3 x steps) transposed trajectory dataframe_ify expects, and ret[i] the raw
+# (steps x 3) odeint result.
+def seir_batch(initial_states, seir_params, populations, steps=365):
+    beta = np.array([params["beta"] for params in seir_params], dtype=float)
+    gamma = np.array([params["gamma"] for params in seir_params], dtype=float)
+    N = np.asarray(populations, dtype=float)
+    y0 = np.asarray(initial_states, dtype=float).ravel()
+
+    t = np.arange(0, steps, 1)
+
+    ret = odeint(batch_deriv, y0, t, args=(beta, gamma, N), ml=2, mu=2)
+
+    ret = ret.reshape(steps, -1, 3).transpose(1, 0, 2)
+    return ret.transpose(0, 2, 1), steps, ret
+
+
 # for now just implement Harvard model, in the future use this to change
 # key params due to interventions
 def generate_epi_params(model_parameters):
-    fraction_critical = (
-        model_parameters["hospitalization_rate"]
-        * model_parameters["hospitalized_cases_requiring_icu_care"]
-    )
-
     # assume hospitalized don't infect
-    # TODO make a real beta
-    beta = model_parameters["r0"] / 10000
-
     gamma = 1 / model_parameters["hospital_time_recovery"]
 
+    # R0 = beta / gamma, so an r0 in the parameters fixes beta
+    if "r0" in model_parameters:
+        beta = model_parameters["r0"] * gamma
+    else:
+        beta = model_parameters["beta"]
+
     seir_params = {
         "beta": beta,
         "alpha": 0,
         "gamma": gamma,
         "rho": 0,
-        # TODO: add this parameter
-        # "mu": model_parameters["sir_death_rate"],
-        "mu": 0.008,
+        "mu": model_parameters.get("sir_death_rate", DEFAULT_DEATH_RATE),
     }
     return seir_params
 
 
-def generate_r0(seir_params):
+def generate_r0(seir_params, N=None):
     r0 = seir_params["beta"] / seir_params["gamma"]
 
     return r0
 
 
-def brute_force_r0(seir_params, new_r0, r0):
-    calc_r0 = r0 * 1000
-    change = np.sign(new_r0 - calc_r0) * 0.00005
-    # step = 0.1
-    # direction = 1 if change > 0 else -1
-
+# R0 is linear in beta, so the beta for new_r0 is solved for directly rather
+# than searched for. r0 and N are accepted so the call matches the SEIR model.
+def brute_force_r0(seir_params, new_r0, r0=None, N=None):
     new_seir_params = seir_params.copy()
-
-    while round(new_r0, 4) != round(calc_r0, 4):
-        new_seir_params["beta"] = new_seir_params["beta"] + change
-
-        calc_r0 = generate_r0(new_seir_params) * 1000
-
-        diff_r0 = new_r0 - calc_r0
-
-        # if the sign has changed, we overshot, turn around with a smaller
-        # step
-        if np.sign(diff_r0) != np.sign(change):
-            change = -change / 2
+    new_seir_params["beta"] = new_r0 * seir_params["gamma"]
 
     return new_seir_params
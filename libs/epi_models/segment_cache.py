@@ -0,0 +1,81 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SegmentCache(object):
+    """Bounded LRU cache of solved model segments.
+
+    Every intervention scenario for a region starts from the same initial
+    state and parameters, and several share their first intervention too, so
+    the solved trajectories are kept here and handed back instead of being
+    integrated again.
+
+    Cached arrays are marked read-only since the same array is returned to
+    every caller that hits it.
+    """
+
+    def __init__(self, maxsize=128, significant_digits=12):
+        self.maxsize = maxsize
+        self.significant_digits = significant_digits
+        self.hits = 0
+        self.misses = 0
+        self._segments = OrderedDict()
+
+    def __len__(self):
+        return len(self._segments)
+
+    def key(self, initial_state, *params):
+        """Hashes the initial state, parameters and horizon of a segment.
+
+        Args:
+            initial_state: Sequence of initial populations, rounded to integers.
+            *params: Scalars or sequences of floats, rounded to
+                `significant_digits` so values that only differ by float noise
+                share a segment.
+
+        Returns: Hex digest identifying the segment.
+        """
+        digest = hashlib.sha1()
+        digest.update(np.rint(np.asarray(initial_state, dtype=float)).tobytes())
+        for param in params:
+            values = np.asarray(param, dtype=float).ravel()
+            digest.update(
+                ",".join(
+                    f"{value:.{self.significant_digits}g}" for value in values
+                ).encode()
+            )
+            digest.update(b";")
+        return digest.hexdigest()
+
+    def get(self, key):
+        segment = self._segments.get(key)
+        if segment is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._segments.move_to_end(key)
+        return segment
+
+    def put(self, key, segment):
+        segment.setflags(write=False)
+        self._segments[key] = segment
+        self._segments.move_to_end(key)
+        while len(self._segments) > self.maxsize:
+            self._segments.popitem(last=False)
+        return segment
+
+    def clear(self):
+        self._segments.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._segments),
+            "maxsize": self.maxsize,
+        }
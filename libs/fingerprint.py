@@ -0,0 +1,77 @@
+import functools
+import hashlib
+import pathlib
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from libs.results_writer import atomic_write
+
+
+def _update(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(str(value.dtype).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            _update(digest, key)
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update(digest, item)
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b";")
+
+
+def fingerprint(*parts) -> str:
+    """Hashes DataFrames, arrays, containers of them and plain values.
+
+    DataFrames are hashed by their column names and values, not their index,
+    and dicts by their sorted items, so equal inputs always give the same
+    fingerprint across processes and runs.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _code_version(paths) -> str:
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def code_version(paths: Iterable[pathlib.Path]) -> str:
+    """Hash of the contents of the source files, read once per process."""
+    return _code_version(tuple(pathlib.Path(path) for path in paths))
+
+
+def is_unchanged(path: pathlib.Path, value: str, outputs: List[pathlib.Path]) -> bool:
+    """Whether the fingerprint stored at path is value and all the outputs it
+    was stored with still exist."""
+    path = pathlib.Path(path)
+    return (
+        path.exists()
+        and path.read_text() == value
+        and all(pathlib.Path(output).exists() for output in outputs)
+    )
+
+
+def write(path: pathlib.Path, value: str):
+    atomic_write(path, value)
+
+
+def clear(path: pathlib.Path):
+    """Removes a stored fingerprint, before its outputs are rewritten."""
+    path = pathlib.Path(path)
+    if path.exists():
+        path.unlink()
@@ -0,0 +1,53 @@
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+
+class ModelResults(object):
+    """Columnar model output: a date vector plus one NumPy array per column.
+
+    Carries the same rows and columns as the DataFrame `iterate_model`
+    returns, without building intermediate frames along the way. Use
+    `to_dataframe` when a DataFrame is actually needed.
+    """
+
+    def __init__(self, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.dates = dates
+        self.columns = columns
+
+    @classmethod
+    def concatenate(cls, segments: List["ModelResults"]) -> "ModelResults":
+        """Stacks segments that share the same columns, in order."""
+        names = list(segments[0].columns)
+        return cls(
+            np.concatenate([segment.dates for segment in segments]),
+            {
+                name: np.concatenate([segment.columns[name] for segment in segments])
+                for name in names
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __setitem__(self, name: str, values):
+        values = np.asarray(values)
+        if not values.ndim:
+            values = np.full(len(self), values)
+        self.columns[name] = values
+
+    def head(self, rows: int) -> "ModelResults":
+        """Returns the first `rows` rows."""
+        return ModelResults(
+            self.dates[:rows],
+            {name: values[:rows] for name, values in self.columns.items()},
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Builds the DataFrame `iterate_model` would have returned."""
+        data = {"date": self.dates}
+        data.update(self.columns)
+        return pd.DataFrame(data, columns=["date"] + list(self.columns))
@@ -0,0 +1,218 @@
+import logging
+import pathlib
+import re
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import simplejson
+
+from libs import website_rows
+from libs.results_writer import atomic_write, encode_results
+
+_logger = logging.getLogger(__name__)
+
+BUNDLE_NAME = "results.npz"
+
+# {state}.{intervention}.json or {state}.{fips}.{intervention}.json
+RESULTS_FILE_PATTERN = re.compile(r"^(\w+)\.(?:(\d+)\.)?(\d+)\.json$")
+
+# Positions in website_rows.WEBSITE_COLUMNS of the row number, date, the value
+# columns and the population. Every other column is a placeholder.
+INDEX_COLUMN = website_rows.WEBSITE_COLUMNS.index("index")
+DATE_COLUMN = website_rows.WEBSITE_COLUMNS.index("date")
+VALUE_COLUMNS = {
+    name: website_rows.WEBSITE_COLUMNS.index(name)
+    for name in ["all_hospitalized", "all_infected", "dead", "beds"]
+}
+POPULATION_COLUMN = website_rows.WEBSITE_COLUMNS.index("population")
+ROW_LENGTH = len(website_rows.WEBSITE_COLUMNS)
+DATA_POSITIONS = {
+    website_rows.WEBSITE_COLUMNS.index(name) for name in website_rows.DATA_COLUMNS
+}
+
+
+def results_file_name(state: str, intervention: int, fips: str = None) -> str:
+    if fips:
+        return f"{state}.{fips}.{intervention}.json"
+    return f"{state}.{intervention}.json"
+
+
+def _rows_to_columns(rows: List[list]) -> dict:
+    """Splits website rows into arrays, keeping whether each value was written
+    as a string (model output) or a number (historical estimates)."""
+    for row in rows:
+        if len(row) != ROW_LENGTH or any(
+            row[i] != website_rows.PLACEHOLDER
+            for i in range(ROW_LENGTH)
+            if i not in DATA_POSITIONS
+        ):
+            raise ValueError(f"Unexpected website row: {row}")
+
+    columns = {
+        "positions": np.array([row[INDEX_COLUMN] for row in rows], dtype=np.int32),
+        "dates": pd.to_datetime(
+            [row[DATE_COLUMN] for row in rows], format="%m/%d/%y"
+        ).values.astype("datetime64[D]"),
+    }
+    for name, column in VALUE_COLUMNS.items():
+        values = [row[column] for row in rows]
+        columns[name] = np.array(
+            [np.nan if value is None else float(value) for value in values]
+        )
+        columns[f"{name}_text"] = np.array(
+            [isinstance(value, str) for value in values], dtype=bool
+        )
+    populations = {row[POPULATION_COLUMN] for row in rows}
+    if len(populations) > 1:
+        raise ValueError(f"Rows have more than one population: {populations}")
+    columns["population"] = int(populations.pop()) if populations else 0
+    return columns
+
+
+def write_bundle(path: pathlib.Path, documents: Iterable[Tuple[str, List[list]]]):
+    """Writes website rows for many regions and interventions to one NPZ file.
+
+    Args:
+        path: File to write.
+        documents: (file name, rows) pairs, the names as from results_file_name.
+    """
+    names, states, fips, interventions, populations = [], [], [], [], []
+    offsets = [0]
+    parts = []
+    for name, rows in documents:
+        match = RESULTS_FILE_PATTERN.match(name)
+        if not match:
+            raise ValueError(f"Not a results file name: {name}")
+        columns = _rows_to_columns(rows)
+        names.append(name)
+        states.append(match.group(1))
+        fips.append(match.group(2) or "")
+        interventions.append(int(match.group(3)))
+        populations.append(columns.pop("population"))
+        offsets.append(offsets[-1] + len(rows))
+        parts.append(columns)
+
+    arrays = {
+        "names": np.array(names, dtype=str),
+        "states": np.array(states, dtype=str),
+        "fips": np.array(fips, dtype=str),
+        "interventions": np.array(interventions, dtype=np.int32),
+        "populations": np.array(populations, dtype=np.int64),
+        "offsets": np.array(offsets, dtype=np.int64),
+    }
+    for column in ["positions", "dates"] + [
+        f"{name}{suffix}" for name in VALUE_COLUMNS for suffix in ["", "_text"]
+    ]:
+        arrays[column] = (
+            np.concatenate([part[column] for part in parts]) if parts else np.array([])
+        )
+
+    path = pathlib.Path(path)
+    temp_path = path.with_name(f".{path.name}.tmp.npz")
+    np.savez(temp_path, **arrays)
+    temp_path.replace(path)
+
+
+def build_bundle(directory: pathlib.Path, path: pathlib.Path = None) -> pathlib.Path:
+    """Bundles every results file in directory, to directory / BUNDLE_NAME
+    unless another path is given."""
+    directory = pathlib.Path(directory)
+    path = pathlib.Path(path or directory / BUNDLE_NAME)
+    files = sorted(
+        file for file in directory.iterdir() if RESULTS_FILE_PATTERN.match(file.name)
+    )
+    write_bundle(
+        path, ((file.name, simplejson.loads(file.read_text())) for file in files)
+    )
+    _logger.info(f"Bundled {len(files)} results files to {path}")
+    return path
+
+
+def remove_bundle(directory: pathlib.Path):
+    """Removes the bundle in directory, before its results files are rewritten."""
+    path = pathlib.Path(directory) / BUNDLE_NAME
+    if path.exists():
+        path.unlink()
+
+
+def is_current(directory: pathlib.Path, path: pathlib.Path = None) -> bool:
+    """Whether the bundle of directory exists and no results file in directory
+    was written after it, so it holds the same results as the files."""
+    directory = pathlib.Path(directory)
+    path = pathlib.Path(path or directory / BUNDLE_NAME)
+    if not path.exists():
+        return False
+    built = path.stat().st_mtime_ns
+    return all(
+        file.stat().st_mtime_ns <= built
+        for file in directory.iterdir()
+        if RESULTS_FILE_PATTERN.match(file.name)
+    )
+
+
+class ResultsBundle(object):
+    """Random access to the results in a bundle written by write_bundle.
+
+    Every region and intervention's rows are a slice of the column arrays,
+    found through the name index, so nothing is parsed to read one of them.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        with np.load(path) as data:
+            self._arrays = {name: data[name] for name in data.files}
+        self._index = {name: i for i, name in enumerate(self._arrays["names"].tolist())}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._index)
+
+    def _slice(self, name: str) -> slice:
+        i = self._index[name]
+        offsets = self._arrays["offsets"]
+        return slice(offsets[i], offsets[i + 1])
+
+    def frame(self, state: str, intervention: int, fips: str = None) -> pd.DataFrame:
+        """Date and value columns of one region's results."""
+        rows = self._slice(results_file_name(state, intervention, fips))
+        data = {"date": self._arrays["dates"][rows].astype("datetime64[ns]")}
+        for name in VALUE_COLUMNS:
+            data[name] = self._arrays[name][rows]
+        return pd.DataFrame(data)
+
+    def rows(self, state: str, intervention: int, fips: str = None) -> List[list]:
+        """Website rows of one region, as in its results file."""
+        return self._rows(results_file_name(state, intervention, fips))
+
+    def _rows(self, name: str) -> List[list]:
+        rows = self._slice(name)
+        positions = self._arrays["positions"][rows].tolist()
+        population = str(self._arrays["populations"][self._index[name]])
+        columns = {
+            "index": positions,
+            "date": [
+                website_rows.format_date(day)
+                for day in self._arrays["dates"][rows].tolist()
+            ],
+            "population": [population] * len(positions),
+        }
+        for column in VALUE_COLUMNS:
+            numbers = self._arrays[column][rows].tolist()
+            text = self._arrays[f"{column}_text"][rows].tolist()
+            columns[column] = [
+                str(int(number)) if is_text else number
+                for number, is_text in zip(numbers, text)
+            ]
+        return website_rows.to_rows(columns)
+
+    def write_json(self, directory: pathlib.Path, names: Optional[List[str]] = None):
+        """Writes the per-region results files the website reads."""
+        directory = pathlib.Path(directory)
+        for name in names or self.names:
+            atomic_write(directory / name, encode_results(self._rows(name)))
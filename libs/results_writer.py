@@ -0,0 +1,160 @@
+import contextlib
+import logging
+import os
+import pathlib
+import queue
+import threading
+import time
+
+import pandas as pd
+import simplejson
+
+_logger = logging.getLogger(__name__)
+
+
+def encode_results(data) -> str:
+    """Encodes a DataFrame, or list of website rows, as written to the website.
+
+    Encodes the whole document at once with simplejson's C encoder, which is
+    several times faster than `simplejson.dump` streaming chunks to the file.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = data.values.tolist()
+    return simplejson.dumps(data, ignore_nan=True)
+
+
+def atomic_write(path: pathlib.Path, text: str):
+    """Writes text to a hidden temporary file next to path and moves it into
+    place, so readers only ever see a complete file."""
+    path = pathlib.Path(path)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with temp_path.open("w") as out:
+            out.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
+
+class ResultsWriter(object):
+    """Encodes and writes result files on a background thread.
+
+    `write` hands the data to a bounded queue and returns, so the caller can
+    run its next model while the previous results are written. `flush` waits
+    until everything queued has been written and re-raises the first error
+    the writer hit. Callers must flush before relying on the files, e.g. at
+    the end of every task.
+
+    The thread is started on the first write in each process, so a writer
+    created before the pool forks works in every worker.
+
+    Tasks should queue their writes inside `flushing`, so their files are
+    written and any write error raised before the next task starts.
+    """
+
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._errors = []
+        self.files = 0
+        self.bytes = 0
+        self.write_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(self.maxsize)
+        self._errors = []
+        self._thread = threading.Thread(
+            target=self._run, name="ResultsWriter", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                data, directory, name = item
+                start = time.perf_counter()
+                text = encode_results(data)
+                atomic_write(pathlib.Path(directory) / name, text)
+                self.write_seconds += time.perf_counter() - start
+                self.files += 1
+                self.bytes += len(text)
+            except Exception as e:
+                _logger.error(f"Failed to write {name} to {directory}: {e}")
+                self._errors.append(e)
+            finally:
+                self._queue.task_done()
+
+    def write(self, data, directory, name):
+        """Queues data to be written to directory / name.
+
+        Args:
+            data: Dataframe, or list of rows from prepare_rows_for_website.
+            directory: Output directory.
+            name: Name of file.
+        """
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            self._start()
+        start = time.perf_counter()
+        self._queue.put((data, directory, name))
+        self.wait_seconds += time.perf_counter() - start
+
+    def flush(self):
+        """Waits for queued files to be written.
+
+        Raises: The first exception raised writing a file since the last flush.
+        """
+        if self._pid != os.getpid():
+            return
+        start = time.perf_counter()
+        self._queue.join()
+        self.wait_seconds += time.perf_counter() - start
+
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise errors[0]
+
+    @contextlib.contextmanager
+    def flushing(self):
+        """Flushes on leaving the block, also when it raises.
+
+        A write error is raised from the block that queued the write. If the
+        block itself raised, that exception is kept and the write error,
+        already logged by the writer, is dropped.
+        """
+        try:
+            yield self
+        except BaseException:
+            try:
+                self.flush()
+            except Exception:
+                pass
+            raise
+        self.flush()
+
+    def close(self):
+        """Flushes and stops the writer thread."""
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            self._pid = None
+
+    def info(self):
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "write_seconds": self.write_seconds,
+            "wait_seconds": self.wait_seconds,
+        }
@@ -0,0 +1,58 @@
+import itertools
+from typing import Dict, List, Sequence
+
+# Columns of the website's rows, as run.prepare_data_for_website returns them.
+# The single letters are placeholders the website ignores, always 0.0.
+WEBSITE_COLUMNS = [
+    "index",
+    "date",
+    "a",
+    "b",
+    "c",
+    "d",
+    "e",
+    "f",
+    "g",
+    "all_hospitalized",
+    "all_infected",
+    "dead",
+    "beds",
+    "i",
+    "j",
+    "k",
+    "l",
+    "population",
+    "m",
+    "n",
+]
+
+# Columns that hold data, the others are placeholders.
+DATA_COLUMNS = [
+    "index",
+    "date",
+    "all_hospitalized",
+    "all_infected",
+    "dead",
+    "beds",
+    "population",
+]
+
+PLACEHOLDER = 0.0
+
+
+def format_date(day) -> str:
+    """Date as the website reads it, e.g. 3/9/20."""
+    return f"{day.month}/{day.day}/{day.year % 100:02d}"
+
+
+def to_rows(columns: Dict[str, Sequence]) -> List[list]:
+    """Website rows from the DATA_COLUMNS, given as lists by name."""
+    return [
+        list(row)
+        for row in zip(
+            *(
+                columns[name] if name in columns else itertools.repeat(PLACEHOLDER)
+                for name in WEBSITE_COLUMNS
+            )
+        )
+    ]
@@ -4,45 +4,276 @@ import datetime
 import pathlib
 import json
 import os.path
-from collections import defaultdict
+import pickle
+import traceback
+from collections import defaultdict, namedtuple
 import multiprocessing
 
 from libs.CovidDatasets import JHUDataset as LegacyJHUDataset
-from libs.CovidTimeseriesModelSIR import CovidTimeseriesModelSIR
-import simplejson
+from libs.CovidTimeseriesModelSIR import CovidTimeseriesModelSIR, SEGMENT_CACHE
+import numpy as np
 import pandas as pd
 
+from libs import ensemble
+from libs import fingerprint
+from libs import results_bundle
+from libs import website_rows
 from libs.build_params import OUTPUT_DIR, get_interventions
 from libs.datasets import JHUDataset
 from libs.datasets import FIPSPopulation
 from libs.datasets import DHBeds
+from libs.datasets import dataset_utils
 from libs.datasets.dataset_utils import AggregationLevel
 from libs.datasets.data_version import public_data_hash
+from libs.results_writer import ResultsWriter, atomic_write, encode_results
 
 _logger = logging.getLogger(__name__)
 
+# Writes each process's result files while it runs the next model. Tasks flush
+# it before returning, so their files are complete once they finish.
+RESULTS_WRITER = ResultsWriter()
 
-def get_pool(num_cores=None) -> multiprocessing.Pool:
+# Datasets shared by every task in a pool worker. Set once per worker by
+# init_worker so each task only has to carry the keys of its region.
+_worker_datasets = {}
+
+
+def init_worker(datasets):
+    """Pool initializer, keeps the datasets for this worker's tasks.
+
+    With the default fork start method the datasets are inherited from the
+    parent and never pickled; otherwise they are pickled once per worker
+    rather than once per task.
+    """
+    _worker_datasets.clear()
+    _worker_datasets.update(datasets)
+
+
+def get_pool(num_cores=None, datasets=None) -> multiprocessing.Pool:
     if not num_cores:
         num_cores = max(multiprocessing.cpu_count() - 2, 1)
 
-    return multiprocessing.Pool(num_cores)
+    if datasets is None:
+        return multiprocessing.Pool(num_cores)
+    return multiprocessing.Pool(
+        num_cores, initializer=init_worker, initargs=(datasets,)
+    )
 
-def get_backfill_historical_estimates(df):
 
-    CONFIRMED_HOSPITALIZED_RATIO = 4
-    RECOVERY_SHIFT = 13
-    HOSPITALIZATION_RATIO = 0.073
+def task_payload_bytes(args) -> int:
+    """Size of the task arguments as sent through the pool pipe."""
+    return len(pickle.dumps(args, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+TaskResult = namedtuple("TaskResult", ["key", "status", "seconds", "error"])
+
+# Status of tasks that kept their existing outputs, see skip_unchanged.
+REUSED = "reused"
+
+
+def _run_task(task):
+    function, key, args = task
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+        if result is False:
+            status = "skipped"
+        elif isinstance(result, str):
+            status = result
+        else:
+            status = "ok"
+        error = None
+    except Exception:
+        status = "failed"
+        error = traceback.format_exc()
+    return TaskResult(key, status, time.perf_counter() - start, error)
+
+
+def run_tasks(
+    function, tasks, datasets=None, num_cores=None, chunksize=None, slowest=10
+):
+    """Runs tasks on a pool, most expensive first, and collects their results.
+
+    Args:
+        function: Module level function to call with each task's args. Returning
+            False marks the task as skipped, returning a string uses it as the
+            task's status, e.g. REUSED.
+        tasks: List of (key, estimated cost, args) tuples.
+        datasets: Datasets handed to every worker once, see init_worker.
+        num_cores: Number of worker processes, defaults to get_pool's.
+        chunksize: Tasks sent to a worker at a time. Defaults to roughly 8
+            chunks per worker so the expensive tasks submitted first still
+            spread across workers.
+        slowest: Number of slowest tasks to list in the summary.
+
+    Returns: List of TaskResult, in completion order.
+
+    Raises:
+        RuntimeError: If any task raised, after every task has finished and the
+            failures have been logged.
+    """
+    tasks = sorted(tasks, key=lambda task: task[1], reverse=True)
+    pool = get_pool(num_cores=num_cores, datasets=datasets)
+    if not chunksize:
+        chunksize = max(len(tasks) // (pool._processes * 8), 1)
+
+    results = []
+    report_every = max(len(tasks) // 10, 1)
+    start = time.perf_counter()
+    try:
+        for result in pool.imap_unordered(
+            _run_task,
+            [(function, key, args) for key, _, args in tasks],
+            chunksize=chunksize,
+        ):
+            results.append(result)
+            if result.status == "failed":
+                _logger.error(f"Task {result.key} failed:\n{result.error}")
+            if len(results) % report_every == 0:
+                _logger.info(f"Finished {len(results)} of {len(tasks)} tasks")
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    elapsed = time.perf_counter() - start
+    summarize_tasks(results, elapsed, slowest=slowest)
+
+    failed = [result.key for result in results if result.status == "failed"]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(results)} tasks failed: {failed}")
+    return results
+
 
-    df['estimated_recovered'] = df.cases.shift(RECOVERY_SHIFT).fillna(0)
-    df['active'] = df.cases - (df.deaths + df.estimated_recovered)
-    df['estimated_hospitalized'] = df['active']/CONFIRMED_HOSPITALIZED_RATIO
-    df['estimated_infected'] = df['estimated_hospitalized']/HOSPITALIZATION_RATIO
+def summarize_tasks(results, elapsed, slowest=10):
+    """Logs task counts by status, throughput and the slowest tasks."""
+    counts = defaultdict(int)
+    for result in results:
+        counts[result.status] += 1
+
+    _logger.info(
+        f"Ran {len(results)} tasks in {elapsed:.1f}s "
+        f"({len(results) / max(elapsed, 1e-9):.2f} tasks/s): "
+        + ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    )
+    by_time = sorted(results, key=lambda result: result.seconds, reverse=True)
+    for result in by_time[:slowest]:
+        _logger.info(f"  {result.key}: {result.seconds:.2f}s ({result.status})")
+
+
+CONFIRMED_HOSPITALIZED_RATIO = 4
+RECOVERY_SHIFT = 13
+HOSPITALIZATION_RATIO = 0.073
+
+
+def get_backfill_historical_estimates(df):
+
+    df["estimated_recovered"] = df.cases.shift(RECOVERY_SHIFT).fillna(0)
+    df["active"] = df.cases - (df.deaths + df.estimated_recovered)
+    df["estimated_hospitalized"] = df["active"] / CONFIRMED_HOSPITALIZED_RATIO
+    df["estimated_infected"] = df["estimated_hospitalized"] / HOSPITALIZATION_RATIO
     return df
 
+
+def get_backfill_historical_arrays(historicals):
+    """Array version of get_backfill_historical_estimates, returns the
+    estimated hospitalized and infected without adding columns to historicals."""
+    cases = historicals["cases"].values.astype(float)
+    estimated_recovered = np.zeros(len(cases))
+    estimated_recovered[RECOVERY_SHIFT:] = cases[: len(cases) - RECOVERY_SHIFT]
+    estimated_recovered[np.isnan(estimated_recovered)] = 0
+
+    active = cases - (historicals["deaths"].values + estimated_recovered)
+    estimated_hospitalized = active / CONFIRMED_HOSPITALIZED_RATIO
+    estimated_infected = estimated_hospitalized / HOSPITALIZATION_RATIO
+    return estimated_hospitalized, estimated_infected
+
+
+def _website_columns(
+    row_numbers,
+    dates,
+    model_columns,
+    historicals,
+    population,
+    min_begin_date,
+    max_end_date,
+    interval,
+):
+    """Builds the website's columns from date-indexed model output.
+
+    Keeps every row whose row number is a multiple of interval within the date
+    range, and puts the historical estimates in place of the model's
+    hospitalized and infected on the dates historicals cover.
+
+    Args:
+        row_numbers: Row number of every row of the model output.
+        dates: datetime64 date of every row.
+        model_columns: infected_a, infected_b, infected_c, dead and beds arrays.
+        historicals: Region's cases and deaths by date.
+        population: Region's population.
+
+    Returns: Position of each kept row among the sampled rows, and the
+        website_rows.DATA_COLUMNS by name.
+    """
+
+    def website_strings(values):
+        values = np.where(np.isnan(values), 0, values).astype(int)
+        return np.array([str(value) for value in values.tolist()], dtype=object)
+
+    sampled = np.flatnonzero(row_numbers % interval == 0)
+    sampled_dates = dates[sampled]
+    keep = np.ones(len(sampled), dtype=bool)
+    if min_begin_date:
+        keep &= sampled_dates >= np.datetime64(min_begin_date)
+    if max_end_date:
+        keep &= sampled_dates <= np.datetime64(max_end_date)
+    labels = np.flatnonzero(keep)
+    positions = sampled[labels]
+    days = dates[positions].astype("datetime64[D]")
+
+    infected_b = model_columns["infected_b"][positions]
+    infected_c = model_columns["infected_c"][positions]
+    all_hospitalized = website_strings(infected_b + infected_c)
+    all_infected = website_strings(
+        model_columns["infected_a"][positions] + infected_b + infected_c
+    )
+
+    historical_dates = pd.DatetimeIndex(historicals["date"])
+    if not historical_dates.is_unique:
+        raise ValueError("Historical dates are not unique")
+    matches = historical_dates.get_indexer(days.astype("datetime64[ns]"))
+    estimated = matches >= 0
+    estimated_hospitalized, estimated_infected = get_backfill_historical_arrays(
+        historicals
+    )
+    all_hospitalized[estimated] = estimated_hospitalized[matches[estimated]].tolist()
+    all_infected[estimated] = estimated_infected[matches[estimated]].tolist()
+
+    date_strings = [website_rows.format_date(day) for day in days.tolist()]
+    return (
+        labels,
+        {
+            "index": row_numbers[positions],
+            "date": np.array(date_strings, dtype=object),
+            "all_hospitalized": all_hospitalized,
+            "all_infected": all_infected,
+            "dead": website_strings(model_columns["dead"][positions]),
+            "beds": website_strings(model_columns["beds"][positions]),
+            "population": np.full(len(positions), str(int(population)), dtype=object),
+        },
+    )
+
+
 def prepare_data_for_website(
-    data, historicals, population, min_begin_date, max_end_date, interval: int = 4):
-    """Prepares data for website output."""
+    data, historicals, population, min_begin_date, max_end_date, interval: int = 4
+):
+    """Prepares data for website output.
+
+    Returns: DataFrame with website_rows.WEBSITE_COLUMNS, see
+        prepare_rows_for_website for the same rows without the frame.
+    """
     # Indexes used by website JSON:
     # date: 0,
     # hospitalizations: 8,
@@ -55,109 +286,84 @@ def prepare_data_for_website(
     # date, total, susceptible, exposed, infected, infected_a, infected_b, infected_c, recovered, dead
     # infected_b == Hospitalized
     # infected_c == Hospitalized in ICU
-
-    data["all_hospitalized"] = data["infected_b"] + data["infected_c"]
-    data["all_infected"] = data["infected_a"] + data["infected_b"] + data["infected_c"]
-
-    cols = [
-        "date",
-        "a",
-        "b",
-        "c",
-        "d",
-        "e",
-        "f",
-        "g",
-        "all_hospitalized",
-        "all_infected",
-        "dead",
-        "beds",
-        "i",
-        "j",
-        "k",
-        "l",
-        "population",
-        "m",
-        "n",
-    ]
-
-    website_ordering = pd.DataFrame(data, columns=cols).fillna(0)
-
-    # @TODO: Find a better way of restricting to every fourth day.
-    #        Alternatively, change the website's expectations.
-    website_ordering = website_ordering[
-        website_ordering.index % interval == 0
-    ].reset_index()
-
-    if min_begin_date:
-        website_ordering = pd.DataFrame(
-            website_ordering[website_ordering["date"] >= min_begin_date]
-        )
-    if max_end_date:
-        website_ordering = pd.DataFrame(
-            website_ordering[website_ordering["date"] <= max_end_date]
-        )
-
-    website_ordering["date"] = website_ordering["date"].dt.strftime("%-m/%-d/%y")
-    website_ordering["population"] = population
-    website_ordering = website_ordering.astype(
-        {
-            "all_hospitalized": int,
-            "all_infected": int,
-            "dead": int,
-            "beds": int,
-            "population": int,
-        }
+    model_columns = {
+        name: data[name].values.astype(float)
+        for name in ["infected_a", "infected_b", "infected_c", "dead", "beds"]
+    }
+    labels, columns = _website_columns(
+        data.index.values,
+        data["date"].values,
+        model_columns,
+        historicals,
+        population,
+        min_begin_date,
+        max_end_date,
+        interval,
     )
-    website_ordering = website_ordering.astype(
-        {
-            "all_hospitalized": str,
-            "all_infected": str,
-            "dead": str,
-            "beds": str,
-            "population": str,
-        }
+    placeholder = np.full(len(labels), website_rows.PLACEHOLDER)
+    return pd.DataFrame(
+        {name: columns.get(name, placeholder) for name in website_rows.WEBSITE_COLUMNS},
+        index=labels,
+        columns=website_rows.WEBSITE_COLUMNS,
     )
-    historicals_df = get_backfill_historical_estimates(historicals)
 
-    relevant_date_index = pd.to_datetime(website_ordering.date).isin(historicals_df.date)
-    extract_real_date_index = historicals_df.date.isin(pd.to_datetime(website_ordering.date))
 
-    website_ordering.loc[relevant_date_index, 'all_infected'] = historicals_df[extract_real_date_index]['estimated_infected'].values
-    website_ordering.loc[relevant_date_index, 'all_hospitalized'] = historicals_df[extract_real_date_index]['estimated_hospitalized'].values
+def prepare_rows_for_website(
+    results, historicals, population, min_begin_date, max_end_date, interval: int = 4
+):
+    """Prepares website rows straight from ModelResults.
 
-    return website_ordering
+    Produces the same rows as
+    prepare_data_for_website(results.to_dataframe(), ...).values.tolist()
+    without building the intermediate frames.
+    """
+    _, columns = _website_columns(
+        np.arange(len(results)),
+        results.dates,
+        results.columns,
+        historicals,
+        population,
+        min_begin_date,
+        max_end_date,
+        interval,
+    )
+    return website_rows.to_rows(
+        {name: values.tolist() for name, values in columns.items()}
+    )
 
 
 def write_results(data, directory, name):
     """Write dataset results.
 
+    Writes synchronously, see RESULTS_WRITER to write from a background thread.
+
     Args:
-        data: Dataframe to write.
+        data: Dataframe, or list of rows from prepare_rows_for_website, to write.
         directory: base output directory.
         path: Name of file.
     """
     path = os.path.join(directory, name)
-    with open(path, "w") as out:
-        simplejson.dump(data.values.tolist(), out, ignore_nan=True)
+    atomic_write(path, encode_results(data))
 
 
-def model_state(timeseries, starting_beds, population, interventions=None):
+def model_parameters(interventions=None, overrides=None):
+    """Model parameters for a run, without the region's data.
 
-    # we should cut this, only used by the get_timeseries function, but probably not needed
-    MODEL_INTERVAL = 4
+    overrides replaces any of the parameters below. beta and
+    case_fatality_rate_hospitals_overwhelmed are derived from the other
+    parameters unless they are overridden themselves.
+    """
+    overrides = overrides or {}
 
-    # Pack all of the assumptions and parameters into a dict that can be passed into the model
-    DATA_PARAMETERS = {
-        "timeseries": timeseries,
-        "beds": starting_beds,
-        "population": population,
-    }
     MODEL_PARAMETERS = {
         "model": "seir",
         "use_harvard_params": False,  # If True use the harvard parameters directly, if not calculate off the above
         "fix_r0": False,  # If True use the parameters that make R0 2.4, if not calculate off the above
         "days_to_model": 270,
+        "fast_deriv": True,  # If True use the flattened SEIR derivative, matches the reference deriv exactly
+        "use_jacobian": False,  # If True also pass the analytic jacobian to odeint, agrees with deriv to rtol 1e-6
+        "cache_segments": True,  # If True reuse solved segments shared between interventions, results are unchanged
+        "single_pass_interventions": False,  # If True solve the interventions as one beta(t) schedule instead of restarting at each date
         ## Variables for calculating model parameters Hill -> our names/calcs
         # IncubPeriod: Average incubation period, days - presymptomatic_period
         # DurMildInf: Average duration of mild infections, days - duration_mild_infections
@@ -191,20 +397,91 @@ def model_state(timeseries, starting_beds, population, interventions=None):
         "observed_daily_growth_rate": 1.21,
     }
 
-    MODEL_PARAMETERS["beta"] = (
-        0.3 + ((MODEL_PARAMETERS["observed_daily_growth_rate"] - 1.09) / 0.02) * 0.05
-    )
+    overridable = set(MODEL_PARAMETERS) - {"interventions"}
+    overridable.add("case_fatality_rate_hospitals_overwhelmed")
+    unknown = set(overrides) - overridable
+    if unknown:
+        raise ValueError(f"Can not override model parameters: {sorted(unknown)}")
+    MODEL_PARAMETERS.update(overrides)
+
+    if "beta" not in overrides:
+        MODEL_PARAMETERS["beta"] = (
+            0.3
+            + ((MODEL_PARAMETERS["observed_daily_growth_rate"] - 1.09) / 0.02) * 0.05
+        )
+
+    if "case_fatality_rate_hospitals_overwhelmed" not in overrides:
+        MODEL_PARAMETERS["case_fatality_rate_hospitals_overwhelmed"] = (
+            MODEL_PARAMETERS["hospitalization_rate"]
+            * MODEL_PARAMETERS["hospitalized_cases_requiring_icu_care"]
+        )
 
-    MODEL_PARAMETERS["case_fatality_rate_hospitals_overwhelmed"] = (
-        MODEL_PARAMETERS["hospitalization_rate"]
-        * MODEL_PARAMETERS["hospitalized_cases_requiring_icu_care"]
+    return MODEL_PARAMETERS
+
+
+# Sources the model output depends on, part of every region's fingerprint.
+MODEL_SOURCES = [
+    pathlib.Path(__file__),
+    pathlib.Path(__file__).parent / "libs" / "CovidTimeseriesModelSIR.py",
+    pathlib.Path(__file__).parent / "libs" / "model_results.py",
+    pathlib.Path(__file__).parent / "libs" / "results_writer.py",
+    pathlib.Path(__file__).parent / "libs" / "website_rows.py",
+    pathlib.Path(__file__).parent / "libs" / "epi_models" / "HarvardEpi.py",
+    pathlib.Path(__file__).parent / "libs" / "epi_models" / "segment_cache.py",
+]
+
+
+def region_fingerprint(cases, beds, population, interventions, min_date, max_date):
+    """Fingerprint of everything a region's results are computed from: its
+    timeseries, beds, population, the interventions, model parameters and the
+    model code."""
+    return fingerprint.fingerprint(
+        cases,
+        beds,
+        population,
+        interventions,
+        model_parameters(),
+        min_date,
+        max_date,
+        fingerprint.code_version(MODEL_SOURCES),
     )
 
+
+def model_state(
+    timeseries,
+    starting_beds,
+    population,
+    interventions=None,
+    as_arrays=False,
+    overrides=None,
+):
+    """Runs the model for a region.
+
+    overrides replaces any of the model parameters, see model_parameters.
+
+    Returns a DataFrame of results, or a ModelResults with the same rows and
+    columns if as_arrays is set.
+    """
+    # we should cut this, only used by the get_timeseries function, but probably not needed
+    MODEL_INTERVAL = 4
+
+    # Pack all of the assumptions and parameters into a dict that can be passed into the model
+    DATA_PARAMETERS = {
+        "timeseries": timeseries,
+        "beds": starting_beds,
+        "population": population,
+    }
+    MODEL_PARAMETERS = model_parameters(interventions, overrides)
     MODEL_PARAMETERS.update(DATA_PARAMETERS)
 
-    [results, soln] = CovidTimeseriesModelSIR().forecast_region(
-        model_parameters=MODEL_PARAMETERS
-    )
+    if as_arrays:
+        [results, soln] = CovidTimeseriesModelSIR().forecast_region_arrays(
+            model_parameters=MODEL_PARAMETERS
+        )
+    else:
+        [results, soln] = CovidTimeseriesModelSIR().forecast_region(
+            model_parameters=MODEL_PARAMETERS
+        )
 
     available_beds = starting_beds * (
         1 - MODEL_PARAMETERS["initial_hospital_bed_utilization"]
@@ -216,20 +493,156 @@ def model_state(timeseries, starting_beds, population, interventions=None):
             * MODEL_PARAMETERS["hospital_capacity_change_daily_rate"] ** exp,
             available_beds * MODEL_PARAMETERS["max_hospital_capacity_factor"],
         )
-        for exp in range(0, len(results.index))
+        for exp in range(0, len(results))
     )
 
     return results
 
 
-def build_county_summary(min_date, country="USA", state=None, output_dir=OUTPUT_DIR):
-    """Builds county summary json files."""
-    beds_data = DHBeds.local().beds()
-    population_data = FIPSPopulation.local().population()
-    timeseries = JHUDataset.local().timeseries()
-    timeseries = timeseries.get_subset(
-        AggregationLevel.COUNTY, after=min_date, country=country, state=state
-    )
+def _model_ensemble_member(overrides):
+    region = _worker_datasets["ensemble_region"]
+    results = model_state(*region, as_arrays=True, overrides=overrides)
+    return ensemble.ensemble_columns(results)
+
+
+def model_ensemble(
+    timeseries,
+    starting_beds,
+    population,
+    overrides,
+    interventions=None,
+    quantiles=ensemble.DEFAULT_QUANTILES,
+    num_cores=None,
+    streaming=None,
+):
+    """Runs model_state for a region once per set of parameter overrides.
+
+    Members run on a pool, or in this process if num_cores is 1, and only
+    their hospitalizations and deaths are kept. Ensembles of up to
+    ensemble.MAX_EXACT_MEMBERS get exact bands from ensemble.QuantileBands,
+    which holds every member's values: O(members x dates) memory. Larger ones
+    are summarized as they arrive with ensemble.StreamingBands, so memory does
+    not grow with the ensemble.
+
+    Args:
+        timeseries, starting_beds, population, interventions: As for model_state.
+        overrides: List of parameter override dicts, one per member, e.g. from
+            ensemble.parameter_grid or ensemble.sample_parameters.
+        quantiles: Percentiles of each band.
+        num_cores: Number of worker processes, defaults to get_pool's.
+        streaming: True to always estimate the bands with StreamingBands,
+            False to always compute them with QuantileBands.
+
+    Returns: DataFrame with a row per date, the mean and standard deviation
+        of each column and a column per band, e.g. all_hospitalized_mean,
+        all_hospitalized_p5 and dead_p95.
+    """
+    if streaming is None:
+        streaming = len(overrides) > ensemble.MAX_EXACT_MEMBERS
+    if streaming:
+        bands = ensemble.StreamingBands(quantiles)
+    else:
+        bands = ensemble.QuantileBands(len(overrides), quantiles)
+    datasets = {
+        "ensemble_region": (timeseries, starting_beds, population, interventions)
+    }
+
+    if num_cores == 1:
+        init_worker(datasets)
+        for member in overrides:
+            bands.add(*_model_ensemble_member(member))
+        return bands.to_dataframe()
+
+    pool = get_pool(num_cores=num_cores, datasets=datasets)
+    chunksize = max(len(overrides) // (pool._processes * 4), 1)
+    try:
+        # in order, the streaming estimates depend on the order members arrive
+        for dates, columns in pool.imap(
+            _model_ensemble_member, overrides, chunksize=chunksize
+        ):
+            bands.add(dates, columns)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return bands.to_dataframe()
+
+
+# Whether forecast_each_county runs a county's model: it needs population,
+# beds and some cases. Built from the forecast tasks or county_eligibility.
+RegionEligibility = namedtuple(
+    "RegionEligibility", ["country", "state", "county", "fips", "eligible"]
+)
+
+
+def _first_county_values(data, keys, column):
+    """First value of column per combination of keys among the county rows, as
+    the datasets' get_county_level lookups return them."""
+    data = data[data["aggregate_level"] == AggregationLevel.COUNTY.value]
+    data = data.drop_duplicates(keys)
+    keys = zip(*(data[key].tolist() for key in keys))
+    return dict(zip(keys, data[column].tolist()))
+
+
+def county_eligibility(timeseries, beds_data, population_data):
+    """Which counties forecast_each_county would run, from one pass over each
+    dataset rather than a lookup per county.
+
+    Returns: List of RegionEligibility, in county_keys order.
+    """
+    keys = ["country", "state", "fips"]
+    data = timeseries.data
+    grouped = data.assign(
+        missing_cases=data["cases"].isnull(), cases=data["cases"].fillna(0)
+    ).groupby(keys, observed=True)
+    # sum() of the cases as in forecast_each_county, NaN if any are missing and
+    # NaN counts as having cases
+    has_cases = grouped["missing_cases"].any() | (grouped["cases"].sum() != 0)
+    has_cases = dict(zip(has_cases.index.tolist(), has_cases.tolist()))
+
+    population = _first_county_values(population_data.data, keys, "population")
+    beds = _first_county_values(beds_data.data, ["state", "fips"], "max_bed_count")
+
+    return [
+        RegionEligibility(
+            country,
+            state,
+            county,
+            fips,
+            bool(
+                population.get((country, state, fips))
+                and beds.get((state, fips))
+                and has_cases.get((country, state, fips), False)
+            ),
+        )
+        for country, state, county, fips in timeseries.county_keys()
+    ]
+
+
+def build_county_summary(
+    min_date, country="USA", state=None, output_dir=OUTPUT_DIR, eligibility=None
+):
+    """Builds county summary json files.
+
+    Args:
+        min_date: First date of the timeseries.
+        country: Country to summarize.
+        state: Optional state to summarize.
+        output_dir: Base output directory.
+        eligibility: RegionEligibility records from run_county_level_forecast.
+            If not given they are worked out from the datasets.
+    """
+    if eligibility is None:
+        beds_data = DHBeds.local().beds()
+        population_data = FIPSPopulation.local().population()
+        timeseries = JHUDataset.local().timeseries()
+        timeseries = timeseries.get_subset(
+            AggregationLevel.COUNTY, after=min_date, country=country, state=state
+        )
+        eligibility = county_eligibility(timeseries, beds_data, population_data)
 
     output_dir = pathlib.Path(output_dir) / "county_summaries"
     _logger.info(f"Outputting to {output_dir}")
@@ -238,19 +651,16 @@ def build_county_summary(min_date, country="USA", state=None, output_dir=OUTPUT_
         output_dir.mkdir(parents=True)
 
     counties_by_state = defaultdict(list)
-    for country, state, county, fips in timeseries.county_keys():
-        counties_by_state[state].append((county, fips))
+    for record in eligibility:
+        counties_by_state[record.state].append(record)
 
     all_data = {"counties_with_data": []}
-    for state, counties in counties_by_state.items():
+    for state, records in counties_by_state.items():
         data = {"counties_with_data": []}
-        for county, fips in counties:
-            cases = timeseries.get_data(state=state, country=country, fips=fips)
-            beds = beds_data.get_county_level(state, fips=fips)
-            population = population_data.get_county_level(country, state, fips=fips)
-            if population and beds and sum(cases.cases):
-                data["counties_with_data"].append(fips)
-                all_data["counties_with_data"].append(fips)
+        for record in records:
+            if record.eligible:
+                data["counties_with_data"].append(record.fips)
+                all_data["counties_with_data"].append(record.fips)
 
         output_path = output_dir / f"{state}.summary.json"
         output_path.write_text(json.dumps(data, indent=2))
@@ -268,6 +678,7 @@ def forecast_each_state(
     min_date,
     max_date,
     output_dir,
+    skip_unchanged=False,
 ):
     _logger.info(f"Generating data for state: {state}")
     cases = timeseries.get_data(state=state)
@@ -277,19 +688,35 @@ def forecast_each_state(
         # Old timeseries data throws an exception if the state does not exist in
         # the dataset.
         _logger.error(f"Failed to get beds data for {state}")
-        return
+        return False
     population = population_data.get_state_level(country, state)
     if not population:
         _logger.warning(f"Missing population for {state}")
-        return
+        return False
 
-    for i, intervention in enumerate(get_interventions()):
-        _logger.info(f"Running intervention {i} for {state}")
-        results = model_state(cases, beds, population, intervention)
-        website_data = prepare_data_for_website(
-            results, cases, population, min_date, max_date, interval=4
-        )
-        write_results(website_data, output_dir, f"{state}.{i}.json")
+    interventions = get_interventions()
+    names = [f"{state}.{i}.json" for i in range(len(interventions))]
+    region_print = region_fingerprint(
+        cases, beds, population, interventions, min_date, max_date
+    )
+    fingerprint_path = pathlib.Path(output_dir) / f"{state}.fingerprint"
+    if skip_unchanged and fingerprint.is_unchanged(
+        fingerprint_path, region_print, [pathlib.Path(output_dir) / n for n in names]
+    ):
+        _logger.info(f"Inputs unchanged, reusing results for {state}")
+        return REUSED
+    fingerprint.clear(fingerprint_path)
+
+    with RESULTS_WRITER.flushing():
+        for i, intervention in enumerate(interventions):
+            _logger.info(f"Running intervention {i} for {state}")
+            results = model_state(cases, beds, population, intervention, as_arrays=True)
+            website_data = prepare_rows_for_website(
+                results, cases, population, min_date, max_date, interval=4
+            )
+            RESULTS_WRITER.write(website_data, output_dir, names[i])
+
+    fingerprint.write(fingerprint_path, region_print)
 
 
 def forecast_each_county(
@@ -303,6 +730,7 @@ def forecast_each_county(
     beds_data,
     population_data,
     output_dir,
+    skip_unchanged=False,
 ):
     _logger.info(f"Running model for county: {county}, {state} - {fips}")
     cases = timeseries.get_data(state=state, country=country, fips=fips)
@@ -313,25 +741,98 @@ def forecast_each_county(
         _logger.debug(
             f"Missing data, skipping: Beds: {beds} Pop: {population} Total Cases: {total_cases}"
         )
-        return
+        return False
+
+    interventions = get_interventions()
+    names = [f"{state}.{fips}.{i}.json" for i in range(len(interventions))]
+    region_print = region_fingerprint(
+        cases, beds, population, interventions, min_date, max_date
+    )
+    fingerprint_path = pathlib.Path(output_dir) / f"{state}.{fips}.fingerprint"
+    if skip_unchanged and fingerprint.is_unchanged(
+        fingerprint_path, region_print, [pathlib.Path(output_dir) / n for n in names]
+    ):
+        _logger.debug(f"Inputs unchanged, reusing results for {county}, {state}")
+        return REUSED
+    fingerprint.clear(fingerprint_path)
 
     _logger.info(
         f"Running interventions for {county}, {state}: {fips} - "
         f"total cases: {total_cases} beds: {beds} pop: {population}"
     )
 
-    for i, intervention in enumerate(get_interventions()):
-        results = model_state(cases, beds, population, intervention)
-        website_data = prepare_data_for_website(
-            results, cases, population, min_date, max_date, interval=4
-        )
+    with RESULTS_WRITER.flushing():
+        for i, intervention in enumerate(interventions):
+            results = model_state(cases, beds, population, intervention, as_arrays=True)
+            website_data = prepare_rows_for_website(
+                results, cases, population, min_date, max_date, interval=4
+            )
+            RESULTS_WRITER.write(website_data, output_dir, names[i])
+
+    fingerprint.write(fingerprint_path, region_print)
+    _logger.debug(f"Segment cache after {county}, {state}: {SEGMENT_CACHE.info()}")
+    _logger.debug(f"Results writer after {county}, {state}: {RESULTS_WRITER.info()}")
 
-        write_results(website_data, output_dir, f"{state}.{fips}.{i}.json")
+
+def forecast_county_task(
+    min_date, max_date, country, state, county, fips, output_dir, skip_unchanged=False
+):
+    """forecast_each_county using the datasets set up by init_worker."""
+    return forecast_each_county(
+        min_date,
+        max_date,
+        country,
+        state,
+        county,
+        fips,
+        _worker_datasets["timeseries"],
+        _worker_datasets["beds_data"],
+        _worker_datasets["population_data"],
+        output_dir,
+        skip_unchanged,
+    )
+
+
+def forecast_state_task(
+    country, state, min_date, max_date, output_dir, skip_unchanged=False
+):
+    """forecast_each_state using the datasets set up by init_worker."""
+    return forecast_each_state(
+        country,
+        state,
+        _worker_datasets["timeseries"],
+        _worker_datasets["beds_data"],
+        _worker_datasets["population_data"],
+        min_date,
+        max_date,
+        output_dir,
+        skip_unchanged,
+    )
+
+
+def summarize_reuse(results):
+    """Logs how many regions were recomputed and how many kept their outputs."""
+    reused = sum(result.status == REUSED for result in results)
+    recomputed = sum(result.status == "ok" for result in results)
+    _logger.info(f"{recomputed} regions recomputed, {reused} reused")
 
 
 def run_county_level_forecast(
-    min_date, max_date, country="USA", state=None, output_dir=OUTPUT_DIR
+    min_date,
+    max_date,
+    country="USA",
+    state=None,
+    output_dir=OUTPUT_DIR,
+    bundle=False,
+    skip_unchanged=False,
 ):
+    """Runs every county's model.
+
+    With skip_unchanged, counties whose fingerprinted inputs match the previous
+    run in output_dir keep their results instead of being run again.
+
+    Returns: RegionEligibility of every county, for build_county_summary.
+    """
     beds_data = DHBeds.local().beds()
     population_data = FIPSPopulation.local().population()
     timeseries = JHUDataset.local().timeseries()
@@ -341,21 +842,30 @@ def run_county_level_forecast(
 
     output_dir = pathlib.Path(output_dir) / "county"
     _logger.info(f"Outputting to {output_dir}")
-    # Dont want to replace when just running the states
-    if output_dir.exists() and not state:
+    # Dont want to replace when just running the states, or reusing results
+    if output_dir.exists() and not state and not skip_unchanged:
         backup = output_dir.name + "." + str(int(time.time()))
         output_dir.rename(output_dir.parent / backup)
 
     output_dir.mkdir(parents=True, exist_ok=True)
+    # a kept output directory's bundle would go stale, rebuilt below if asked
+    results_bundle.remove_bundle(output_dir)
 
     counties_by_state = defaultdict(list)
     county_keys = timeseries.county_keys()
     for country, state, county, fips in county_keys:
         counties_by_state[state].append((county, fips))
 
-    pool = get_pool()
+    datasets = {
+        "timeseries": timeseries,
+        "beds_data": beds_data,
+        "population_data": population_data,
+    }
+    index = dataset_utils.region_index(timeseries)
+    interventions = len(get_interventions())
+    tasks = []
+    regions = []
     for state, counties in counties_by_state.items():
-        _logger.info(f"Running county models for {state}")
         for county, fips in counties:
             args = (
                 min_date,
@@ -364,21 +874,41 @@ def run_county_level_forecast(
                 state,
                 county,
                 fips,
-                timeseries,
-                beds_data,
-                population_data,
                 output_dir,
+                skip_unchanged,
             )
-            # forecast_each_county(*args)
-            pool.apply_async(forecast_each_county, args=args)
-
-    pool.close()
-    pool.join()
+            _logger.debug(f"Task payload for {fips}: {task_payload_bytes(args)} bytes")
+            # model time scales with the length of the series and the number of
+            # interventions run on it
+            rows = len(index.positions(country=country, state=state, fips=fips))
+            key = f"{county}, {state} - {fips}"
+            tasks.append((key, rows * interventions, args))
+            regions.append((key, (country, state, county, fips)))
+
+    _logger.info(f"Running {len(tasks)} county models")
+    results = run_tasks(forecast_county_task, tasks, datasets=datasets)
+    summarize_reuse(results)
+    if bundle:
+        results_bundle.build_bundle(output_dir)
+
+    # counties the forecast skipped are the ones without the data to run
+    statuses = {result.key: result.status for result in results}
+    return [
+        RegionEligibility(*region, statuses[key] != "skipped")
+        for key, region in regions
+    ]
 
 
 def run_state_level_forecast(
-    min_date, max_date, country="USA", state=None, output_dir=OUTPUT_DIR
+    min_date,
+    max_date,
+    country="USA",
+    state=None,
+    output_dir=OUTPUT_DIR,
+    bundle=False,
+    skip_unchanged=False,
 ):
+    """Runs every state's model, skip_unchanged as for run_county_level_forecast."""
     # DH Beds dataset does not have all counties, so using the legacy state
     # level bed data.
     legacy_dataset = LegacyJHUDataset(min_date)
@@ -388,33 +918,37 @@ def run_state_level_forecast(
         AggregationLevel.STATE, after=min_date, country=country, state=state
     )
     output_dir = pathlib.Path(OUTPUT_DIR)
-    if output_dir.exists() and not state:
+    if output_dir.exists() and not state and not skip_unchanged:
         backup = output_dir.name + "." + str(int(time.time()))
         output_dir.rename(output_dir.parent / backup)
 
     output_dir.mkdir(parents=True, exist_ok=True)
+    # a kept output directory's bundle would go stale, rebuilt below if asked
+    results_bundle.remove_bundle(output_dir)
 
-    pool = get_pool()
+    datasets = {
+        "timeseries": timeseries,
+        "beds_data": legacy_dataset,
+        "population_data": population_data,
+    }
+    index = dataset_utils.region_index(timeseries)
+    interventions = len(get_interventions())
+    tasks = []
     for state in timeseries.states:
-        args = (
-            country,
-            state,
-            timeseries,
-            legacy_dataset,
-            population_data,
-            min_date,
-            max_date,
-            output_dir,
-        )
-        pool.apply_async(forecast_each_state, args=args)
+        args = (country, state, min_date, max_date, output_dir, skip_unchanged)
+        _logger.debug(f"Task payload for {state}: {task_payload_bytes(args)} bytes")
+        rows = len(index.positions(state=state))
+        tasks.append((state, rows * interventions, args))
 
-    pool.close()
-    pool.join()
+    results = run_tasks(forecast_state_task, tasks, datasets=datasets)
+    summarize_reuse(results)
+    if bundle:
+        results_bundle.build_bundle(output_dir)
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    with public_data_hash(os.getenv('COVID_DATA_PUBLIC_HASH', None)) as git_hash:
+    with public_data_hash(os.getenv("COVID_DATA_PUBLIC_HASH", None)) as git_hash:
         # @TODO: Record git hash in output data for reproducibility
         # @TODO: Remove interventions override once support is in the Harvard model.
         min_date = datetime.datetime(2020, 3, 7)
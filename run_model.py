@@ -29,8 +29,18 @@ def main():
     is_flag=True,
     help="Only runs the county summary if true.",
 )
+@click.option(
+    "--bundle",
+    is_flag=True,
+    help="Also write every county's results to one results.npz bundle.",
+)
+@click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    help="Keep the results of counties whose inputs have not changed since the last run.",
+)
 @data_version.with_git_version_click_option
-def run_county(version: data_version.DataVersion, state=None, deploy=False, summary_only=False):
+def run_county(version: data_version.DataVersion, state=None, deploy=False, summary_only=False, bundle=False, skip_unchanged=False):
     """Run county level model."""
     min_date = datetime.datetime(2020, 3, 7)
     max_date = datetime.datetime(2020, 7, 6)
@@ -39,11 +49,15 @@ def run_county(version: data_version.DataVersion, state=None, deploy=False, summ
     if deploy:
         output_dir = WEB_DEPLOY_PATH
 
+    eligibility = None
     if not summary_only:
-        run.run_county_level_forecast(
-            min_date, max_date, country="USA", state=state, output_dir=output_dir
+        eligibility = run.run_county_level_forecast(
+            min_date, max_date, country="USA", state=state, output_dir=output_dir,
+            bundle=bundle, skip_unchanged=skip_unchanged,
         )
-    run.build_county_summary(min_date, state=state, output_dir=output_dir)
+    run.build_county_summary(
+        min_date, state=state, output_dir=output_dir, eligibility=eligibility
+    )
     # only write the version if we saved everything
     if state is None and not summary_only:
         version.write_file('counties', output_dir)
@@ -58,8 +72,18 @@ def run_county(version: data_version.DataVersion, state=None, deploy=False, summ
     is_flag=True,
     help="Output data files to public data directory in local covid-projections.",
 )
+@click.option(
+    "--bundle",
+    is_flag=True,
+    help="Also write every state's results to one results.npz bundle.",
+)
+@click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    help="Keep the results of states whose inputs have not changed since the last run.",
+)
 @data_version.with_git_version_click_option
-def run_state(version: data_version.DataVersion, state=None, deploy=False):
+def run_state(version: data_version.DataVersion, state=None, deploy=False, bundle=False, skip_unchanged=False):
     """Run State level model."""
     min_date = datetime.datetime(2020, 3, 7)
     max_date = datetime.datetime(2020, 7, 6)
@@ -69,7 +93,8 @@ def run_state(version: data_version.DataVersion, state=None, deploy=False):
         output_dir = WEB_DEPLOY_PATH
 
     run.run_state_level_forecast(
-        min_date, max_date, country="USA", state=state, output_dir=output_dir
+        min_date, max_date, country="USA", state=state, output_dir=output_dir,
+        bundle=bundle, skip_unchanged=skip_unchanged,
     )
     _logger.info(f'Wrote output to {output_dir}')
     # only write the version if we saved everything
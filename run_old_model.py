@@ -44,6 +44,11 @@ def record_results(res, directory, name, num, pop):
             ]].values.tolist(), out, ignore_nan=True)
 
 def model_state(dataset, country, state, interventions=None):
+    return CovidTimeseriesModel().forecast(
+        model_parameters=build_model_parameters(dataset, country, state, interventions)
+    )
+
+def build_model_parameters(dataset, country, state, interventions=None):
     ## Constants
     start_time = time.time()
     HOSPITALIZATION_RATE = .0727
@@ -73,8 +78,9 @@ def model_state(dataset, country, state, interventions=None):
         'model_interval': 4, # In days
         'total_infected_period': 12, # In days
         'rolling_intervals_for_current_infected': int(round(TOTAL_INFECTED_PERIOD / MODEL_INTERVAL, 0)),
+        'array_engine': True,  # Same results as the dict per cycle engine, much faster
     }
-    return CovidTimeseriesModel().forecast(model_parameters=MODEL_PARAMETERS)
+    return MODEL_PARAMETERS
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,103 @@
+import datetime
+import json
+import numpy as np
+import pandas as pd
+import run
+from libs.datasets.beds import BedsDataset
+from libs.datasets.population import PopulationDataset
+from libs.datasets.timeseries import TimeseriesDataset
+
+MIN_DATE = datetime.datetime(2020, 3, 7)
+
+# (state, county, fips, cases per day, population, beds)
+COUNTIES = [
+    ("MA", "Middlesex County", "25017", [1.0, 2.0], 1600000, 4474),
+    ("MA", "Nantucket County", "25019", [0.0, 0.0], 11000, 19),
+    ("MA", "Norfolk County", "25021", [np.nan, 0.0], 700000, 1800),
+    ("MA", "Suffolk County", "25025", [3.0, 4.0], None, 5000),
+    ("NY", "Albany County", "36001", [2.0, 5.0], 300000, 0),
+    ("NY", "Bronx County", "36005", [10.0, 20.0], 1400000, 2500),
+]
+
+
+def build_datasets():
+    dates = pd.to_datetime(["2020-03-10", "2020-03-11"])
+    timeseries, population, beds = [], [], []
+    for state, county, fips, cases, county_population, county_beds in COUNTIES:
+        region = {
+            "country": "USA",
+            "state": state,
+            "county": county,
+            "fips": fips,
+            "aggregate_level": "county",
+        }
+        for date, day_cases in zip(dates, cases):
+            timeseries.append(dict(region, date=date, cases=day_cases))
+        if county_population is not None:
+            population.append(dict(region, population=county_population))
+        beds.append(dict(region, max_bed_count=county_beds))
+    # rows at other aggregate levels are never used for counties
+    population.append(
+        {
+            "country": "USA",
+            "state": "NY",
+            "county": None,
+            "fips": "36001",
+            "aggregate_level": "state",
+            "population": 19000000,
+        }
+    )
+    return (
+        TimeseriesDataset(pd.DataFrame(timeseries)),
+        BedsDataset(pd.DataFrame(beds)),
+        PopulationDataset(pd.DataFrame(population)),
+    )
+
+
+def per_county_eligibility(timeseries, beds_data, population_data):
+    eligible = []
+    for country, state, county, fips in timeseries.county_keys():
+        cases = timeseries.get_data(state=state, country=country, fips=fips)
+        beds = beds_data.get_county_level(state, fips=fips)
+        population = population_data.get_county_level(country, state, fips=fips)
+        eligible.append(bool(population and beds and sum(cases.cases)))
+    return eligible
+
+
+def test_county_eligibility_matches_per_county_lookups():
+    timeseries, beds_data, population_data = build_datasets()
+    records = run.county_eligibility(timeseries, beds_data, population_data)
+
+    assert [record.fips for record in records] == [
+        fips for _, _, _, fips in timeseries.county_keys()
+    ]
+    assert [record.eligible for record in records] == per_county_eligibility(
+        timeseries, beds_data, population_data
+    )
+    assert [record.fips for record in records if record.eligible] == [
+        "25017",
+        "25021",
+        "36005",
+    ]
+
+
+def test_build_county_summary_from_records(tmp_path):
+    records = [
+        run.RegionEligibility("USA", "MA", "Middlesex County", "25017", True),
+        run.RegionEligibility("USA", "MA", "Nantucket County", "25019", False),
+        run.RegionEligibility("USA", "NY", "Bronx County", "36005", True),
+    ]
+    run.build_county_summary(MIN_DATE, output_dir=tmp_path, eligibility=records)
+
+    summaries = tmp_path / "county_summaries"
+    assert sorted(path.name for path in summaries.iterdir()) == [
+        "MA.summary.json",
+        "NY.summary.json",
+        "fips_summary.json",
+    ]
+    assert json.loads((summaries / "MA.summary.json").read_text()) == {
+        "counties_with_data": ["25017"]
+    }
+    assert (summaries / "fips_summary.json").read_text() == json.dumps(
+        {"counties_with_data": ["25017", "36005"]}, indent=2
+    )
@@ -0,0 +1,63 @@
+import datetime
+import numpy as np
+import pandas as pd
+from libs import CovidDatasets
+
+
+class FakeDataset(CovidDatasets.Dataset):
+    def __init__(self, timeseries):
+        super().__init__(start_date=datetime.datetime(2020, 3, 3))
+        self._raw = timeseries
+
+    def get_raw_timeseries(self):
+        return self._raw
+
+
+def build_timeseries():
+    dates = pd.to_datetime(
+        ["2020-03-05", "2020-03-06", "2020-03-07", "2020-03-07", "2020-03-09"]
+    )
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "country": "USA",
+            "state": "MA",
+            "county": [None, "Suffolk", "Suffolk", "Norfolk", None],
+            "cases": [1.0, 2.0, 3.0, 4.0, 9.0],
+            "deaths": [np.nan, 0.0, 1.0, 0.0, 1.0],
+            "recovered": 0.0,
+        }
+    )
+
+
+def test_combine_state_county_data_fills_gaps_from_counties():
+    dataset = FakeDataset(build_timeseries())
+    combined = dataset.combine_state_county_data("USA", "MA")
+
+    assert combined.date.tolist() == list(
+        pd.to_datetime(["2020-03-05", "2020-03-06", "2020-03-07", "2020-03-09"])
+    )
+    assert combined.cases.tolist() == [1.0, 2.0, 7.0, 9.0]
+    assert combined.deaths.tolist() == [0.0, 0.0, 1.0, 1.0]
+    # Filled rows are copies of the first state row
+    assert combined.index.tolist() == [0, 0, 0, 1]
+    assert combined.county.isna().all()
+
+
+def test_backfill_adds_synthetic_days_and_decays_cases():
+    dataset = FakeDataset(build_timeseries())
+    series = dataset.combine_state_county_data("USA", "MA")
+    backfilled = dataset.backfill(series, 2)
+
+    # Starts on the first date with cases a whole number of intervals from the
+    # start date, with synthetic rows back to the start date.
+    expected_dates = ["03-03", "03-04", "03-05", "03-06", "03-07", "03-09"]
+    assert backfilled.date.tolist() == list(
+        pd.to_datetime([f"2020-{date}" for date in expected_dates])
+    )
+    assert backfilled.synthetic.tolist() == [1, 1, None, None, None, None]
+    step_down = 2 ** 0.5
+    assert backfilled.cases.tolist()[:2] == [
+        1.0 / step_down / step_down,
+        1.0 / step_down,
+    ]
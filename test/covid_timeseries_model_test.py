@@ -0,0 +1,49 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from libs.CovidTimeseriesModel import CovidTimeseriesModel
+
+
+def build_model_parameters(interventions):
+    dates = pd.date_range("2020-03-03", "2020-03-31")
+    cases = np.round(np.geomspace(0.5, 900, len(dates)), 1)
+    timeseries = pd.DataFrame(
+        {"date": dates, "cases": cases, "deaths": 0.0, "recovered": 0.0}
+    )
+    return {
+        "timeseries": timeseries,
+        "beds": 2000,
+        "population": 1000000,
+        "projection_iterations": 24,
+        "r0": 2.4,
+        "interventions": interventions,
+        "hospitalization_rate": 0.0727,
+        "initial_hospitalization_rate": 0.05,
+        "case_fatality_rate": 0.0109341104294479,
+        "hospitalized_cases_requiring_icu_care": 0.1397,
+        "case_fatality_rate_hospitals_overwhelmed": 0.0727 * 0.1397,
+        "hospital_capacity_change_daily_rate": 1.05,
+        "max_hospital_capacity_factor": 2.07,
+        "initial_hospital_bed_utilization": 0.6,
+        "model_interval": 4,
+        "total_infected_period": 12,
+        "rolling_intervals_for_current_infected": 3,
+    }
+
+
+@pytest.mark.parametrize(
+    "interventions",
+    [
+        None,
+        {datetime.date(2020, 3, 23): 1.3, datetime.date(2020, 4, 20): 0.8},
+    ],
+)
+def test_array_engine_matches_dict_engine(interventions):
+    expected = CovidTimeseriesModel().forecast(build_model_parameters(interventions))
+    model_parameters = build_model_parameters(interventions)
+    model_parameters["array_engine"] = True
+    actual = CovidTimeseriesModel().forecast(model_parameters)
+
+    assert len(actual) == 31
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
@@ -0,0 +1,143 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from libs.datasets import dataset_cache
+from libs.datasets.sources.fips_population import FIPSPopulation
+from libs.datasets.sources.jhu_dataset import JHUDataset
+
+
+def _touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+
+def test_incremental_cache_tracks_changed_inputs(tmp_path):
+    first = tmp_path / "2020-03-01.csv"
+    second = tmp_path / "2020-03-02.csv"
+    first.write_text("fips,cases\n06001,1\n,2\n")
+    second.write_text("fips,cases\n06001,3\n")
+    paths = [first, second]
+    data = pd.read_csv(first, dtype={"fips": str})
+
+    cache = dataset_cache.IncrementalCache("test", tmp_path / "cache")
+    assert cache.read() is None
+    assert cache.stale_paths(paths) == paths
+    cache.write(data, paths)
+
+    cache = dataset_cache.IncrementalCache("test", tmp_path / "cache")
+    cached = cache.read()
+    pd.testing.assert_frame_equal(cached, data)
+    assert cached.fips.iloc[1] is np.nan
+    assert cache.stale_paths(paths) == []
+
+    _touch(second)
+    assert cache.stale_paths(paths) == [second]
+    assert cache.removed_names([second]) == [first.name]
+
+
+COUNTY_REPORT_COUNTIES = [
+    ("25017", "Middlesex", "Massachusetts"),
+    ("25025", "Suffolk", "Massachusetts"),
+    ("36001", "Albany", "New York"),
+    ("36061", "New York", "New York"),
+    ("36005", "Bronx", "New York"),
+    ("36047", "Kings", "New York"),
+    ("36081", "Queens", "New York"),
+    ("36085", "Richmond", "New York"),
+]
+
+
+def write_county_report(reports_dir, date, scale):
+    """Daily report in the county layout JHU uses from late March."""
+    rows = []
+    for i, (fips, county, state) in enumerate(COUNTY_REPORT_COUNTIES):
+        # case counts for NYC are all reported under New York county
+        is_borough = state == "New York" and fips != "36061" and fips != "36001"
+        confirmed = 0 if is_borough else scale * (i + 1)
+        rows.append(
+            {
+                "FIPS": fips,
+                "Admin2": county,
+                "Province_State": state,
+                "Country_Region": "US",
+                "Last_Update": f"{date} 23:33:19",
+                "Lat": 42.0,
+                "Long_": -71.0,
+                "Confirmed": confirmed,
+                "Deaths": confirmed // 10,
+                "Recovered": 0,
+                "Active": 0,
+                "Combined_Key": f"{county}, {state}, US",
+            }
+        )
+    path = reports_dir / f"{date[5:]}-{date[:4]}.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def build_jhu(reports_dir, cache_dir, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", cache_dir)
+    source = JHUDataset(reports_dir)
+    return source.data, source.timeseries().data
+
+
+def sorted_rows(data):
+    categories = data.columns[data.dtypes == "category"]
+    data = data.astype({column: str for column in categories})
+    columns = list(data.columns)
+    return data.sort_values(columns).reset_index(drop=True)
+
+
+def test_jhu_incremental_build_matches_cold_build(tmp_path, monkeypatch, caplog):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    # before late March reports only have states
+    (reports_dir / "03-01-2020.csv").write_text(
+        "Province/State,Country/Region,Last Update,Confirmed,Deaths,Recovered\n"
+        "Massachusetts,US,2020-03-01T10:13:19,1,0,0\n"
+        "Hubei,Mainland China,2020-03-01T10:13:19,66907,2761,31536\n"
+    )
+    write_county_report(reports_dir, "2020-03-23", 10)
+    write_county_report(reports_dir, "2020-03-24", 20)
+    fips_path = tmp_path / "fips_population.csv"
+    fips_path.write_bytes(FIPSPopulation.FILE_PATH.read_bytes())
+    monkeypatch.setattr(FIPSPopulation, "FILE_PATH", fips_path)
+
+    warm_cache = tmp_path / "cache"
+    build_jhu(reports_dir, warm_cache, monkeypatch)
+
+    def edit_changed_report():
+        write_county_report(reports_dir, "2020-03-24", 25)
+
+    def edit_added_report():
+        write_county_report(reports_dir, "2020-03-25", 30)
+
+    def edit_removed_report():
+        (reports_dir / "03-23-2020.csv").unlink()
+
+    def edit_fips_file():
+        _touch(fips_path)
+
+    # (edit, whether the timeseries only re-aggregates the edited dates)
+    edits = [
+        (edit_changed_report, True),
+        (edit_added_report, True),
+        (edit_removed_report, False),
+        (edit_fips_file, False),
+    ]
+    caplog.set_level(logging.INFO)
+    for i, (edit, partial) in enumerate(edits):
+        edit()
+        caplog.clear()
+        data, timeseries = build_jhu(reports_dir, warm_cache, monkeypatch)
+        assert ("Aggregating timeseries for 1 updated dates" in caplog.text) == partial
+        cold_data, cold_timeseries = build_jhu(
+            reports_dir, tmp_path / f"cold{i}", monkeypatch
+        )
+
+        pd.testing.assert_frame_equal(data, cold_data)
+        # rows within a date may be in a different order
+        pd.testing.assert_frame_equal(
+            sorted_rows(timeseries), sorted_rows(cold_timeseries)
+        )
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from libs.datasets import dataset_utils
+from libs.datasets.timeseries import TimeseriesDataset
+
+
+def build_data():
+    return pd.DataFrame(
+        {
+            "country": ["USA", "USA", "USA", "USA", "USA", None],
+            "state": ["MA", "NY", "MA", None, "MA", "MA"],
+            "fips": ["25017", "36061", "25017", "25017", None, "25017"],
+            "cases": [1, 2, 3, 4, 5, 6],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+
+
+def test_region_index_matches_boolean_filters():
+    data = build_data()
+    index = dataset_utils.RegionIndex(data)
+
+    expected = data[(data.state == "MA") & (data.fips == "25017")]
+    pd.testing.assert_frame_equal(index.lookup(state="MA", fips="25017"), expected)
+
+    expected = data[(data.country == "USA") & (data.state == "MA")]
+    pd.testing.assert_frame_equal(index.lookup(country="USA", state="MA"), expected)
+
+    assert index.lookup(state="TX").empty
+    assert index.lookup(state="MA", fips=None).empty
+    assert index.lookup() is data
+
+
+def test_region_index_rebuilt_when_data_replaced():
+    dataset = TimeseriesDataset(build_data())
+    assert len(dataset.get_data(state="NY")) == 1
+
+    dataset.data = build_data().iloc[:1]
+    assert dataset.get_data(state="NY").empty
+    np.testing.assert_array_equal(dataset.get_data(state="MA").cases, [1])
+
+
+def test_strip_whitespace_matches_applymap():
+    data = pd.DataFrame(
+        {
+            "state": [" MA", "New York, NY ", np.nan, None],
+            "mixed": [" a ", 1, 2.5, np.nan],
+            "fips": pd.Series([np.nan] * 4, dtype=object),
+            "cases": [1, 2, 3, 4],
+            "date": pd.to_datetime(["2020-03-01"] * 4),
+        }
+    )
+    expected = data.applymap(lambda x: x.strip() if type(x) == str else x)
+    pd.testing.assert_frame_equal(dataset_utils.strip_whitespace(data), expected)
+
+
+def test_map_strings_zero_pads_only_strings():
+    fips = pd.Series(["1001", "36061", np.nan, None], index=[3, 4, 5, 6])
+    expected = fips.apply(lambda x: x.zfill(5) if type(x) == str else x)
+    pd.testing.assert_series_equal(
+        dataset_utils.map_strings(fips, "zfill", 5), expected
+    )
+
+
+def test_map_unique_values_matches_apply():
+    states = pd.Series(
+        ["Washington", "King County, WA", np.nan, "Washington", "Diamond Princess"],
+        name="state",
+    )
+    for function in [
+        dataset_utils.parse_state,
+        dataset_utils.parse_county_from_state,
+    ]:
+        pd.testing.assert_series_equal(
+            dataset_utils.map_unique_values(states, function), states.apply(function)
+        )
+
+
+def test_region_index_on_categorical_columns():
+    data = dataset_utils.make_categorical(build_data())
+    assert data.state.dtype.name == "category"
+    assert data.cases.dtype.name == "int64"
+
+    index = dataset_utils.RegionIndex(data)
+    expected = data[(data.state == "MA") & (data.fips == "25017")]
+    pd.testing.assert_frame_equal(index.lookup(state="MA", fips="25017"), expected)
+    assert index.lookup(state="TX").empty
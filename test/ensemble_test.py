@@ -0,0 +1,180 @@
+import datetime
+import numpy as np
+import pandas as pd
+from numpy.random import RandomState
+import pytest
+import run
+from libs import ensemble
+from libs.build_params import get_interventions
+from test.helpers import build_timeseries
+
+
+# starts after the data so the first segment runs on the overridden parameters
+INTERVENTIONS = get_interventions(start_date=datetime.date(2020, 4, 15))[1]
+
+
+def test_parameter_grid():
+    grid = ensemble.parameter_grid(beta=[0.5, 0.6], presymptomatic_period=[3, 4, 5])
+
+    assert len(grid) == 6
+    assert grid[0] == {"beta": 0.5, "presymptomatic_period": 3}
+    assert grid[-1] == {"beta": 0.6, "presymptomatic_period": 5}
+
+
+def test_sample_parameters():
+    ranges = {"beta": (0.4, 0.6), "hospitalization_rate": (0.05, 0.1)}
+    samples = ensemble.sample_parameters(ranges, 50, seed=1)
+
+    assert len(samples) == 50
+    assert all(0.4 <= sample["beta"] < 0.6 for sample in samples)
+    assert all(0.05 <= sample["hospitalization_rate"] < 0.1 for sample in samples)
+    assert samples == ensemble.sample_parameters(ranges, 50, seed=1)
+
+
+def test_model_state_overrides():
+    default = run.model_state(build_timeseries(), 2500, 1000000, INTERVENTIONS)
+    same = run.model_state(
+        build_timeseries(),
+        2500,
+        1000000,
+        INTERVENTIONS,
+        overrides={"observed_daily_growth_rate": 1.21},
+    )
+    pd.testing.assert_frame_equal(same, default)
+
+    # beta is derived from the growth rate unless given
+    slower = run.model_state(
+        build_timeseries(),
+        2500,
+        1000000,
+        INTERVENTIONS,
+        overrides={"observed_daily_growth_rate": 1.15},
+    )
+    explicit = run.model_state(
+        build_timeseries(), 2500, 1000000, INTERVENTIONS, overrides={"beta": 0.45}
+    )
+    pd.testing.assert_frame_equal(explicit, slower)
+    assert slower["dead"].iloc[-1] < default["dead"].iloc[-1]
+
+    with pytest.raises(ValueError, match="hospitalisation_rate"):
+        run.model_state(
+            build_timeseries(), 2500, 1000000, overrides={"hospitalisation_rate": 0.1}
+        )
+
+
+def test_single_member_bands_match_model_state():
+    results = run.model_state(build_timeseries(), 2500, 1000000, INTERVENTIONS)
+    bands = run.model_ensemble(
+        build_timeseries(), 2500, 1000000, [{}], INTERVENTIONS, num_cores=1
+    )
+
+    last_rows = results.drop_duplicates("date", keep="last")
+    assert bands.date.tolist() == last_rows.date.tolist()
+    hospitalized = (last_rows.infected_b + last_rows.infected_c).values
+    for quantile in [5, 50, 95]:
+        np.testing.assert_allclose(
+            bands[f"all_hospitalized_p{quantile}"], hospitalized, rtol=1e-6
+        )
+        np.testing.assert_allclose(
+            bands[f"dead_p{quantile}"], last_rows.dead.values, rtol=1e-6
+        )
+
+
+def test_model_ensemble_bands():
+    overrides = ensemble.parameter_grid(
+        observed_daily_growth_rate=[1.15, 1.18, 1.21],
+        hospitalization_rate=[0.05, 0.0727, 0.09],
+    )
+    serial = run.model_ensemble(
+        build_timeseries(), 2500, 1000000, overrides, INTERVENTIONS, num_cores=1
+    )
+    pooled = run.model_ensemble(
+        build_timeseries(), 2500, 1000000, overrides, INTERVENTIONS, num_cores=2
+    )
+
+    pd.testing.assert_frame_equal(pooled, serial)
+    assert (serial.all_hospitalized_p5 <= serial.all_hospitalized_p50).all()
+    assert (serial.all_hospitalized_p50 <= serial.all_hospitalized_p95).all()
+    assert (serial.dead_p5 <= serial.dead_p95).all()
+    assert (serial.dead_p5 < serial.dead_p95).iloc[-1]
+
+
+def test_quantile_bands_require_same_dates():
+    dates = pd.date_range("2020-03-01", periods=3).values
+    columns = {name: np.arange(3.0) for name in ensemble.ENSEMBLE_COLUMNS}
+    bands = ensemble.QuantileBands(2)
+    bands.add(dates, columns)
+
+    with pytest.raises(ValueError, match="same dates"):
+        bands.add(dates[:2], columns)
+
+
+def test_p2_quantiles_track_percentiles():
+    values = RandomState(0).lognormal(
+        mean=np.linspace(1, 4, 20), sigma=0.5, size=(2000, 20)
+    )
+    sketch = ensemble.P2Quantiles([5, 50, 95], 20)
+    for row in values[:5]:
+        sketch.add(row)
+    np.testing.assert_allclose(
+        sketch.estimates(), np.percentile(values[:5], [5, 50, 95], axis=0)
+    )
+
+    for row in values[5:]:
+        sketch.add(row)
+    np.testing.assert_allclose(
+        sketch.estimates(), np.percentile(values, [5, 50, 95], axis=0), rtol=0.1
+    )
+
+
+def test_streaming_bands_from_forecast_results():
+    ranges = {
+        "observed_daily_growth_rate": (1.12, 1.24),
+        "hospitalization_rate": (0.05, 0.09),
+    }
+    overrides = ensemble.sample_parameters(ranges, 12, seed=3)
+    streaming = ensemble.StreamingBands()
+    hospitalized = []
+    for member in overrides:
+        results = run.model_state(
+            build_timeseries(), 2500, 1000000, INTERVENTIONS, overrides=member
+        )
+        streaming.add_results(results)
+        hospitalized.append(ensemble.ensemble_columns(results)[1]["all_hospitalized"])
+    bands = streaming.to_dataframe()
+
+    hospitalized = np.array(hospitalized)
+    np.testing.assert_allclose(bands.all_hospitalized_mean, hospitalized.mean(axis=0))
+    np.testing.assert_allclose(
+        bands.all_hospitalized_std, hospitalized.std(axis=0, ddof=1), atol=1e-6
+    )
+    assert (bands.all_hospitalized_p5 >= hospitalized.min(axis=0)).all()
+    assert (bands.all_hospitalized_p5 <= bands.all_hospitalized_p50).all()
+    assert (bands.all_hospitalized_p50 <= bands.all_hospitalized_p95).all()
+    assert (bands.all_hospitalized_p95 <= hospitalized.max(axis=0)).all()
+
+    pooled = run.model_ensemble(
+        build_timeseries(),
+        2500,
+        1000000,
+        overrides,
+        INTERVENTIONS,
+        num_cores=2,
+        streaming=True,
+    )
+    pd.testing.assert_frame_equal(pooled, bands)
+
+
+def test_model_ensemble_streams_large_ensembles(monkeypatch):
+    overrides = ensemble.parameter_grid(
+        observed_daily_growth_rate=[1.15, 1.18, 1.21],
+        hospitalization_rate=[0.05, 0.09],
+    )
+    args = (build_timeseries(), 2500, 1000000, overrides, INTERVENTIONS)
+    exact = run.model_ensemble(*args, num_cores=1, streaming=False)
+    streaming = run.model_ensemble(*args, num_cores=1, streaming=True)
+    assert list(exact.columns) == list(streaming.columns)
+    pd.testing.assert_frame_equal(run.model_ensemble(*args, num_cores=1), exact)
+
+    monkeypatch.setattr(ensemble, "MAX_EXACT_MEMBERS", 5)
+    pd.testing.assert_frame_equal(run.model_ensemble(*args, num_cores=1), streaming)
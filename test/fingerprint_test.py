@@ -0,0 +1,108 @@
+import datetime
+import pathlib
+import sys
+import run
+from libs import fingerprint
+from test.helpers import build_timeseries
+
+MIN_DATE = datetime.datetime(2020, 3, 7)
+MAX_DATE = datetime.datetime(2020, 7, 6)
+
+
+class FakeTimeseries(object):
+    def __init__(self, data):
+        self.data = data
+
+    def get_data(self, state=None, country=None, fips=None):
+        return self.data.copy()
+
+
+class FakeBeds(object):
+    def get_beds_by_country_state(self, country, state):
+        return 2500
+
+
+class FakePopulation(object):
+    def get_state_level(self, country, state):
+        return 1000000
+
+
+def forecast(timeseries, output_dir, skip_unchanged=True):
+    return run.forecast_each_state(
+        "USA",
+        "CA",
+        FakeTimeseries(timeseries),
+        FakeBeds(),
+        FakePopulation(),
+        MIN_DATE,
+        MAX_DATE,
+        output_dir,
+        skip_unchanged=skip_unchanged,
+    )
+
+
+def test_fingerprint_ignores_index_but_not_values():
+    data = build_timeseries()
+    assert fingerprint.fingerprint(data) == fingerprint.fingerprint(
+        data.set_index(data.index + 5)
+    )
+
+    changed = data.copy()
+    changed.loc[29, "cases"] += 1
+    assert fingerprint.fingerprint(data) != fingerprint.fingerprint(changed)
+    assert fingerprint.fingerprint(data, {"a": 1}) != fingerprint.fingerprint(
+        data, {"a": 2}
+    )
+
+
+def test_forecast_reuses_unchanged_regions(tmp_path):
+    timeseries = build_timeseries()
+    assert forecast(timeseries, tmp_path) is None
+    assert (tmp_path / "CA.fingerprint").exists()
+    written = (tmp_path / "CA.0.json").stat().st_mtime_ns
+
+    assert forecast(timeseries, tmp_path) == run.REUSED
+    assert (tmp_path / "CA.0.json").stat().st_mtime_ns == written
+
+    # new rows for the region
+    assert forecast(build_timeseries(days=31), tmp_path) is None
+
+    # missing outputs are rebuilt
+    (tmp_path / "CA.2.json").unlink()
+    assert forecast(build_timeseries(days=31), tmp_path) is None
+    assert (tmp_path / "CA.2.json").exists()
+
+    # and everything is recomputed unless asked to skip
+    assert forecast(build_timeseries(days=31), tmp_path, skip_unchanged=False) is None
+
+
+def test_model_sources_cover_the_output_path(tmp_path):
+    # every module a forecast runs must be part of the code version, except
+    # build_params, whose interventions are fingerprinted by value, and the
+    # fingerprint itself
+    root = pathlib.Path(run.__file__).resolve().parent
+    allowed = {path.resolve() for path in run.MODEL_SOURCES} | {
+        root / "libs" / "build_params.py",
+        root / "libs" / "fingerprint.py",
+    }
+    timeseries = build_timeseries()
+    called = set()
+
+    def profile(frame, event, arg):
+        if event == "call":
+            called.add(frame.f_code.co_filename)
+
+    previous = sys.getprofile()
+    sys.setprofile(profile)
+    try:
+        forecast(timeseries, tmp_path, skip_unchanged=False)
+    finally:
+        sys.setprofile(previous)
+
+    sources = {pathlib.Path(name).resolve() for name in called}
+    model = {
+        path
+        for path in sources
+        if path.is_file() and root in path.parents and root / "test" not in path.parents
+    }
+    assert model - allowed == set()
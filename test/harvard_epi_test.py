@@ -0,0 +1,272 @@
+import datetime
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+from libs.epi_models import HarvardEpi
+
+
+def default_model_parameters(**updates):
+    model_parameters = {
+        "population": 1000000,
+        "presymptomatic_period": 3,
+        "duration_mild_infections": 6,
+        "hospital_time_recovery": 6,
+        "icu_time_death": 8,
+        "beta": 0.6,
+        "beta_hospitalized": 0.1,
+        "beta_icu": 0.1,
+        "hospitalization_rate": 0.0727,
+        "hospitalized_cases_requiring_icu_care": 0.1397,
+        "case_fatality_rate": 0.0109341104294479,
+        "exposed_infected_ratio": 1.2,
+    }
+    model_parameters.update(updates)
+    return model_parameters
+
+
+def default_pop_dict(**updates):
+    pop_dict = {
+        "total": 1000000,
+        "infected": 400,
+        "recovered": 10,
+        "deaths": 2,
+    }
+    pop_dict.update(updates)
+    return pop_dict
+
+
+def run_seir(model_parameters, pop_dict):
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    data, steps, ret = HarvardEpi.seir(
+        pop_dict,
+        model_parameters,
+        params["beta"],
+        params["alpha"],
+        params["gamma"],
+        params["rho"],
+        params["mu"],
+    )
+    return ret
+
+
+@pytest.mark.parametrize("use_jacobian,rtol", [(False, 1e-12), (True, 1e-6)])
+def test_fast_deriv_matches_reference(use_jacobian, rtol):
+    pop_dict = default_pop_dict()
+    expected = run_seir(default_model_parameters(), pop_dict)
+    fast_parameters = default_model_parameters(
+        fast_deriv=True, use_jacobian=use_jacobian
+    )
+    results = run_seir(fast_parameters, pop_dict)
+
+    np.testing.assert_allclose(results, expected, rtol=rtol, atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "y", [[120.0, 100.0, 7.0, 1.0, 0.0, 0.0], [1e3, 5e5, 2e5, 1e5, 2e5, 1e3]]
+)
+def test_fast_jacobian_matches_finite_differences(y):
+    model_parameters = default_model_parameters()
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    args = HarvardEpi.fast_deriv_args(
+        params["beta"],
+        params["alpha"],
+        params["gamma"],
+        params["rho"],
+        params["mu"],
+        model_parameters["population"],
+    )
+    y = np.array(y)
+    jacobian = HarvardEpi.fast_jacobian(y, 0, *args)
+
+    step = 1e-3
+    for j in range(len(y)):
+        offset = np.zeros(len(y))
+        offset[j] = step
+        upper = np.array(HarvardEpi.fast_deriv(y + offset, 0, *args))
+        lower = np.array(HarvardEpi.fast_deriv(y - offset, 0, *args))
+        np.testing.assert_allclose(
+            jacobian[:, j], (upper - lower) / (2 * step), rtol=1e-5, atol=1e-9
+        )
+
+
+def test_seir_batch_matches_individual_solves():
+    pop_dicts = [
+        default_pop_dict(total=50000, infected=20),
+        default_pop_dict(),
+        default_pop_dict(total=8000000, infected=30000, deaths=400),
+    ]
+    all_parameters = [
+        default_model_parameters(population=pop_dict["total"], fast_deriv=True)
+        for pop_dict in pop_dicts
+    ]
+    all_parameters[1]["beta"] = 0.4
+
+    expected = [
+        run_seir(model_parameters, pop_dict)
+        for model_parameters, pop_dict in zip(all_parameters, pop_dicts)
+    ]
+    data, steps, ret = HarvardEpi.seir_batch(
+        [
+            HarvardEpi.initial_conditions(pop_dict, model_parameters)
+            for model_parameters, pop_dict in zip(all_parameters, pop_dicts)
+        ],
+        [HarvardEpi.generate_epi_params(p) for p in all_parameters],
+        [pop_dict["total"] for pop_dict in pop_dicts],
+    )
+
+    assert data.shape == (3, 6, steps)
+    for i, region_expected in enumerate(expected):
+        np.testing.assert_allclose(ret[i], region_expected, rtol=1e-5, atol=1e-3)
+        np.testing.assert_array_equal(data[i], np.transpose(ret[i]))
+
+
+def test_batch_jacobian_matches_fast_jacobian_blocks():
+    model_parameters = default_model_parameters()
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    args = HarvardEpi.fast_deriv_args(
+        params["beta"],
+        params["alpha"],
+        params["gamma"],
+        params["rho"],
+        params["mu"],
+        model_parameters["population"],
+    )
+    states = np.array(
+        [[120.0, 100.0, 7.0, 1.0, 0.0, 0.0], [1e3, 5e5, 2e5, 1e5, 2e5, 1e3]]
+    )
+    banded = HarvardEpi.batch_jacobian(states.ravel(), 0, np.array([args, args]).T)
+
+    for region, state in enumerate(states):
+        block = HarvardEpi.fast_jacobian(state, 0, *args)
+        for i in range(6):
+            for j in range(6):
+                assert banded[i - j + 5, region * 6 + j] == block[i, j]
+
+
+def stepwise_brute_force_r0(seir_params, new_r0, r0, N):
+    # the original stepping search brute_force_r0 replaced, kept as a reference
+    calc_r0 = r0
+    change = np.sign(new_r0 - calc_r0) * 0.00005
+    new_seir_params = seir_params.copy()
+
+    while round(new_r0, 4) != round(calc_r0, 4):
+        new_seir_params["beta"] = [
+            0.0,
+            new_seir_params["beta"][1] + change,
+            new_seir_params["beta"][2],
+            new_seir_params["beta"][3],
+        ]
+        calc_r0 = HarvardEpi.generate_r0(new_seir_params, N)
+
+        if np.sign(new_r0 - calc_r0) != np.sign(change):
+            change = -change / 2
+
+    return new_seir_params
+
+
+@pytest.mark.parametrize("population", [50000, 1000000, 8000000])
+@pytest.mark.parametrize("new_r0", [1.3, 1.1, 0.8, 0.3, 0.2, 0.1, 0.035, 0, 1.7, None])
+def test_brute_force_r0_matches_stepwise_search(new_r0, population):
+    model_parameters = default_model_parameters(population=population)
+    seir_params = HarvardEpi.generate_epi_params(model_parameters)
+    r0 = HarvardEpi.generate_r0(seir_params, population)
+    if new_r0 is None:
+        new_r0 = r0
+
+    expected = stepwise_brute_force_r0(seir_params, new_r0, r0, population)
+    result = HarvardEpi.brute_force_r0(seir_params, new_r0, r0, population)
+
+    # the stepwise search stops once R0 matches to 4 decimal places, the new
+    # solve should land on the target itself
+    result_r0 = HarvardEpi.generate_r0(result, population)
+    assert result_r0 == pytest.approx(new_r0, abs=1e-9)
+    assert result_r0 == pytest.approx(
+        HarvardEpi.generate_r0(expected, population), abs=1e-4
+    )
+    assert result["beta"][2:] == expected["beta"][2:]
+    assert {k: v for k, v in result.items() if k != "beta"} == {
+        k: v for k, v in expected.items() if k != "beta"
+    }
+    assert seir_params["beta"][1] == model_parameters["beta"] / population
+
+
+def test_brute_force_r0_falls_back_for_nonlinear_r0(monkeypatch):
+    def squared_r0(seir_params, N):
+        return (N * seir_params["beta"][1]) ** 2
+
+    monkeypatch.setattr(HarvardEpi, "generate_r0", squared_r0)
+    population = 1000000
+    seir_params = HarvardEpi.generate_epi_params(
+        default_model_parameters(population=population)
+    )
+
+    result = HarvardEpi.brute_force_r0(
+        seir_params, 0.16, squared_r0(seir_params, population), population
+    )
+
+    assert squared_r0(result, population) == pytest.approx(0.16, rel=1e-9)
+
+
+def test_seir_schedule_matches_piecewise_solves():
+    model_parameters = default_model_parameters(fast_deriv=True)
+    pop_dict = default_pop_dict()
+    N = pop_dict["total"]
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    r0 = HarvardEpi.generate_r0(params, N)
+    beta_schedule = [(0, params["beta"])] + [
+        (day, HarvardEpi.brute_force_r0(params, new_r0, r0, N)["beta"])
+        for day, new_r0 in [(20, 1.3), (50, 0.8), (110, r0)]
+    ]
+
+    data, steps, ret = HarvardEpi.seir_schedule(
+        pop_dict,
+        model_parameters,
+        beta_schedule,
+        params["alpha"],
+        params["gamma"],
+        params["rho"],
+        params["mu"],
+    )
+
+    # integrate each piece separately, carrying the exact state across
+    y = np.array(HarvardEpi.initial_conditions(pop_dict, model_parameters), float)
+    pieces = []
+    days = [day for day, _ in beta_schedule] + [steps - 1]
+    for (start, beta), end in zip(beta_schedule, days[1:]):
+        args = HarvardEpi.fast_deriv_args(
+            beta, params["alpha"], params["gamma"], params["rho"], params["mu"], N
+        )
+        piece = odeint(
+            HarvardEpi.fast_deriv,
+            y,
+            np.arange(start, end + 1),
+            args=args,
+            rtol=1e-10,
+            atol=1e-6,
+        )
+        pieces.append(piece[:-1])
+        y = piece[-1]
+    expected = np.vstack(pieces + [y])
+
+    assert ret.shape == (steps, 6)
+    np.testing.assert_allclose(ret, expected, rtol=1e-4, atol=1.0)
+
+
+def test_seir_horizon_matches_truncated_full_year():
+    model_parameters = default_model_parameters(fast_deriv=True)
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    args = [params[name] for name in ["beta", "alpha", "gamma", "rho", "mu"]]
+    start = datetime.datetime(2020, 3, 30)
+    end = start + datetime.timedelta(days=270)
+
+    _, _, full = HarvardEpi.seir(default_pop_dict(), model_parameters, *args)
+    steps = HarvardEpi.steps_between(start, end)
+    data, returned_steps, ret = HarvardEpi.seir(
+        default_pop_dict(), model_parameters, *args, steps=steps
+    )
+
+    assert steps == returned_steps == 271
+    np.testing.assert_array_equal(ret, full[:steps])
+    frame = HarvardEpi.dataframe_ify(data, start, end, steps)
+    assert len(frame) == steps
+    assert frame.index[-1] == end
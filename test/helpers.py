@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+
+def build_timeseries(days=30, missing_deaths=0):
+    """Cases and deaths of a region growing 25% a day from 2020-03-01, as
+    timeseries.get_data returns them, with the first missing_deaths days of
+    deaths NaN."""
+    dates = pd.date_range("2020-03-01", periods=days, freq="D")
+    cases = np.round(5 * 1.25 ** np.arange(days))
+    deaths = np.floor(cases * 0.02)
+    deaths[:missing_deaths] = np.nan
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "country": "USA",
+            "state": "CA",
+            "cases": cases,
+            "deaths": deaths,
+            "recovered": np.nan,
+        }
+    )
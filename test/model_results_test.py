@@ -0,0 +1,107 @@
+import datetime
+import pathlib
+import numpy as np
+import pandas as pd
+import pytest
+import simplejson
+import run
+from libs.build_params import get_interventions
+from libs import website_rows
+from libs.results_writer import encode_results
+from test.helpers import build_timeseries
+
+GOLDEN_DIR = pathlib.Path(__file__).parent / "data" / "website"
+
+
+@pytest.mark.parametrize(
+    "interventions", get_interventions(start_date=datetime.date(2020, 3, 30))
+)
+def test_array_results_match_dataframe_results(interventions):
+    population = 1000000
+    beds = 2500
+    min_date = datetime.datetime(2020, 3, 7)
+    max_date = datetime.datetime(2020, 7, 6)
+
+    expected = run.model_state(
+        build_timeseries(missing_deaths=3), beds, population, interventions
+    )
+    results = run.model_state(
+        build_timeseries(missing_deaths=3),
+        beds,
+        population,
+        interventions,
+        as_arrays=True,
+    )
+
+    pd.testing.assert_frame_equal(results.to_dataframe(), expected)
+
+    website = run.prepare_data_for_website(
+        expected,
+        build_timeseries(missing_deaths=3),
+        population,
+        min_date,
+        max_date,
+        interval=4,
+    )
+    rows = run.prepare_rows_for_website(
+        results,
+        build_timeseries(missing_deaths=3),
+        population,
+        min_date,
+        max_date,
+        interval=4,
+    )
+    assert simplejson.dumps(rows, ignore_nan=True) == simplejson.dumps(
+        website.values.tolist(), ignore_nan=True
+    )
+
+
+@pytest.mark.parametrize(
+    "i, interventions",
+    enumerate(get_interventions(start_date=datetime.date(2020, 3, 30))),
+)
+def test_website_output_matches_golden_files(i, interventions):
+    population = 1000000
+    min_date = datetime.datetime(2020, 3, 7)
+    max_date = datetime.datetime(2020, 7, 6)
+    expected = (GOLDEN_DIR / f"CA.{i}.json").read_text()
+
+    results = run.model_state(
+        build_timeseries(missing_deaths=3),
+        2500,
+        population,
+        interventions,
+        as_arrays=True,
+    )
+    website = run.prepare_data_for_website(
+        results.to_dataframe(),
+        build_timeseries(missing_deaths=3),
+        population,
+        min_date,
+        max_date,
+        interval=4,
+    )
+    assert list(website.columns) == website_rows.WEBSITE_COLUMNS
+    assert encode_results(website) == expected
+
+    rows = run.prepare_rows_for_website(
+        results,
+        build_timeseries(missing_deaths=3),
+        population,
+        min_date,
+        max_date,
+        interval=4,
+    )
+    assert encode_results(rows) == expected
+
+
+def test_website_rows_require_unique_historical_dates():
+    results = run.model_state(
+        build_timeseries(missing_deaths=3), 2500, 1000000, None, as_arrays=True
+    )
+    historicals = build_timeseries(missing_deaths=3)
+    historicals = pd.concat([historicals, historicals.tail(1)])
+    with pytest.raises(ValueError, match="not unique"):
+        run.prepare_rows_for_website(
+            results, historicals, 1000000, None, None, interval=4
+        )
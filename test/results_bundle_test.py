@@ -0,0 +1,120 @@
+import datetime
+import os
+import pytest
+import run
+from libs import build_dod_dataset
+from libs import results_bundle
+from libs.build_params import get_interventions
+from libs.results_writer import encode_results
+from test.helpers import build_timeseries
+
+MIN_DATE = datetime.datetime(2020, 3, 7)
+MAX_DATE = datetime.datetime(2020, 7, 6)
+
+
+def website_rows(population, intervention):
+    results = run.model_state(
+        build_timeseries(missing_deaths=3),
+        2500,
+        population,
+        intervention,
+        as_arrays=True,
+    )
+    return run.prepare_rows_for_website(
+        results,
+        build_timeseries(missing_deaths=3),
+        population,
+        MIN_DATE,
+        MAX_DATE,
+        interval=4,
+    )
+
+
+@pytest.fixture
+def results_dir(tmp_path):
+    interventions = get_interventions(start_date=datetime.date(2020, 3, 30))
+    for i, intervention in enumerate(interventions[:2]):
+        run.write_results(website_rows(1000000, intervention), tmp_path, f"CA.{i}.json")
+        run.write_results(
+            website_rows(50000, intervention), tmp_path, f"CA.06001.{i}.json"
+        )
+    (tmp_path / "CA.summary.json").write_text("{}")
+    return tmp_path
+
+
+def test_bundle_regenerates_results_files(results_dir, tmp_path_factory):
+    path = results_bundle.build_bundle(results_dir)
+    bundle = results_bundle.ResultsBundle(path)
+
+    assert sorted(bundle.names) == [
+        "CA.0.json",
+        "CA.06001.0.json",
+        "CA.06001.1.json",
+        "CA.1.json",
+    ]
+
+    output_dir = tmp_path_factory.mktemp("json")
+    bundle.write_json(output_dir)
+    for name in bundle.names:
+        assert (output_dir / name).read_text() == (results_dir / name).read_text()
+
+
+def test_bundle_random_access(results_dir):
+    bundle = results_bundle.ResultsBundle(results_bundle.build_bundle(results_dir))
+    interventions = get_interventions(start_date=datetime.date(2020, 3, 30))
+
+    rows = bundle.rows("CA", 1, fips="06001")
+    expected = website_rows(50000, interventions[1])
+    assert encode_results(rows) == encode_results(expected)
+    # the leading rows are historical estimates, some of them NaN
+    assert any(isinstance(row[9], float) for row in rows)
+
+    frame = bundle.frame("CA", 0)
+    assert len(frame) == len(bundle.rows("CA", 0))
+    assert frame.dead.tolist() == [float(row[11]) for row in bundle.rows("CA", 0)]
+
+    with pytest.raises(KeyError):
+        bundle.rows("NY", 0)
+
+
+def test_write_bundle_rejects_other_layouts(tmp_path):
+    rows = website_rows(50000, None)
+    rows[0][3] = 1.0
+    with pytest.raises(ValueError, match="Unexpected website row"):
+        results_bundle.write_bundle(tmp_path / "bundle.npz", [("CA.0.json", rows)])
+
+
+def projection_rows(hospitalized):
+    """Website rows for the days after today, which get_projections_df reads."""
+    today = datetime.date.today()
+    rows = []
+    for i in range(0, 40, 4):
+        day = today + datetime.timedelta(days=i)
+        row = [i, f"{day.month}/{day.day}/{day.year % 100:02d}"] + [0.0] * 18
+        row[9] = str(hospitalized)
+        row[12] = "50"
+        row[17] = "1000000"
+        rows.append(row)
+    return rows
+
+
+def test_projections_ignore_stale_bundle(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_dod_dataset, "OUTPUT_DIR", str(tmp_path))
+    run.write_results(projection_rows(100), tmp_path, "CA.0.json")
+    bundle_path = results_bundle.build_bundle(tmp_path)
+    assert results_bundle.is_current(tmp_path)
+    projections = build_dod_dataset.get_projections_df()
+    assert projections["16-day_Hospitalization_Prediction"].tolist() == [100]
+
+    # a later run rewrites the results without rebuilding the bundle
+    run.write_results(projection_rows(300), tmp_path, "CA.0.json")
+    built = bundle_path.stat().st_mtime_ns
+    os.utime(tmp_path / "CA.0.json", ns=(built + 10 ** 9, built + 10 ** 9))
+    assert not results_bundle.is_current(tmp_path)
+    projections = build_dod_dataset.get_projections_df()
+    assert projections["16-day_Hospitalization_Prediction"].tolist() == [300]
+    assert projections["16-day_Beds_Shortfall"].tolist() == [250]
+
+    results_bundle.remove_bundle(tmp_path)
+    assert not bundle_path.exists()
+    assert not results_bundle.is_current(tmp_path)
@@ -0,0 +1,112 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+import simplejson
+import run
+from libs.results_writer import ResultsWriter, atomic_write, encode_results
+
+ROWS = [
+    [0, "3/9/20", 0.0, "12", np.nan, 102.73972602739727, "1000000"],
+    [4, "3/13/20", 0.0, "30", 1.5, float("inf"), "1000000"],
+]
+
+
+def test_encode_results_matches_simplejson_dump():
+    expected = io.StringIO()
+    simplejson.dump(ROWS, expected, ignore_nan=True)
+    assert encode_results(ROWS) == expected.getvalue()
+    assert encode_results(pd.DataFrame(ROWS)) == expected.getvalue()
+
+
+def test_atomic_write_leaves_no_temporary_files(tmp_path):
+    atomic_write(tmp_path / "a.json", "[1]")
+    atomic_write(tmp_path / "a.json", "[2]")
+
+    assert [path.name for path in tmp_path.iterdir()] == ["a.json"]
+    assert (tmp_path / "a.json").read_text() == "[2]"
+
+
+def test_results_writer_writes_queued_files(tmp_path):
+    writer = ResultsWriter(maxsize=2)
+    for i in range(5):
+        writer.write(ROWS[: i % 2 + 1], tmp_path, f"{i}.json")
+    writer.flush()
+
+    for i in range(5):
+        assert (tmp_path / f"{i}.json").read_text() == encode_results(ROWS[: i % 2 + 1])
+    assert writer.info()["files"] == 5
+    writer.close()
+
+
+def test_results_writer_raises_write_errors_on_flush(tmp_path):
+    writer = ResultsWriter()
+    writer.write(ROWS, tmp_path / "missing", "a.json")
+    writer.write(ROWS, tmp_path, "b.json")
+    with pytest.raises(FileNotFoundError):
+        writer.flush()
+
+    # the error is only raised once, and later writes still go through
+    assert (tmp_path / "b.json").exists()
+    writer.write(ROWS, tmp_path, "c.json")
+    writer.close()
+    assert (tmp_path / "c.json").exists()
+
+
+def _write_in_worker(directory, name):
+    run.RESULTS_WRITER.write(ROWS, directory, name)
+    run.RESULTS_WRITER.flush()
+
+
+def test_results_writer_in_pool_workers(tmp_path):
+    # started in this process before the pool forks
+    run.RESULTS_WRITER.write(ROWS, tmp_path, "parent.json")
+    run.RESULTS_WRITER.flush()
+
+    tasks = [(f"{i}", 1, (tmp_path, f"{i}.json")) for i in range(4)]
+    run.run_tasks(_write_in_worker, tasks, num_cores=2)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "0.json",
+        "1.json",
+        "2.json",
+        "3.json",
+        "parent.json",
+    ]
+
+
+def test_flushing_raises_write_errors_from_their_block(tmp_path):
+    writer = ResultsWriter()
+    with pytest.raises(FileNotFoundError):
+        with writer.flushing():
+            writer.write(ROWS, tmp_path / "missing", "a.json")
+
+    # a failing block keeps its own error, and leaves nothing queued behind
+    with pytest.raises(ValueError, match="model failed"):
+        with writer.flushing():
+            writer.write(ROWS, tmp_path / "missing", "b.json")
+            writer.write(ROWS, tmp_path, "b.json")
+            raise ValueError("model failed")
+    assert (tmp_path / "b.json").exists()
+
+    with writer.flushing():
+        writer.write(ROWS, tmp_path, "c.json")
+    writer.close()
+
+
+def _write_then_fail(directory, name, fail):
+    with run.RESULTS_WRITER.flushing():
+        run.RESULTS_WRITER.write(ROWS, directory, name)
+        if fail:
+            raise ValueError("model failed")
+
+
+def test_write_errors_fail_the_task_that_queued_them(tmp_path):
+    tasks = [
+        ("failing", 2, (tmp_path / "missing", "a.json", True)),
+        ("next", 1, (tmp_path, "b.json", False)),
+    ]
+    # one worker, so both tasks share its writer
+    with pytest.raises(RuntimeError, match=r"1 of 2 tasks failed: \['failing'\]"):
+        run.run_tasks(_write_then_fail, tasks, num_cores=1, chunksize=1)
+    assert (tmp_path / "b.json").exists()
@@ -0,0 +1,55 @@
+import numpy as np
+from libs.epi_models import HarvardEpi
+from libs.epi_models.segment_cache import SegmentCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = SegmentCache(maxsize=2)
+    cache.put("a", np.zeros(3))
+    cache.put("b", np.ones(3))
+    assert cache.get("a") is not None
+    cache.put("c", np.ones(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.info() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_key_ignores_float_noise():
+    cache = SegmentCache()
+    key = cache.key([1, 2], 0.3, [1.0, 2.0])
+    assert cache.key([1, 2], 0.1 + 0.2, [1.0, 2.0]) == key
+    assert cache.key([1, 3], 0.3, [1.0, 2.0]) != key
+    assert cache.key([1, 2], 0.3, [1.0, 2.5]) != key
+
+
+def test_seir_reuses_cached_segment():
+    model_parameters = {
+        "population": 1000000,
+        "presymptomatic_period": 3,
+        "duration_mild_infections": 6,
+        "hospital_time_recovery": 6,
+        "icu_time_death": 8,
+        "beta": 0.6,
+        "beta_hospitalized": 0.1,
+        "beta_icu": 0.1,
+        "hospitalization_rate": 0.0727,
+        "hospitalized_cases_requiring_icu_care": 0.1397,
+        "case_fatality_rate": 0.0109341104294479,
+        "exposed_infected_ratio": 1.2,
+        "fast_deriv": True,
+    }
+    pop_dict = {"total": 1000000, "infected": 400, "recovered": 10, "deaths": 2}
+    params = HarvardEpi.generate_epi_params(model_parameters)
+    args = [params[name] for name in ["beta", "alpha", "gamma", "rho", "mu"]]
+    cache = SegmentCache()
+
+    _, _, expected = HarvardEpi.seir(pop_dict, model_parameters, *args)
+    _, _, first = HarvardEpi.seir(pop_dict, model_parameters, *args, cache=cache)
+    _, _, second = HarvardEpi.seir(pop_dict, model_parameters, *args, cache=cache)
+
+    assert second is first
+    assert not second.flags.writeable
+    np.testing.assert_array_equal(first, expected)
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,125 @@
+import datetime
+import numpy as np
+from scipy.integrate import odeint
+from libs.epi_models import SIR
+
+
+def default_pop_dict(**updates):
+    pop_dict = {
+        "total": 1000000,
+        "infected": 400,
+        "recovered": 10,
+        "deaths": 2,
+    }
+    pop_dict.update(updates)
+    return pop_dict
+
+
+def reference_deriv(y0, t, beta, gamma, N):
+    S, I, R = y0
+    return [-beta * S * I / N, beta * S * I / N - gamma * I, gamma * I]
+
+
+def test_deriv_uses_its_parameters():
+    y0 = SIR.initial_conditions(default_pop_dict())
+    for beta, gamma in [(0.2, 0.1), (0.5, 1 / 6)]:
+        np.testing.assert_allclose(
+            SIR.deriv(y0, 0, beta, gamma, 1000000),
+            reference_deriv(y0, 0, beta, gamma, 1000000),
+        )
+
+
+def test_batch_deriv_matches_deriv_per_region():
+    y = np.array([[9e5, 400, 10], [5e4, 20, 0], [7.9e6, 3e4, 1e3]])
+    beta = np.array([0.2, 0.4, 0.5])
+    gamma = np.array([0.1, 1 / 6, 1 / 6])
+    N = y.sum(axis=1)
+
+    results = SIR.batch_deriv(y.ravel(), 0, beta, gamma, N).reshape(-1, 3)
+    for i in range(3):
+        np.testing.assert_allclose(
+            results[i], SIR.deriv(y[i], 0, beta[i], gamma[i], N[i])
+        )
+
+
+def test_seir_matches_reference_and_conserves_population():
+    pop_dict = default_pop_dict()
+    params = SIR.generate_epi_params({"r0": 2.4, "hospital_time_recovery": 6})
+    data, steps, ret = SIR.seir(
+        pop_dict,
+        params["beta"],
+        params["alpha"],
+        params["gamma"],
+        params["rho"],
+        params["mu"],
+        steps=200,
+    )
+
+    expected = odeint(
+        reference_deriv,
+        SIR.initial_conditions(pop_dict),
+        np.arange(0, 200, 1),
+        args=(params["beta"], params["gamma"], pop_dict["total"]),
+    )
+    np.testing.assert_allclose(ret, expected, rtol=1e-12)
+    np.testing.assert_allclose(ret.sum(axis=1), ret[0].sum())
+    assert data.shape == (3, 200)
+
+
+def test_seir_batch_matches_individual_solves():
+    pop_dicts = [
+        default_pop_dict(total=50000, infected=20),
+        default_pop_dict(),
+        default_pop_dict(total=8000000, infected=30000, deaths=400),
+    ]
+    seir_params = [
+        SIR.generate_epi_params({"r0": r0, "hospital_time_recovery": 6})
+        for r0 in [1.5, 2.4, 3.0]
+    ]
+
+    expected = [
+        SIR.seir(pop_dict, params["beta"], 0, params["gamma"], 0, 0)[2]
+        for pop_dict, params in zip(pop_dicts, seir_params)
+    ]
+    data, steps, ret = SIR.seir_batch(
+        [SIR.initial_conditions(pop_dict) for pop_dict in pop_dicts],
+        seir_params,
+        [pop_dict["total"] for pop_dict in pop_dicts],
+    )
+
+    assert data.shape == (3, 3, steps)
+    for i, region_expected in enumerate(expected):
+        np.testing.assert_allclose(ret[i], region_expected, rtol=1e-5, atol=1e-3)
+        np.testing.assert_array_equal(data[i], np.transpose(ret[i]))
+
+    start = datetime.datetime(2020, 4, 1)
+    end = start + datetime.timedelta(days=99)
+    frames = SIR.dataframe_ify_batch(
+        data, start, end, steps, [params["mu"] for params in seir_params]
+    )
+    assert len(frames) == 3
+    assert len(frames[0]) == 100
+    assert list(frames[0].columns) == [
+        "susceptible",
+        "infected",
+        "recovered",
+        "dead",
+        "infected_a",
+        "infected_b",
+        "infected_c",
+        "exposed",
+    ]
+    np.testing.assert_allclose(
+        frames[2]["dead"] + frames[2]["recovered"], data[2][2][:100]
+    )
+
+
+def test_brute_force_r0_is_exact():
+    params = SIR.generate_epi_params({"r0": 2.4, "hospital_time_recovery": 6})
+    assert np.isclose(SIR.generate_r0(params), 2.4)
+
+    for new_r0 in [0.0, 0.3, 1.1, 3.7]:
+        new_params = SIR.brute_force_r0(params, new_r0, SIR.generate_r0(params))
+        assert np.isclose(SIR.generate_r0(new_params), new_r0)
+        assert new_params["gamma"] == params["gamma"]
+    assert np.isclose(SIR.generate_r0(params), 2.4)
@@ -0,0 +1,55 @@
+import pytest
+import run
+
+
+def _square(value):
+    if value < 0:
+        raise ValueError("negative")
+    if value == 0:
+        return False
+    return value * value
+
+
+def test_run_tasks_runs_most_expensive_first():
+    tasks = [(f"task-{cost}", cost, (cost,)) for cost in [3, 1, 4, 2]]
+    results = run.run_tasks(_square, tasks, num_cores=1, chunksize=1)
+
+    assert [result.key for result in results] == [
+        "task-4",
+        "task-3",
+        "task-2",
+        "task-1",
+    ]
+    assert all(result.status == "ok" for result in results)
+    assert all(result.seconds >= 0 for result in results)
+
+
+def test_run_tasks_reports_skipped_tasks():
+    tasks = [("zero", 1, (0,)), ("one", 1, (1,))]
+    results = run.run_tasks(_square, tasks, num_cores=2)
+
+    statuses = {result.key: result.status for result in results}
+    assert statuses == {"zero": "skipped", "one": "ok"}
+
+
+def test_run_tasks_raises_after_finishing_all_tasks():
+    tasks = [("bad", 2, (-1,)), ("good", 1, (2,))]
+    with pytest.raises(RuntimeError, match="1 of 2 tasks failed"):
+        run.run_tasks(_square, tasks, num_cores=1, chunksize=1)
+
+
+def _reuse(value):
+    return run.REUSED if value % 2 else None
+
+
+def test_run_tasks_reports_task_statuses():
+    tasks = [(f"task-{i}", 1, (i,)) for i in range(4)]
+    results = run.run_tasks(_reuse, tasks, num_cores=1)
+
+    statuses = {result.key: result.status for result in results}
+    assert statuses == {
+        "task-0": "ok",
+        "task-1": "reused",
+        "task-2": "ok",
+        "task-3": "reused",
+    }